@@ -4,22 +4,43 @@ API route handlers for the search engine.
 """
 import sys
 import os
+import base64
+import binascii
+import json
+from functools import partial
 
 # Add src directory to path
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
-from search import single_word_search, multi_word_search, autocomplete_words  # type: ignore
-from semantic import semantic_search_query  # type: ignore
+from search import single_word_search, multi_word_search, phrase_search, proximity_search, boolean_search, autocomplete_words  # type: ignore
+from search import did_you_mean, spelling_suggestions, wildcard_search, batch_search, BATCH_MODES  # type: ignore
+from search import scored_documents, search_page, PAGE_MODES  # type: ignore
+from query_parser import QueryParseError  # type: ignore
+from semantic import semantic_search_query, average_embedding, rerank_candidates  # type: ignore
+from embedding_store import embedding_store, normalize_rows  # type: ignore
+from ranking import ranked_order, top_k_results  # type: ignore
+from doc_ids import doc_id_table  # type: ignore
+from doc_store import doc_store, document_fields  # type: ignore
+from result_cache import result_cache, normalize_query  # type: ignore
+from segments import live_index  # type: ignore
+from compaction import compactor  # type: ignore
 from .loader import search_engine
+from .executor import search_pool, index_pool, pool_stats
+from .prefork import WORKERS_ENV
 
 router = APIRouter()
 
+MAX_BATCH_QUERIES = 200
+EXPORT_CHUNK_SIZE = 1000  # rows selected and written per NDJSON chunk
+MAX_BULK_DOCUMENTS = 200
+
 # Request/Response Models
 class SearchResponse(BaseModel):
     doc_id: str
@@ -29,12 +50,62 @@ class SearchRequest(BaseModel):
     query: str
     top_k: Optional[int] = 10
 
+class ProximityRequest(BaseModel):
+    query: str
+    window: Optional[int] = 5
+    top_k: Optional[int] = 10
+
+class WildcardRequest(BaseModel):
+    query: str
+    max_expansions: Optional[int] = 50
+    top_k: Optional[int] = 10
+
+class SemanticRequest(BaseModel):
+    query: str
+    top_k: Optional[int] = 10
+    candidate_pool: Optional[int] = 500
+    nprobe: Optional[int] = None
+
+class BatchQuery(BaseModel):
+    query: str
+    mode: Optional[str] = "multi"
+    top_k: Optional[int] = None  # defaults to the batch's top_k
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+    top_k: Optional[int] = 10
+
+class BatchResult(BaseModel):
+    query: str
+    mode: str
+    results: List[SearchResponse]
+
+class PageRequest(BaseModel):
+    query: str
+    mode: Optional[str] = "multi"
+    page_size: Optional[int] = 10
+    cursor: Optional[str] = None  # next_cursor of the previous page
+
+class PageResponse(BaseModel):
+    results: List[SearchResponse]
+    next_cursor: Optional[str] = None
+
+class ExportRequest(BaseModel):
+    query: str
+    mode: Optional[str] = "multi"
+    limit: Optional[int] = None  # None streams every match
+
 class AutocompleteRequest(BaseModel):
     prefix: str
     top_n: Optional[int] = 10
 
 class AutocompleteResponse(BaseModel):
     suggestions: List[str]
+    corrected: bool = False
+
+class SpellingResponse(BaseModel):
+    query: str
+    did_you_mean: Optional[str] = None
 
 
 @router.get("/")
@@ -46,14 +117,48 @@ async def root():
         "endpoints": {
             "single_word": "/search/single",
             "multi_word": "/search/multi",
+            "phrase": "/search/phrase",
+            "near": "/search/near",
+            "boolean": "/search/boolean",
+            "wildcard": "/search/wildcard",
+            "batch": "/search/batch",
+            "page": "/search/page",
+            "export": "/search/export",
             "semantic": "/search/semantic",
+            "spelling": "/search/spelling",
             "autocomplete": "/autocomplete"
         }
     }
 
 
+def _cache_key(mode: str, normalized_query: str, **params) -> tuple:
+    return (mode, normalized_query) + tuple(sorted(params.items()))
+
+
+async def _cached_search(mode: str, fn, query: str, **params) -> list:
+    """
+    Results of fn(query, **params) from the result cache, computing them
+    on the search pool on a miss. The key is (mode, normalized query, params).
+    """
+    query = normalize_query(query)
+    key = _cache_key(mode, query, **params)
+    results = result_cache.get(key)
+    if results is None:
+        generation = result_cache.generation
+        results = await search_pool.run(fn, query, **params)
+        result_cache.put(key, results, generation)
+    return results
+
+
+async def _suggest_correction(query: str, response: Response) -> None:
+    """On zero hits, pass a spelling-corrected query back in the X-Did-You-Mean header."""
+    suggestion = await search_pool.run(did_you_mean, query)
+    if suggestion:
+        response.headers["X-Did-You-Mean"] = suggestion
+
+
 @router.post("/search/single", response_model=List[SearchResponse])
-async def single_word_search_endpoint(request: SearchRequest):
+async def single_word_search_endpoint(request: SearchRequest, response: Response):
     """
     Single-word search: Returns documents containing the exact word.
     """
@@ -62,23 +167,27 @@ async def single_word_search_endpoint(request: SearchRequest):
         if not word:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        results = single_word_search(word)
+        results = await _cached_search("single", single_word_search, word, top_k=request.top_k)
         
         if not results:
+            await _suggest_correction(word, response)
             return []
         
         # Return top_k results
+        # Postings use dense int docIDs; translate only at the API edge
         return [
-            SearchResponse(doc_id=doc_id, score=float(score))
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
             for doc_id, score in results[:request.top_k]
         ]
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 
 @router.post("/search/multi", response_model=List[SearchResponse])
-async def multi_word_search_endpoint(request: SearchRequest):
+async def multi_word_search_endpoint(request: SearchRequest, response: Response):
     """
     Multi-word search: Returns documents containing ALL words (AND search).
     """
@@ -87,83 +196,408 @@ async def multi_word_search_endpoint(request: SearchRequest):
         if not query:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        results = multi_word_search(query)
+        results = await _cached_search("multi", multi_word_search, query, top_k=request.top_k)
         
         if not results:
+            await _suggest_correction(query, response)
             return []
         
+        # Postings use dense int docIDs; translate only at the API edge
         return [
-            SearchResponse(doc_id=doc_id, score=float(score))
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
             for doc_id, score in results[:request.top_k]
         ]
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 
-@router.post("/search/semantic", response_model=List[SearchResponse])
-async def semantic_search_endpoint(request: SearchRequest):
+@router.post("/search/phrase", response_model=List[SearchResponse])
+async def phrase_search_endpoint(request: SearchRequest, response: Response):
     """
-    Hybrid semantic search: Fast keyword filter + semantic reranking.
-    Filters to top 500 candidates first, then does semantic search.
+    Phrase search: Returns documents containing the words consecutively,
+    e.g. "spike protein". Uses the token positions stored in the barrels.
     """
     try:
-        import numpy as np
-        from sklearn.metrics.pairwise import cosine_similarity
+        query = request.query.strip().lower()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        
+        results = await _cached_search("phrase", phrase_search, query, top_k=request.top_k)
+        if not results:
+            await _suggest_correction(query, response)
         
+        return [
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
+            for doc_id, score in results
+        ]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+@router.post("/search/near", response_model=List[SearchResponse])
+async def proximity_search_endpoint(request: ProximityRequest, response: Response):
+    """
+    Proximity search: Returns documents where all words occur within
+    `window` tokens of each other (any order).
+    """
+    try:
         query = request.query.strip().lower()
         if not query:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
+        if request.window is None or request.window < 1:
+            raise HTTPException(status_code=400, detail="Window must be at least 1")
         
-        # Step 1: Use multi-word search to get top 500 candidates (fast)
-        keyword_results = multi_word_search(query)
+        results = await _cached_search("near", proximity_search, query, window=request.window, top_k=request.top_k)
+        if not results:
+            await _suggest_correction(query, response)
         
-        if not keyword_results:
-            # No keyword matches, return empty
-            return []
+        return [
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
+            for doc_id, score in results
+        ]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+@router.post("/search/boolean", response_model=List[SearchResponse])
+async def boolean_search_endpoint(request: SearchRequest):
+    """
+    Boolean search: AND / OR / NOT, parentheses and "quoted phrases",
+    e.g. covid AND (vaccine OR "spike protein") NOT mouse.
+    Evaluated in one pass over the posting lists.
+    """
+    try:
+        query = request.query.strip()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        # Extract just the doc_ids from keyword results (limit to 500)
-        candidate_docs = [doc_id for doc_id, _ in keyword_results[:500]]
+        results = await _cached_search("boolean", boolean_search, query, top_k=request.top_k)
         
-        # Step 2: Semantic reranking on candidates only
-        glove = search_engine.get_glove()
+        return [
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
+            for doc_id, score in results
+        ]
+    
+    except QueryParseError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+@router.post("/search/wildcard", response_model=List[SearchResponse])
+async def wildcard_search_endpoint(request: WildcardRequest):
+    """
+    Wildcard search: '*' matches any run of letters and '?' one letter,
+    e.g. sars*, *virus or cov*d. Matching words (at most max_expansions,
+    most frequent first) are OR-ed together.
+    """
+    try:
+        query = request.query.strip().lower()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        if request.max_expansions is None or request.max_expansions < 1:
+            raise HTTPException(status_code=400, detail="max_expansions must be at least 1")
         
-        # Compute query embedding
-        query_tokens = query.split()
-        query_vectors = [glove[token] for token in query_tokens if token in glove]
+        results = await _cached_search("wildcard", wildcard_search, query, top_k=request.top_k, max_expansions=request.max_expansions)
         
-        if not query_vectors:
-            # Fall back to keyword results if no embeddings available
-            return [
-                SearchResponse(doc_id=doc_id, score=float(score))
-                for doc_id, score in keyword_results[:request.top_k]
-            ]
+        return [
+            SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score))
+            for doc_id, score in results
+        ]
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+@router.post("/search/batch", response_model=List[BatchResult])
+async def batch_search_endpoint(request: BatchRequest):
+    """
+    Batch search: many single-word / multi-word queries in one request.
+    Every distinct term is looked up once, grouped by barrel, and its
+    postings are shared by all queries that use it. Queries already in
+    the result cache are answered from it.
+    """
+    try:
+        if not request.queries:
+            raise HTTPException(status_code=400, detail="Batch must contain at least one query")
+        if len(request.queries) > MAX_BATCH_QUERIES:
+            raise HTTPException(status_code=400, detail=f"Batch is limited to {MAX_BATCH_QUERIES} queries")
         
-        query_embedding = np.mean(query_vectors, axis=0)
+        jobs = []
+        for item in request.queries:
+            mode = (item.mode or "multi").strip().lower()
+            if mode not in BATCH_MODES:
+                raise HTTPException(status_code=400, detail=f"Unsupported batch mode '{item.mode}' (expected one of {', '.join(BATCH_MODES)})")
+            query = normalize_query(item.query.lower())
+            top_k = item.top_k if item.top_k is not None else request.top_k
+            jobs.append((mode, query, top_k))
         
-        # Compute similarities only for candidate documents
-        similarities = []
-        for doc_id in candidate_docs:
-            doc_embedding = search_engine.get_embedding(doc_id)
-            if doc_embedding is not None:
-                similarity = cosine_similarity(
-                    query_embedding.reshape(1, -1),
-                    doc_embedding.reshape(1, -1)
-                )[0][0]
-                similarities.append((doc_id, float(similarity)))
+        # Same keys as the per-mode endpoints, so both fill one cache
+        keys = [_cache_key(mode, query, top_k=top_k) for mode, query, top_k in jobs]
+        results = [result_cache.get(key) for key in keys]
+        misses = [i for i, cached in enumerate(results) if cached is None]
+        if misses:
+            generation = result_cache.generation
+            computed = await search_pool.run(batch_search, [jobs[i] for i in misses])
+            for i, hits in zip(misses, computed):
+                results[i] = hits
+                result_cache.put(keys[i], hits, generation)
         
-        # Sort by semantic similarity and return top K
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        return [
+            BatchResult(
+                query=query,
+                mode=mode,
+                results=[SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score)) for doc_id, score in hits],
+            )
+            for (mode, query, _), hits in zip(jobs, results)
+        ]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch search error: {str(e)}")
+
+
+def _encode_cursor(doc_id: Union[int, str], score: float, offset: int) -> str:
+    # JSON keeps the docID's type (legacy barrels hold string docIDs) and
+    # writes floats with repr(), so ties resume at exactly the right row
+    return base64.urlsafe_b64encode(json.dumps([doc_id, score, offset]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Tuple[Union[int, str], float], int]:
+    """((docID, score) of the last row of the previous page, rows returned so far)."""
+    try:
+        fields = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        # Cursors issued before the offset was added hold just [docID, score]
+        doc_id, score, offset = fields if len(fields) == 3 else (*fields, 0)
+        if not isinstance(doc_id, (int, str)) or isinstance(doc_id, bool):
+            raise ValueError("bad docID")
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise ValueError("bad offset")
+        return (doc_id, float(score)), offset
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page_query(query: str, mode: Optional[str]) -> Tuple[str, str]:
+    """Validated (mode, query) for pagination and export; boolean queries keep their case."""
+    mode = (mode or "multi").strip().lower()
+    if mode not in PAGE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode '{mode}' (expected one of {', '.join(PAGE_MODES)})")
+    query = normalize_query(query if mode == "boolean" else query.lower())
+    if not query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    return mode, query
+
+
+async def _scored_documents(mode: str, query: str):
+    """
+    All (docIDs, scores) of a query, from the result cache when possible,
+    so repeated exports reuse the scores of the first request.
+    """
+    key = _cache_key(f"scored:{mode}", query)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached[0], cached[1]
+    generation = result_cache.generation
+    doc_ids, scores = await search_pool.run(scored_documents, mode, query)
+    result_cache.put(key, (doc_ids, scores), generation)
+    return doc_ids, scores
+
+
+@router.post("/search/page", response_model=PageResponse)
+async def page_search_endpoint(request: PageRequest):
+    """
+    Paginated search (single, multi or boolean mode). Pass the returned
+    next_cursor to get the following page; it encodes the (docID, score)
+    of the last row and the number of rows served so far, so the next
+    page is one pruned top-(offset + page_size) query resumed right after
+    that row (see search.search_page). next_cursor is null on the last page.
+    """
+    try:
+        mode, query = _page_query(request.query, request.mode)
+        if request.page_size is None or request.page_size < 1:
+            raise HTTPException(status_code=400, detail="page_size must be at least 1")
+        after, offset = _decode_cursor(request.cursor) if request.cursor else (None, 0)
+
+        # One extra row tells whether another page exists
+        try:
+            page = await _cached_search(
+                f"page:{mode}", partial(search_page, mode), query,
+                page_size=request.page_size + 1, after=after, offset=offset,
+            )
+        except QueryParseError:
+            raise
+        except ValueError:
+            # search_page rejects a cursor from another index
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        has_more = len(page) > request.page_size
+        page = page[:request.page_size]
+        return PageResponse(
+            results=[SearchResponse(doc_id=doc_id_table.to_external(doc_id), score=float(score)) for doc_id, score in page],
+            next_cursor=_encode_cursor(*page[-1], offset + len(page)) if has_more else None,
+        )
+    
+    except QueryParseError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+def _ndjson_rows(doc_ids, scores, limit: Optional[int]):
+    """
+    Yield NDJSON lines best first, EXPORT_CHUNK_SIZE rows at a time.
+    The (first `limit`) rows are ordered once, with an O(n) partition
+    first when a limit is set, and then serialized slice by slice.
+    """
+    order = ranked_order(scores, limit)
+    for start in range(0, len(order), EXPORT_CHUNK_SIZE):
+        rows = order[start:start + EXPORT_CHUNK_SIZE]
+        yield "".join(
+            json.dumps({"doc_id": doc_id_table.to_external(doc_id), "score": score}) + "\n"
+            for doc_id, score in zip(doc_ids[rows].tolist(), scores[rows].tolist())
+        )
+
+
+@router.post("/search/export")
+async def export_search_endpoint(request: ExportRequest):
+    """
+    Export search (single, multi or boolean mode): streams every match
+    (or the first `limit`) as NDJSON, one {"doc_id", "score"} object per
+    line, best first. Rows are written as they are selected, so memory
+    and time to first byte stay bounded for queries with many hits.
+    """
+    try:
+        mode, query = _page_query(request.query, request.mode)
+        if request.limit is not None and request.limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
         
+        doc_ids, scores = await _scored_documents(mode, query)
+        return StreamingResponse(_ndjson_rows(doc_ids, scores, request.limit), media_type="application/x-ndjson")
+    
+    except QueryParseError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+def _semantic_search(query: str, top_k: Optional[int], candidate_pool: int, nprobe: Optional[int]) -> List[Tuple[str, float]]:
+    """Blocking part of /search/semantic: [(external docID, score), ...]. Runs on the search pool."""
+    import numpy as np
+    
+    # Step 1: Use multi-word search to get the top candidate_pool candidates (fast)
+    keyword_results = multi_word_search(query, top_k=candidate_pool)
+    
+    if not keyword_results:
+        # No keyword matches: nearest neighbours over the whole corpus
+        results = semantic_search_query(query, top_k=top_k, glove=search_engine.get_glove(), nprobe=nprobe)
+        return [(doc_id, float(score)) for doc_id, score in results]
+    
+    # Step 2: Semantic reranking on candidates only
+    glove = search_engine.get_glove()
+    
+    # Compute query embedding
+    query_tokens = query.split()
+    query_embedding = average_embedding(query_tokens, glove)
+    
+    if query_embedding is None:
+        # Fall back to keyword results if no embeddings available
         return [
-            SearchResponse(doc_id=doc_id, score=score)
-            for doc_id, score in similarities[:request.top_k]
+            (doc_id_table.to_external(doc_id), float(score))
+            for doc_id, score in keyword_results[:top_k]
         ]
     
+    candidate_ids = np.array([doc_id for doc_id, _ in keyword_results])
+    if embedding_store.loaded and candidate_ids.dtype != object:
+        # One fancy-index gather from the packed matrix, one matmul
+        similarities = rerank_candidates(query_embedding, candidate_ids, top_k)
+    else:
+        # Unpacked embeddings: read the candidates' files, then score them together
+        # Embeddings are stored under the external string docID
+        loaded = [(doc_id, search_engine.get_embedding(doc_id_table.to_external(doc_id))) for doc_id in candidate_ids.tolist()]
+        loaded = [(doc_id, vec) for doc_id, vec in loaded if vec is not None]
+        if not loaded:
+            return []
+        matrix = normalize_rows(np.vstack([vec for _, vec in loaded]))
+        similarities = top_k_results(
+            np.array([doc_id for doc_id, _ in loaded], dtype=object),
+            matrix @ normalize_rows(query_embedding),
+            top_k,
+        )
+    
+    return [
+        (doc_id_table.to_external(doc_id), float(score))
+        for doc_id, score in similarities
+    ]
+
+
+@router.post("/search/semantic", response_model=List[SearchResponse])
+async def semantic_search_endpoint(request: SemanticRequest):
+    """
+    Hybrid semantic search: Fast keyword filter + semantic reranking.
+    Takes the top candidate_pool keyword hits, then reranks them by
+    embedding similarity in one batched matrix product.
+    Without keyword matches, searches the whole corpus through the IVF
+    ANN index (nprobe clusters).
+    """
+    try:
+        query = request.query.strip().lower()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        if request.candidate_pool is None or request.candidate_pool < 1:
+            raise HTTPException(status_code=400, detail="candidate_pool must be at least 1")
+        
+        results = await _cached_search(
+            "semantic", _semantic_search, query,
+            top_k=request.top_k, candidate_pool=request.candidate_pool, nprobe=request.nprobe,
+        )
+        return [SearchResponse(doc_id=doc_id, score=score) for doc_id, score in results]
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Semantic search error: {str(e)}")
 
 
+@router.post("/search/spelling", response_model=SpellingResponse)
+async def spelling_endpoint(request: SearchRequest):
+    """
+    Did you mean: Returns the query with unknown terms replaced by the
+    closest frequent lexicon words (edit distance <= 2), or null.
+    """
+    try:
+        query = request.query.strip().lower()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        
+        return SpellingResponse(query=query, did_you_mean=await search_pool.run(did_you_mean, query))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Spelling error: {str(e)}")
+
+
 @router.post("/autocomplete", response_model=AutocompleteResponse)
 async def autocomplete_endpoint(request: AutocompleteRequest):
     """
@@ -175,9 +609,15 @@ async def autocomplete_endpoint(request: AutocompleteRequest):
             raise HTTPException(status_code=400, detail="Prefix cannot be empty")
         
         suggestions = autocomplete_words(prefix, top_n=request.top_n)
+        if suggestions:
+            return AutocompleteResponse(suggestions=suggestions)
         
-        return AutocompleteResponse(suggestions=suggestions)
+        # No word starts with the prefix: treat it as a typo
+        corrections = await search_pool.run(spelling_suggestions, prefix, top_n=request.top_n)
+        return AutocompleteResponse(suggestions=corrections, corrected=True)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Autocomplete error: {str(e)}")
 
@@ -196,6 +636,11 @@ async def get_stats():
             "total_words": lexicon.size(),
             "total_documents": total_docs,
             "glove_vectors": len(glove),
+            "executor": pool_stats(),
+            "result_cache": result_cache.stats(),
+            "live_index": live_index.stats(),
+            "compaction": compactor.stats(),
+            "worker_pid": os.getpid(),
             "status": "operational"
         }
     
@@ -203,49 +648,63 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
 
 
+def _document_card(doc_id: str, record: dict) -> dict:
+    abstract = record["abstract"]
+    return {
+        "doc_id": doc_id,
+        "paper_id": record["paper_id"],
+        "title": record["title"] or "No title",
+        "abstract": abstract[:500] if abstract else "No abstract available"  # Limit to 500 chars
+    }
+
+
+def _document_from_file(doc_id: str) -> Optional[dict]:
+    """Slow path for documents missing from the document store: parse the JSON file."""
+    from pathlib import Path
+    
+    # Try to find the document in data/document_parses/pdf_json first (for paper hash IDs)
+    base_dir = Path(__file__).parent.parent.parent / "data" / "document_parses" / "pdf_json"
+    doc_file = base_dir / f"{doc_id}.json"
+    
+    # Fallback to sample_data if not found (for doc_X format)
+    if not doc_file.exists():
+        base_dir = Path(__file__).parent.parent.parent / "sample_data"
+        doc_file = base_dir / f"{doc_id}.json"
+    
+    if not doc_file.exists():
+        return None
+    
+    with open(doc_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    title, abstract, _ = document_fields(data)
+    return _document_card(doc_id, {"paper_id": data.get("paper_id", doc_id), "title": title, "abstract": abstract})
+
+
+def _load_documents(doc_ids: List[str]) -> List[Optional[dict]]:
+    """Cards for many external docIDs, in order: one store lookup each, files only for misses."""
+    records = doc_store.get_many([doc_id_table.get_id(doc_id) for doc_id in doc_ids])
+    return [
+        _document_card(doc_id, record) if record is not None else _document_from_file(doc_id)
+        for doc_id, record in zip(doc_ids, records)
+    ]
+
+
 @router.get("/document/{doc_id}")
 async def get_document(doc_id: str):
     """
     Get document details by ID.
+    Served from the packed document store (one index read and one record
+    read); documents not in the store fall back to their JSON file.
     """
-    import json
-    from pathlib import Path
-    
     try:
-        # Try to find the document in data/document_parses/pdf_json first (for paper hash IDs)
-        base_dir = Path(__file__).parent.parent.parent / "data" / "document_parses" / "pdf_json"
-        doc_file = base_dir / f"{doc_id}.json"
-        
-        # Fallback to sample_data if not found (for doc_X format)
-        if not doc_file.exists():
-            base_dir = Path(__file__).parent.parent.parent / "sample_data"
-            doc_file = base_dir / f"{doc_id}.json"
-        
-        if not doc_file.exists():
+        document = _load_documents([doc_id])[0]
+        if document is None:
             raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
-        
-        with open(doc_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Extract relevant fields
-        title = data.get("metadata", {}).get("title", "No title")
-        
-        # Extract abstract
-        abstract_parts = data.get("abstract", [])
-        if isinstance(abstract_parts, list):
-            abstract = " ".join([part.get("text", "") for part in abstract_parts if isinstance(part, dict)])
-        else:
-            abstract = str(abstract_parts) if abstract_parts else ""
-        
-        return {
-            "doc_id": doc_id,
-            "paper_id": data.get("paper_id", doc_id),
-            "title": title,
-            "abstract": abstract[:500] if abstract else "No abstract available"  # Limit to 500 chars
-        }
+        return document
     
     except FileNotFoundError:
-        # Document file doesn't exist - return minimal info
+        # Document file vanished between the check and the read - return minimal info
         return {
             "doc_id": doc_id,
             "paper_id": doc_id,
@@ -253,12 +712,39 @@ async def get_document(doc_id: str):
             "abstract": "Document indexed but full content not available. Only document ID is stored in the search index."
         }
     
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching document: {str(e)}")
 
 
+class DocumentsRequest(BaseModel):
+    doc_ids: List[str]
+
+
+@router.post("/documents")
+async def get_documents(request: DocumentsRequest):
+    """
+    Bulk document details for a whole results page in one call.
+    Returns {"documents": [...], "missing": [...]}; documents keep the
+    request order, unknown IDs are listed under "missing".
+    """
+    try:
+        if len(request.doc_ids) > MAX_BULK_DOCUMENTS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_DOCUMENTS} documents per request")
+        
+        documents = await search_pool.run(_load_documents, request.doc_ids)
+        return {
+            "documents": [document for document in documents if document is not None],
+            "missing": [doc_id for doc_id, document in zip(request.doc_ids, documents) if document is None],
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
+
+
 class AddDocumentRequest(BaseModel):
     paper_id: Optional[str] = None
     title: str
@@ -277,6 +763,13 @@ async def add_document(request: AddDocumentRequest):
     from pathlib import Path
     
     try:
+        if int(os.environ.get(WORKERS_ENV, "1")) > 1:
+            # Pre-forked workers each hold their own lexicon / docID table
+            raise HTTPException(
+                status_code=503,
+                detail="Document indexing is disabled in multi-worker mode; use a single-worker server to add documents",
+            )
+        
         # Create document in expected format
         doc_data = {
             "paper_id": request.paper_id or f"user_added_{int(datetime.now().timestamp())}",
@@ -289,7 +782,7 @@ async def add_document(request: AddDocumentRequest):
         
         # Index the document
         glove = search_engine.get_glove()
-        result = document_indexer.index_document(doc_data, glove_embeddings=glove)
+        result = await index_pool.run(document_indexer.index_document, doc_data, glove_embeddings=glove)
         
         if result["success"]:
             # CRITICAL: Load the new embedding into memory immediately
@@ -318,5 +811,7 @@ async def add_document(request: AddDocumentRequest):
         else:
             raise HTTPException(status_code=500, detail=result["message"])
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding document: {str(e)}")
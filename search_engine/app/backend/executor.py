@@ -0,0 +1,108 @@
+# app/backend/executor.py
+"""
+Bounded thread pools that keep blocking search and indexing work off the
+asyncio event loop.
+
+Each pool accepts at most workers + queue_size tasks at a time. Beyond
+that, run() fails fast with PoolSaturated, a 503 with a Retry-After
+header, instead of letting requests pile up behind one slow query.
+Threads rather than processes: the index singletons (lexicon, barrels,
+mmap'd matrices) are shared, and NumPy releases the GIL for the heavy parts.
+
+Sizes come from the environment:
+    SEARCH_POOL_WORKERS (4), SEARCH_POOL_QUEUE (64)
+    INDEX_POOL_WORKERS  (1), INDEX_POOL_QUEUE  (8)
+The indexing pool defaults to one worker so that document adds, which
+rewrite the lexicon and barrels, never run concurrently with each other.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from fastapi import HTTPException
+
+
+class PoolSaturated(HTTPException):
+    """Raised when a pool has no free worker or queue slot."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Server busy: {pool} pool is saturated, retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor with a bounded queue, rejection and live counters."""
+
+    def __init__(self, name: str, workers: int, queue_size: int, retry_after: int = 1):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self.in_flight = 0  # queued + running
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PoolSaturated(self.name, self.retry_after)
+            self.in_flight += 1
+
+        def task():
+            with self._lock:
+                self.running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        def done(_):
+            # Counted when the thread finishes, even if the request was cancelled
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+        future = self._pool.submit(task)
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queue_depth": self.in_flight - self.running,
+                "queue_capacity": self.queue_size,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+# Global pools: queries and document indexing never compete for the same workers
+search_pool = BoundedExecutor("search", _env_int("SEARCH_POOL_WORKERS", 4), _env_int("SEARCH_POOL_QUEUE", 64))
+index_pool = BoundedExecutor("index", _env_int("INDEX_POOL_WORKERS", 1), _env_int("INDEX_POOL_QUEUE", 8), retry_after=5)
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    return {pool.name: pool.stats() for pool in (search_pool, index_pool)}
@@ -15,6 +15,16 @@ if src_path not in sys.path:
 from semantic import load_glove  # type: ignore
 from lexicon import lexicon  # type: ignore
 from barrels import barrel_manager  # type: ignore
+from doc_ids import doc_id_table  # type: ignore
+from autocomplete import prefix_index  # type: ignore
+from spelling import spelling_index, ensure_spelling_index  # type: ignore
+from wildcard import wildcard_index  # type: ignore
+from embedding_store import embedding_store  # type: ignore
+from ann import ann_index  # type: ignore
+from quantization import quantized_embeddings  # type: ignore
+from glove_store import lexicon_glove  # type: ignore
+from doc_store import doc_store  # type: ignore
+from segments import live_index  # type: ignore
 
 class SearchEngineLoader:
     """
@@ -39,17 +49,58 @@ class SearchEngineLoader:
         lexicon.load()
         print(f"✅ Lexicon loaded: {lexicon.size()} words")
         
+        # Load docID table (dense int IDs used in postings)
+        doc_id_table.load()
+        print(f"✅ DocID table loaded: {doc_id_table.size()} documents")
+        
+        # Documents added since the barrels were built: flushed segments + WAL
+        # replay, which also restores their lexicon words, docIDs and lengths
+        live_index.load()
+        live_stats = live_index.stats()
+        print(f"✅ Live index: {live_stats['segments']} segments, {live_stats['delta_docs']} documents in memory")
+        
+        # Build the autocomplete prefix index (reads only barrel term tables)
+        print("🔤 Building autocomplete prefix index...")
+        prefix_index.build_from_lexicon()
+        
+        # Spelling ("did you mean") index is built offline by spelling.py;
+        # without it, build it now rather than inside the first request
+        if spelling_index.load():
+            print(f"✅ Spelling index memory-mapped: {len(spelling_index.word_ids)} words, {len(spelling_index.keys)} deletes")
+        else:
+            print("⚠️  Spelling index not found; building it from the lexicon...")
+            ensure_spelling_index()
+        
+        # Wildcard k-gram index is built offline by wildcard.py
+        if wildcard_index.load():
+            print(f"✅ Wildcard index loaded: {len(wildcard_index.gram_keys)} {wildcard_index.k}-grams")
+        else:
+            print("⚠️  Wildcard index not found; it will be built on the first wildcard query")
+        
+        # Titles/abstracts for result cards are packed offline by doc_store.py
+        if doc_store.load():
+            print(f"✅ Document store opened: {doc_store.size()} docID slots")
+        else:
+            print("⚠️  Document store not found; document details are read from the JSON parses")
+        
         # Load GloVe embeddings (needed for semantic search)
         print("🧠 Loading GloVe embeddings...")
         self.glove = load_glove()
         print(f"✅ GloVe loaded: {len(self.glove)} word vectors")
+        if lexicon_glove.load():
+            print(f"✅ Lexicon GloVe mapped: {len(lexicon_glove.vectors)} corpus words")
         
-        # Use lazy loading for document embeddings
+        # Packed document embeddings are memory-mapped, not read file by file
         self.embeddings_dir = Path(__file__).parent.parent.parent / "data" / "embeddings"
-        self.embeddings_cache = {}  # Cache for loaded embeddings
-        if self.embeddings_dir.exists():
-            doc_count = len(list(self.embeddings_dir.glob("*.npy")))
-            print(f"📁 Found {doc_count} document embeddings (will load on-demand)")
+        self.embeddings_cache = {}  # Cache for per-file embeddings not in the packed store
+        if embedding_store.load():
+            print(f"✅ Packed embeddings mapped: {embedding_store.size()} documents")
+            if ann_index.load():
+                print(f"✅ IVF index loaded: {len(ann_index.centroids)} lists, nprobe={ann_index.nprobe}")
+            elif quantized_embeddings.load():
+                print(f"✅ int8 embedding codes mapped: {quantized_embeddings.codes.shape[1]} dims")
+        elif self.embeddings_dir.exists():
+            print(f"📁 Per-document embeddings will load on-demand; run 'python src/semantic.py' (option 3) to pack them")
         else:
             print(f"⚠️  No embeddings found at {self.embeddings_dir}")
             print(f"   Run 'python src/main.py' to build embeddings for all documents")
@@ -57,6 +108,7 @@ class SearchEngineLoader:
         # Store references
         self.lexicon = lexicon
         self.barrel_manager = barrel_manager
+        self.doc_id_table = doc_id_table
         
         self._initialized = True
         print("✅ Search Engine ready! (startup time: <5 seconds)\n")
@@ -66,6 +118,10 @@ class SearchEngineLoader:
     
     def get_embedding(self, doc_id: str):
         """Load embedding on-demand and cache it"""
+        if embedding_store.loaded:
+            embedding = embedding_store.get(self.doc_id_table.get_id(doc_id))
+            if embedding is not None:
+                return embedding
         if doc_id in self.embeddings_cache:
             return self.embeddings_cache[doc_id]
         
@@ -79,6 +135,8 @@ class SearchEngineLoader:
     
     def get_all_doc_ids(self):
         """Get list of all document IDs (fast - just filenames)"""
+        if embedding_store.loaded:
+            return [self.doc_id_table.to_external(d) for d in embedding_store.doc_ids.tolist()]
         return [f.stem for f in self.embeddings_dir.glob("*.npy")]
     
     def get_embeddings(self):
@@ -91,8 +149,13 @@ class SearchEngineLoader:
     def get_barrel_manager(self):
         return self.barrel_manager
     
+    def get_doc_id_table(self):
+        return self.doc_id_table
+    
     def get_total_documents(self):
         """Count total documents dynamically"""
+        if embedding_store.loaded:
+            return embedding_store.size()
         return len(list(self.embeddings_dir.glob("*.npy")))
 
 
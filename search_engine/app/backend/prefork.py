@@ -0,0 +1,120 @@
+# app/backend/prefork.py
+"""
+Pre-fork multi-worker server.
+
+The parent process imports the app once, which loads every index
+(lexicon, docID table, prefix/spelling/wildcard indexes) and maps the
+large files (barrels, GloVe, embedding matrix, codes). It then binds the
+listening socket and forks N workers that all accept on it.
+
+- The mmap'd files are shared through the page cache.
+- The Python structures built before the fork are shared copy-on-write.
+  gc.freeze() keeps the garbage collector from touching, and thereby
+  copying, those pages in every worker.
+
+So resident memory stays nearly flat as workers are added.
+
+Workers serve a read-only snapshot: /document/add is refused, because
+each worker would otherwise assign wordIDs and docIDs on its own. Index
+documents with a single-worker server, then restart the pool.
+
+Usage (from search_engine/):
+    python -m app.backend.prefork --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+import uvicorn
+
+# Read by the API to refuse writes when more than one worker serves
+WORKERS_ENV = "SEARCH_ENGINE_WORKERS"
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket) -> None:
+    host, port = sock.getsockname()[:2]
+    config = uvicorn.Config(app, host=host, port=port, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(workers: int, host: str = "0.0.0.0", port: int = 8000) -> None:
+    os.environ[WORKERS_ENV] = str(workers)
+    if workers > 1 and not hasattr(os, "fork"):
+        print("⚠️  os.fork is not available on this platform; serving with one worker")
+        workers = 1
+        os.environ[WORKERS_ENV] = "1"
+
+    # Load everything once, before forking
+    from .server import app
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind(host, port)
+    if workers == 1:
+        _run_worker(app, sock)
+        return
+
+    children = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _run_worker(app, sock)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+    print(f"🚀 Serving on http://{host}:{port} with {workers} pre-forked workers (parent pid {os.getpid()})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️  Worker {pid} exited (status {status}); starting a replacement")
+            spawn()
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the search API with pre-forked workers sharing index memory.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    serve(max(1, args.workers), args.host, args.port)
+    sys.exit(0)
@@ -2,12 +2,18 @@
 """
 FastAPI server for the search engine.
 """
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from .api import router
 from .loader import search_engine
+from .executor import search_pool, index_pool
+from .prefork import WORKERS_ENV
+from segments import live_index  # type: ignore
+from compaction import compactor  # type: ignore
 
 # Create FastAPI app
 app = FastAPI(
@@ -36,6 +42,9 @@ async def startup_event():
     print("Starting AIT Search Engine API Server")
     print("=" * 60)
     # The search_engine singleton is already initialized via loader import
+    if int(os.environ.get(WORKERS_ENV, "1")) <= 1:
+        # Pre-forked workers are read-only; only a single writer compacts
+        compactor.start()
     print("Server is ready to accept requests!")
     print("=" * 60)
 
@@ -44,6 +53,13 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("\nShutting down AIT Search Engine API Server...")
+    search_pool.shutdown()
+    index_pool.shutdown()
+    # Persist the in-memory delta so the next start needs no WAL replay
+    # (pre-forked workers are read-only and leave the WAL alone)
+    if int(os.environ.get(WORKERS_ENV, "1")) <= 1:
+        compactor.stop()
+        live_index.flush()
 
 
 if __name__ == "__main__":
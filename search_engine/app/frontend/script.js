@@ -354,55 +354,70 @@ function displayResults(results, searchTime) {
         `;
     }).join('');
     
-    // Fetch document details for each result
-    results.forEach(result => fetchDocumentDetails(result.doc_id));
+    // Fetch document details for the whole page in one request
+    fetchDocumentDetails(results.map(result => result.doc_id));
 }
 
 // Fetch Document Details
-async function fetchDocumentDetails(docId) {
+async function fetchDocumentDetails(docIds) {
     try {
-        const response = await fetch(`${API_BASE_URL}/document/${docId}`);
+        const response = await fetch(`${API_BASE_URL}/documents`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ doc_ids: docIds })
+        });
         const data = await response.json();
         
-        console.log('Document data:', data); // Debug log
-        
-        const resultElement = document.getElementById(`result-${docId}`);
-        if (resultElement) {
-            const loadingDiv = resultElement.querySelector('.result-loading');
-            if (loadingDiv) {
-                loadingDiv.remove();
-            }
-            
-            // Safely extract title and abstract with fallbacks
-            const title = data.title || data.metadata?.title || 'No title available';
-            const abstract = data.abstract || 'No abstract available';
-            
-            const detailsHTML = `
-                <div class="result-details">
-                    <h3 class="result-title">${title}</h3>
-                    <p class="result-abstract">${abstract}</p>
-                </div>
-            `;
-            
-            resultElement.insertAdjacentHTML('beforeend', detailsHTML);
-            
-            // Add click event to open document in new tab
-            resultElement.addEventListener('click', (e) => {
-                console.log('Opening document:', docId);
-                window.open(`document.html?id=${docId}`, '_blank');
-            });
-            resultElement.style.cursor = 'pointer';
-            resultElement.classList.add('clickable');
-        }
+        data.documents.forEach(renderDocumentDetails);
+        data.missing.forEach(docId => showDocumentDetailsError(docId));
     } catch (error) {
-        console.error(`Failed to fetch details for ${docId}:`, error);
-        const resultElement = document.getElementById(`result-${docId}`);
-        if (resultElement) {
-            const loadingDiv = resultElement.querySelector('.result-loading');
-            if (loadingDiv) {
-                loadingDiv.innerHTML = '<em>Could not load document details</em>';
-            }
+        console.error('Failed to fetch document details:', error);
+        docIds.forEach(docId => showDocumentDetailsError(docId));
+    }
+}
+
+function showDocumentDetailsError(docId) {
+    const resultElement = document.getElementById(`result-${docId}`);
+    if (resultElement) {
+        const loadingDiv = resultElement.querySelector('.result-loading');
+        if (loadingDiv) {
+            loadingDiv.innerHTML = '<em>Could not load document details</em>';
+        }
+    }
+}
+
+// Render Document Details into its result card
+function renderDocumentDetails(data) {
+    const docId = data.doc_id;
+    const resultElement = document.getElementById(`result-${docId}`);
+    if (resultElement) {
+        const loadingDiv = resultElement.querySelector('.result-loading');
+        if (loadingDiv) {
+            loadingDiv.remove();
         }
+        
+        // Safely extract title and abstract with fallbacks
+        const title = data.title || data.metadata?.title || 'No title available';
+        const abstract = data.abstract || 'No abstract available';
+        
+        const detailsHTML = `
+            <div class="result-details">
+                <h3 class="result-title">${title}</h3>
+                <p class="result-abstract">${abstract}</p>
+            </div>
+        `;
+        
+        resultElement.insertAdjacentHTML('beforeend', detailsHTML);
+        
+        // Add click event to open document in new tab
+        resultElement.addEventListener('click', (e) => {
+            console.log('Opening document:', docId);
+            window.open(`document.html?id=${docId}`, '_blank');
+        });
+        resultElement.style.cursor = 'pointer';
+        resultElement.classList.add('clickable');
     }
 }
 
@@ -3,6 +3,7 @@
 Unified launcher for AIT Search Engine.
 Starts both backend API and frontend server simultaneously.
 """
+import argparse
 import subprocess
 import sys
 import os
@@ -56,7 +57,7 @@ def cleanup(signum=None, frame=None):
     print_colored("\n✅ Servers stopped successfully!", Colors.GREEN)
     sys.exit(0)
 
-def start_backend():
+def start_backend(workers=1):
     """Start the FastAPI backend server"""
     global backend_process
     
@@ -79,8 +80,14 @@ def start_backend():
         print_colored(f"   Warning: venv not found, using: {python_exe}\n", Colors.YELLOW)
     
     # Start uvicorn with output redirected to console
+    if workers > 1:
+        # Pre-forked workers share one copy of the loaded indexes
+        print_colored(f"   Workers: {workers} (pre-fork, read-only index)\n", Colors.BLUE)
+        command = [python_exe, "-m", "app.backend.prefork", "--workers", str(workers), "--host", "0.0.0.0", "--port", "8000"]
+    else:
+        command = [python_exe, "-m", "uvicorn", "app.backend.server:app", "--host", "0.0.0.0", "--port", "8000"]
     backend_process = subprocess.Popen(
-        [python_exe, "-m", "uvicorn", "app.backend.server:app", "--host", "0.0.0.0", "--port", "8000"],
+        command,
         cwd=search_engine_dir,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
@@ -145,6 +152,10 @@ def print_stream(process, prefix, color):
         pass
 
 def main():
+    parser = argparse.ArgumentParser(description="Start the AIT Search Engine backend and frontend.")
+    parser.add_argument("--workers", type=int, default=1, help="backend worker processes (pre-forked, sharing index memory)")
+    args = parser.parse_args()
+    
     # Register cleanup handlers
     signal.signal(signal.SIGINT, cleanup)
     signal.signal(signal.SIGTERM, cleanup)
@@ -153,7 +164,7 @@ def main():
     
     try:
         # Start backend
-        backend_proc = start_backend()
+        backend_proc = start_backend(args.workers)
         
         # Wait for backend to be ready
         if not wait_for_backend():
@@ -0,0 +1,191 @@
+# src/ann.py
+"""
+Approximate nearest-neighbour search over the packed embeddings (IVF).
+
+k-means (spherical: embeddings are L2-normalized, so assignment is by
+largest dot product) splits the corpus into n_lists clusters. Each
+cluster keeps the embedding_store rows assigned to it, as one CSR pair
+(list_offsets, list_rows). A query scores the centroids, visits the
+nprobe closest clusters and scores only their rows exactly. Raising
+nprobe trades latency for recall; evaluate() measures both against
+brute force.
+
+ivf.npz records the row count and a fingerprint of the packed docID
+order it was built over. A file that no longer matches (embeddings
+repacked since) is rejected and search falls back until it is rebuilt.
+
+Build with:  python ann.py [--lists N] [--evaluate]
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import embedding_store, normalize_rows
+from ranking import top_k_results
+
+_CHUNK = 16384  # rows scored against all centroids at once while assigning
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for every row, computed in chunks."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _CHUNK):
+        block = np.asarray(vectors[start:start + _CHUNK], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 10, sample_size: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means centroids trained on a sample of at most
+    n_lists * sample_size rows. Empty clusters are re-seeded from random rows.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample_rows = np.sort(rng.choice(n, size=min(n, n_lists * sample_size), replace=False))
+    sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = sample[rng.choice(len(sample), size=len(empty))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over embedding_store rows. search() returns
+    [(docID, cosine similarity), ...] like EmbeddingStore.search().
+    """
+
+    def __init__(self, nprobe: int = 8):
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+        self.loaded = False
+        self._load_failed = False  # remembered so queries do not retry the filesystem
+
+    @property
+    def path(self) -> str:
+        return os.path.join(embedding_store.packed_dir, "ivf.npz")
+
+    def build(self, n_lists: Optional[int] = None, iterations: int = 10) -> None:
+        """Cluster the packed embeddings; n_lists defaults to 4 * sqrt(N)."""
+        vectors = embedding_store.vectors
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("No packed embeddings to index; pack them first")
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        print(f"Training {n_lists} IVF centroids on {n} embeddings...")
+        self.centroids = kmeans(vectors, n_lists, iterations)
+        labels = _assign(vectors, self.centroids)
+        self.list_rows = np.argsort(labels, kind="stable")
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=self.list_offsets[1:])
+        self.loaded = True
+
+    def save(self) -> None:
+        np.savez(self.path, centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows,
+                 n_rows=len(embedding_store.doc_ids), fingerprint=embedding_store.fingerprint())
+        self._load_failed = False
+
+    def load(self) -> bool:
+        self.loaded = False
+        self._load_failed = True
+        if not os.path.exists(self.path):
+            return False
+        data = np.load(self.path)
+        if ("n_rows" not in data or int(data["n_rows"]) != len(embedding_store.doc_ids)
+                or int(data["fingerprint"]) != embedding_store.fingerprint()):
+            print(f"⚠️  {self.path} does not match the packed embeddings; rebuild it (python ann.py)")
+            return False
+        self.centroids = data["centroids"]
+        self.list_offsets, self.list_rows = data["list_offsets"], data["list_rows"]
+        self._load_failed = False
+        self.loaded = True
+        return True
+
+    def ready(self) -> bool:
+        """Loaded, trying load() once rather than on every query."""
+        if not self.loaded and not self._load_failed:
+            self.load()
+        return self.loaded
+
+    def invalidate(self) -> None:
+        """Delete the index (its rows no longer match the packed embeddings)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+        self.loaded = False
+        self._load_failed = True
+
+    def candidate_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """embedding_store rows in the nprobe clusters closest to query."""
+        n_lists = len(self.centroids)
+        nprobe = min(max(1, nprobe), n_lists)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < n_lists else np.arange(n_lists)
+        return np.concatenate([self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe])
+
+    def search(self, query_vec: np.ndarray, top_k: Optional[int] = 10, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        query = normalize_rows(query_vec)
+        rows = np.sort(self.candidate_rows(query, nprobe or self.nprobe))
+        doc_ids = np.asarray(embedding_store.doc_ids[rows])
+        scores = np.asarray(embedding_store.vectors[rows]) @ query
+        if embedding_store.extra_ids:
+            # Documents embedded after the build are few; score them all
+            doc_ids = np.concatenate((doc_ids, np.array(embedding_store.extra_ids, dtype=np.int64)))
+            scores = np.concatenate((scores, np.vstack(embedding_store.extra_vectors) @ query))
+        return top_k_results(doc_ids, scores, top_k)
+
+    def evaluate(self, n_queries: int = 200, top_k: int = 10, nprobes=(1, 2, 4, 8, 16, 32), seed: int = 1) -> None:
+        """Print recall@top_k and mean latency per nprobe against brute-force search."""
+        rng = np.random.default_rng(seed)
+        n = len(embedding_store.vectors)
+        # Perturbed corpus vectors stand in for queries
+        rows = rng.choice(n, size=min(n_queries, n), replace=False)
+        queries = normalize_rows(np.asarray(embedding_store.vectors[np.sort(rows)]) + rng.normal(0, 0.05, (len(rows), embedding_store.dim())))
+
+        start = time.perf_counter()
+        exact = [{d for d, _ in embedding_store.search(q, top_k)} for q in queries]
+        brute_ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"brute force: {brute_ms:.2f} ms/query")
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            found = [{d for d, _ in self.search(q, top_k, nprobe)} for q in queries]
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = np.mean([len(f & e) / max(1, len(e)) for f, e in zip(found, exact)])
+            print(f"nprobe={nprobe:<4} recall@{top_k}={recall:.3f}  {ms:.2f} ms/query")
+
+
+# Global ANN index over the packed embeddings
+ann_index = IVFIndex()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the IVF ANN index over the packed embeddings.")
+    parser.add_argument("--lists", type=int, default=None, help="number of k-means clusters (default 4*sqrt(N))")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--evaluate", action="store_true", help="report recall/latency per nprobe")
+    args = parser.parse_args()
+
+    if embedding_store.load():
+        ann_index.build(args.lists, args.iterations)
+        ann_index.save()
+        print(f"✅ Saved IVF index to {ann_index.path}")
+        if args.evaluate:
+            ann_index.evaluate()
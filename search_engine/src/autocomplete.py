@@ -1,24 +1,163 @@
 # src/autocomplete.py
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from barrels import barrel_manager
 from lexicon import lexicon
+from ranking import top_k_results
 
-def get_autocomplete_suggestions(prefix, top_n=10):
+
+class PrefixIndex:
     """
-    Returns a list of autocomplete suggestions from the lexicon.
+    Prefix lookup over the lexicon, ranked by document frequency.
+
+    Words are kept in one sorted list, so every prefix maps to a contiguous
+    [lo, hi) range found with two bisects. For short prefixes (up to
+    precompute_depth characters), where ranges are huge, the top
+    completions are precomputed once at build time. Longer prefixes select
+    the best few from their (small) range in linear time.
+
+    Documents added after build() raise the dfs of their words. Those
+    words (new or not) are kept in a small sorted overflow list with their
+    current dfs. A prefix merges only the overflow words in its own bisect
+    range, and since dfs only grow, the precomputed tops plus those words
+    still contain the true best completions. Once the overflow holds
+    max_recent words it is folded into the sorted base list, and only the
+    precomputed tops of its words' prefixes are refreshed.
     """
-    prefix = prefix.lower()
-    matches = []
 
-    # Use lexicon.word_to_id keys
-    for word in lexicon.word_to_id.keys():
-        if word.startswith(prefix):
-            # Rank by wordID (higher IDs first) or frequency if available
-            matches.append((word, lexicon.get_id(word)))
+    def __init__(self, precompute_depth: int = 3, precompute_n: int = 10, max_recent: int = 1024):
+        self.precompute_depth = precompute_depth
+        self.precompute_n = precompute_n
+        self.max_recent = max_recent
+        self.words: List[str] = []
+        self.dfs = np.zeros(0, dtype=np.int64)
+        self.top: Dict[str, List[str]] = {}
+        self.recent: List[str] = []  # sorted words whose df changed since build()
+        self.recent_dfs: Dict[str, int] = {}
+        self.built = False
+        self._lock = threading.Lock()  # add_document() may fold the overflow while suggest() runs
+
+    def build(self, words: List[str], dfs: np.ndarray) -> None:
+        order = sorted(range(len(words)), key=words.__getitem__)
+        self.words = [words[i] for i in order]
+        self.dfs = np.asarray(dfs, dtype=np.int64)[order]
+        self.top = {}
+        self.recent, self.recent_dfs = [], {}
+
+        # One pass per depth: sorted words make every prefix a contiguous run
+        for depth in range(1, self.precompute_depth + 1):
+            start = 0
+            while start < len(self.words):
+                prefix = self.words[start][:depth]
+                if len(prefix) < depth:
+                    # Shorter word: it sorts first in its range, the next word starts the run
+                    start += 1
+                    continue
+                end = self._range_end(prefix, start)
+                self.top[prefix] = self._best(start, end, self.precompute_n)
+                start = end
+        self.built = True
+
+    def build_from_lexicon(self) -> None:
+        """Build from the global lexicon, with dfs read from the barrel term tables."""
+        max_word_id = max(lexicon.id_to_word.keys(), default=0)
+        dfs = barrel_manager.document_frequencies(max_word_id)
+        words = list(lexicon.word_to_id.keys())
+        self.build(words, dfs[[lexicon.word_to_id[w] for w in words]])
+        print(f"Prefix index built: {len(self.words)} words, {len(self.top)} precomputed prefixes")
+
+    def add_document(self, words: Iterable[str]) -> None:
+        """Count one document added after build() that contains each of words (unique)."""
+        with self._lock:
+            for word in words:
+                if word not in self.recent_dfs:
+                    insort(self.recent, word)
+                self.recent_dfs[word] = self._df(word) + 1
+            if len(self.recent) >= self.max_recent:
+                self._fold_recent()
+
+    def _fold_recent(self) -> None:
+        """Merge the overflow words into the sorted base list and refresh the tops they can change."""
+        # dfs only grow, so a prefix's old top plus its overflow words still holds its new top
+        prefixes = {w[:depth] for w in self.recent for depth in range(1, min(len(w), self.precompute_depth) + 1)}
+        for prefix in prefixes:
+            lo = bisect_left(self.recent, prefix)
+            hi = bisect_left(self.recent, prefix + "\uffff", lo)
+            df = {w: self._df(w) for w in self.top.get(prefix, []) + self.recent[lo:hi]}
+            self.top[prefix] = sorted(df, key=lambda w: (-df[w], w))[:self.precompute_n]
+
+        new_words = [w for w in self.recent if self._base_row(w) is None]
+        if new_words:
+            # Two sorted runs: the sorts below are linear merges
+            merged = self.words + new_words
+            order = sorted(range(len(merged)), key=merged.__getitem__)
+            self.words = [merged[i] for i in order]
+            self.dfs = np.concatenate((self.dfs, np.zeros(len(new_words), dtype=np.int64)))[order]
+        for word in self.recent:
+            self.dfs[self._base_row(word)] = self.recent_dfs[word]
+        self.recent, self.recent_dfs = [], {}
 
-    # Sort by ID descending
-    matches.sort(key=lambda x: x[1], reverse=True)
+    def _range_end(self, prefix: str, lo: int) -> int:
+        # Every word with this prefix sorts before prefix + a char above any letter
+        return bisect_left(self.words, prefix + "\uffff", lo)
 
-    # Return top_n words
-    return [word for word, _ in matches[:top_n]]
+    def _best(self, lo: int, hi: int, n: int) -> List[str]:
+        # Ties fall back to alphabetical order (position in the sorted list)
+        best = top_k_results(np.arange(lo, hi), self.dfs[lo:hi], n)
+        return [self.words[i] for i, _ in best]
+
+    def suggest(self, prefix: str, top_n: int = 10) -> List[str]:
+        """Up to top_n words starting with prefix, most frequent first."""
+        if not prefix or top_n <= 0:
+            return []
+        with self._lock:
+            return self._suggest(prefix, top_n)
+
+    def _suggest(self, prefix: str, top_n: int) -> List[str]:
+        if top_n <= self.precompute_n and prefix in self.top:
+            matches = self.top[prefix][:top_n]
+        else:
+            lo = bisect_left(self.words, prefix)
+            matches = self._best(lo, self._range_end(prefix, lo), top_n)
+
+        lo = bisect_left(self.recent, prefix)
+        hi = bisect_left(self.recent, prefix + "\uffff", lo)
+        if hi > lo:
+            df = {w: self._df(w) for w in matches}
+            df.update((w, self.recent_dfs[w]) for w in self.recent[lo:hi])
+            matches = sorted(df, key=lambda w: (-df[w], w))[:top_n]
+        return matches
+
+    def _df(self, word: str) -> int:
+        """Current df of a word: counted since build(), else from the build (0 if unknown)."""
+        df = self.recent_dfs.get(word)
+        if df is not None:
+            return df
+        i = self._base_row(word)
+        return 0 if i is None else int(self.dfs[i])
+
+    def _base_row(self, word: str):
+        """Row of a word in the sorted base list, or None."""
+        i = bisect_left(self.words, word)
+        return i if i < len(self.words) and self.words[i] == word else None
+
+
+# Global prefix index, built on first use
+prefix_index = PrefixIndex()
+
+
+def get_autocomplete_suggestions(prefix, top_n=10):
+    """
+    Returns a list of autocomplete suggestions from the lexicon,
+    most frequent (by document frequency) first.
+    """
+    if not prefix_index.built:
+        prefix_index.build_from_lexicon()
+    return prefix_index.suggest(prefix.lower(), top_n)
 
 
 # Example usage
@@ -1,7 +1,166 @@
 # src/barrels.py
 import json
+import mmap
 import os
-from typing import Dict, List, Union
+import struct
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from postings import PostingList
+from ranking import bm25
+
+DocKey = Union[int, str]
+Postings = Union[List[DocKey], Dict[DocKey, List[int]]]
+
+# Binary barrel layout (barrel_N.bin):
+#   header      : magic, format version, payload codec, term count
+#   term table  : one TERM_TABLE_DTYPE row per word, sorted by word_id
+#   payload     : per-term postings, addressed by (offset, length) from the table
+# Version 1 files have no codec field and always hold JSON payloads.
+# Version 3 stored a per-term BM25 upper bound, which went stale as soon
+# as N or avgdl changed; version 4 stores the term's largest tf instead,
+# and the bound is derived at query time (BM25.term_bound).
+BINARY_MAGIC = b"AITB"
+BINARY_VERSION = 4
+CODEC_JSON = 0        # compact JSON of the posting value (legacy string docIDs)
+CODEC_COMPRESSED = 1  # postings.PostingList encoding (int docIDs)
+BINARY_HEADER = struct.Struct("<4sHHII")
+TERM_TABLE_DTYPE = np.dtype([
+    ("word_id", "<u4"),
+    ("df", "<u4"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("max_tf", "<u4"),
+])
+TERM_TABLE_DTYPE_V3 = np.dtype([
+    ("word_id", "<u4"),
+    ("df", "<u4"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("max_score", "<f4"),
+])
+TERM_TABLE_DTYPE_V2 = np.dtype([
+    ("word_id", "<u4"),
+    ("df", "<u4"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+
+
+def _normalize_postings(postings):
+    """
+    JSON object keys are always strings, so {docID: positions} written with
+    int docIDs comes back as {"17": [...]}. Restore the int keys; legacy
+    string docIDs (CORD-19 hashes, doc_N) are left as they are.
+    """
+    if isinstance(postings, dict):
+        return {int(doc) if doc.isdigit() else doc: pos for doc, pos in postings.items()}
+    return postings
+
+
+def _int_doc_ids(postings: Union[Postings, PostingList]) -> bool:
+    if isinstance(postings, PostingList):
+        return postings.doc_ids.dtype != object
+    return all(isinstance(doc, (int, np.integer)) for doc in postings)
+
+
+def write_binary_barrel(path: str, data: Dict[int, Union[Postings, PostingList]],
+                        before_replace: Optional[Callable[[], None]] = None) -> None:
+    """
+    Write {wordID: postings} in the binary barrel format (header, sorted
+    term table, payloads) to path, atomically. Also used for the immutable
+    segment files of segments.py, whose merges pass PostingList values.
+    before_replace runs just before the finished file is moved into place.
+    """
+    word_ids = sorted(int(wid) for wid in data.keys())
+    values = [data[wid] if wid in data else data[str(wid)] for wid in word_ids]
+    # Delta/varint compression needs int docIDs; legacy string IDs stay JSON
+    codec = CODEC_COMPRESSED if all(_int_doc_ids(postings) for postings in values) else CODEC_JSON
+
+    table = np.zeros(len(word_ids), dtype=TERM_TABLE_DTYPE)
+    payloads = []
+    offset = BINARY_HEADER.size + table.nbytes
+    for i, (wid, postings) in enumerate(zip(word_ids, values)):
+        plist = postings if isinstance(postings, PostingList) else PostingList.from_postings(postings)
+        if codec == CODEC_COMPRESSED:
+            payload = plist.encode()
+        else:
+            raw = plist.to_postings() if postings is plist else postings
+            payload = json.dumps(raw, separators=(",", ":")).encode("utf-8")
+        max_tf = int(plist.tfs.max()) if len(plist) else 0
+        table[i] = (wid, len(postings), offset, len(payload), max_tf)
+        payloads.append(payload)
+        offset += len(payload)
+
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, codec, len(word_ids), 0))
+            f.write(table.tobytes())
+            for payload in payloads:
+                f.write(payload)
+        if before_replace is not None:
+            before_replace()
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class _MappedBarrel:
+    """A read-only memory map of one binary barrel plus its term table."""
+
+    def __init__(self, path: str):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, codec, n_terms, _ = BINARY_HEADER.unpack_from(self.mm, 0)
+        if magic != BINARY_MAGIC or version not in (1, 2, 3, BINARY_VERSION):
+            self.mm.close()
+            raise ValueError(f"unsupported barrel header {magic!r} v{version}")
+        self.codec = CODEC_JSON if version == 1 else codec
+        # Version 3 bounds are ignored: they used write-time corpus statistics
+        self.has_max_tf = version >= 4
+        dtype = {3: TERM_TABLE_DTYPE_V3, BINARY_VERSION: TERM_TABLE_DTYPE}.get(version, TERM_TABLE_DTYPE_V2)
+        self.table = np.frombuffer(self.mm, dtype=dtype, count=n_terms, offset=BINARY_HEADER.size)
+        self.word_ids = self.table["word_id"]
+
+    def find(self, word_id: int) -> int:
+        """Return the table row for word_id, or -1 if the word is not in this barrel."""
+        idx = int(np.searchsorted(self.word_ids, word_id))
+        if idx < len(self.word_ids) and self.word_ids[idx] == word_id:
+            return idx
+        return -1
+
+    def read(self, idx: int) -> bytes:
+        row = self.table[idx]
+        start = int(row["offset"])
+        return self.mm[start:start + int(row["length"])]
+
+    def posting_list(self, idx: int) -> PostingList:
+        if self.codec == CODEC_COMPRESSED:
+            return PostingList.decode(self.read(idx))
+        return PostingList.from_postings(self.postings(idx))
+
+    def postings(self, idx: int) -> Postings:
+        if self.codec == CODEC_COMPRESSED:
+            return PostingList.decode(self.read(idx)).to_postings()
+        return _normalize_postings(json.loads(self.read(idx)))
+
+    def close(self) -> None:
+        # Drop the numpy views first so the mmap has no exported buffers left
+        self.table = None
+        self.word_ids = None
+        try:
+            self.mm.close()
+        except BufferError:
+            # A caller still holds a view; the map is released once it is collected
+            pass
+
 
 class Barrel:
     """
@@ -10,6 +169,16 @@ class Barrel:
     Supports:
     - Old barrels: wordID → [docID, docID, ...]
     - New barrels: wordID → {docID: [pos1, pos2, ...], ...}
+
+    DocIDs are dense ints from doc_ids.DocIdTable; barrels built before
+    the table existed still hold the original string IDs.
+
+    Each barrel is stored either as barrel_N.json or as a binary
+    barrel_N.bin with a per-term offset table. When both exist the
+    binary file wins; single-term lookups go through load_postings() /
+    get_postings(), which memory-map the binary file and decode only that
+    term. Binary barrels with int docIDs use the compressed encoding from
+    postings.py, so ranking never has to decode positions.
     """
 
     def __init__(self, barrel_dir: str = None, barrel_size: int = 100000):
@@ -17,6 +186,10 @@ class Barrel:
             barrel_dir = os.path.join(os.path.dirname(__file__), "..", "data", "barrels")
         self.barrel_dir = barrel_dir
         self.barrel_size = barrel_size
+        self._mapped: Dict[int, _MappedBarrel] = {}
+        # Postings added since the barrels were built (segments.LiveIndex);
+        # every lookup below merges them in when attached
+        self.live = None
         os.makedirs(self.barrel_dir, exist_ok=True)
 
     def get_barrel_id(self, word_id: int) -> int:
@@ -26,8 +199,13 @@ class Barrel:
     def get_barrel_path(self, barrel_id: int) -> str:
         return os.path.join(self.barrel_dir, f"barrel_{barrel_id}.json")
 
-    def load_barrel(self, barrel_id: int) -> Dict[int, Union[List[str], Dict[str, List[int]]]]:
+    def get_binary_barrel_path(self, barrel_id: int) -> str:
+        return os.path.join(self.barrel_dir, f"barrel_{barrel_id}.bin")
+
+    def load_barrel(self, barrel_id: int) -> Dict[int, Postings]:
         """Load a barrel; keys are ints, values can be list or dict."""
+        if self._get_mapped(barrel_id) is not None:
+            return self.load_binary_barrel(barrel_id)
         path = self.get_barrel_path(barrel_id)
         if not os.path.exists(path):
             return {}
@@ -35,7 +213,7 @@ class Barrel:
             with open(path, "r", encoding="utf-8") as f:
                 data = json.load(f)
             # Convert keys to int for safe lookup
-            return {int(k): v for k, v in data.items()}
+            return {int(k): _normalize_postings(v) for k, v in data.items()}
         except (json.JSONDecodeError, ValueError) as e:
             print(f"⚠️  Warning: Barrel {barrel_id} corrupted ({str(e)[:100]}). Creating backup and starting fresh.")
             # Backup corrupted file
@@ -45,7 +223,11 @@ class Barrel:
                 shutil.copy2(path, backup_path)
             return {}
 
-    def save_barrel(self, barrel_id: int, data: Dict[int, Union[List[str], Dict[str, List[int]]]]) -> None:
+    def save_barrel(self, barrel_id: int, data: Dict[int, Postings]) -> None:
+        # Keep whichever format this barrel is already stored in
+        if os.path.exists(self.get_binary_barrel_path(barrel_id)):
+            self.save_binary_barrel(barrel_id, data)
+            return
         path = self.get_barrel_path(barrel_id)
         try:
             # Write to temporary file first, then rename (atomic operation)
@@ -62,7 +244,188 @@ class Barrel:
                 os.remove(temp_path)
             raise
 
-    def add_docID(self, word_id: int, doc_id: str, position: int = None) -> None:
+    def save_binary_barrel(self, barrel_id: int, data: Dict[int, Postings]) -> None:
+        """Write a barrel in the binary format: header, sorted term table, then postings."""
+        path = self.get_binary_barrel_path(barrel_id)
+        try:
+            write_binary_barrel(path, data, before_replace=lambda: self._release_mapped(barrel_id))
+        except Exception as e:
+            print(f"⚠️  Error saving binary barrel {barrel_id}: {str(e)}")
+            raise
+
+    def load_binary_barrel(self, barrel_id: int) -> Dict[int, Postings]:
+        """Decode a whole binary barrel into the same dict shape as load_barrel()."""
+        mapped = self._get_mapped(barrel_id)
+        if mapped is None:
+            return {}
+        return {int(mapped.word_ids[i]): mapped.postings(i) for i in range(len(mapped.word_ids))}
+
+    def load_postings(self, word_id: int) -> Optional[Postings]:
+        """
+        Return the postings of a single word, or None if it has none.
+        Binary barrels are memory-mapped and only this word's bytes are decoded;
+        JSON barrels fall back to a full load_barrel().
+        """
+        barrel_id = self.get_barrel_id(word_id)
+        mapped = self._get_mapped(barrel_id)
+        if mapped is None:
+            return self.load_barrel(barrel_id).get(word_id)
+        idx = mapped.find(word_id)
+        if idx < 0:
+            return None
+        return mapped.postings(idx)
+
+    def get_df(self, word_id: int) -> int:
+        """
+        Document frequency of a word. For binary barrels this is read from
+        the term table without decoding any postings, unless the live index
+        also has the word: then the base docIDs are decoded so a document
+        added again is counted once.
+        """
+        if self.live is not None and self.live.live_list(word_id) is not None:
+            return self.live.df(word_id, self._base_postings(word_id))
+        barrel_id = self.get_barrel_id(word_id)
+        mapped = self._get_mapped(barrel_id)
+        if mapped is None:
+            postings = self.load_barrel(barrel_id).get(word_id)
+            return len(postings) if postings else 0
+        idx = mapped.find(word_id)
+        return int(mapped.table["df"][idx]) if idx >= 0 else 0
+
+    def document_frequencies(self, max_word_id: int) -> np.ndarray:
+        """
+        df of every wordID in 1..max_word_id as an array indexed by wordID.
+        Binary barrels only read their term tables; JSON barrels are loaded.
+        """
+        dfs = np.zeros(max_word_id + 1, dtype=np.int64)
+        for barrel_id in range(self.get_barrel_id(max_word_id) + 1):
+            mapped = self._get_mapped(barrel_id)
+            if mapped is not None:
+                word_ids = mapped.word_ids.astype(np.int64)
+                inside = word_ids <= max_word_id
+                dfs[word_ids[inside]] = mapped.table["df"][inside]
+                continue
+            for word_id, postings in self.load_barrel(barrel_id).items():
+                if word_id <= max_word_id:
+                    dfs[word_id] = len(postings)
+        if self.live is not None:
+            for word_id in self.live.word_ids().tolist():
+                if word_id <= max_word_id:
+                    dfs[word_id] = self.get_df(word_id)
+        return dfs
+
+    def get_max_score(self, word_id: int) -> float:
+        """
+        Upper bound of the word's BM25 contribution, used for dynamic pruning:
+        its largest tf under the current idf, N and avgdl (BM25.term_bound).
+        """
+        return bm25.term_bound(self.get_max_tf(word_id), self.get_df(word_id))
+
+    def get_max_tf(self, word_id: int) -> int:
+        """
+        Largest term frequency of a word in any document. Read from the
+        term table when the barrel stores it, else taken from the postings.
+        """
+        barrel_id = self.get_barrel_id(word_id)
+        mapped = self._get_mapped(barrel_id)
+        if mapped is not None and mapped.has_max_tf:
+            idx = mapped.find(word_id)
+            max_tf = int(mapped.table["max_tf"][idx]) if idx >= 0 else 0
+        else:
+            postings = self._base_postings(word_id)
+            max_tf = int(postings.tfs.max()) if postings is not None and len(postings) else 0
+        if self.live is not None:
+            # The largest tf of a union is the largest of its parts
+            max_tf = max(max_tf, self.live.max_tf(word_id))
+        return max_tf
+
+    def get_postings(self, word_id: int) -> Optional[PostingList]:
+        """
+        Return a word's postings as sorted docID / frequency arrays, or None.
+        Positions stay encoded until PostingList.positions() is called.
+        """
+        postings = self._base_postings(word_id)
+        if self.live is not None:
+            return self.live.merge(word_id, postings)
+        return postings
+
+    def _base_postings(self, word_id: int) -> Optional[PostingList]:
+        """get_postings() from the barrels alone."""
+        barrel_id = self.get_barrel_id(word_id)
+        mapped = self._get_mapped(barrel_id)
+        if mapped is None:
+            postings = self.load_barrel(barrel_id).get(word_id)
+            return PostingList.from_postings(postings) if postings else None
+        idx = mapped.find(word_id)
+        if idx < 0:
+            return None
+        return mapped.posting_list(idx)
+
+    def fetch_terms(self, word_ids) -> Dict[int, Tuple[PostingList, float]]:
+        """
+        {wordID: (PostingList, BM25 upper bound)} for many words at once.
+        Words are grouped by barrel so each barrel is opened (or, for JSON
+        barrels, loaded) once however many words it serves. Words without
+        postings are left out.
+        """
+        word_ids = set(word_ids)
+        by_barrel: Dict[int, List[int]] = {}
+        for word_id in sorted(word_ids):
+            by_barrel.setdefault(self.get_barrel_id(word_id), []).append(word_id)
+
+        terms = {}
+        for barrel_id, barrel_word_ids in by_barrel.items():
+            mapped = self._get_mapped(barrel_id)
+            if mapped is None:
+                barrel = self.load_barrel(barrel_id)
+                for word_id in barrel_word_ids:
+                    postings = barrel.get(word_id)
+                    if postings:
+                        terms[word_id] = PostingList.from_postings(postings)
+                continue
+            for word_id in barrel_word_ids:
+                idx = mapped.find(word_id)
+                if idx >= 0:
+                    terms[word_id] = mapped.posting_list(idx)
+
+        if self.live is not None:
+            for word_id in word_ids:
+                if self.live.live_list(word_id) is not None:
+                    terms[word_id] = self.live.merge(word_id, terms.get(word_id))
+        # max_tf comes from the term table, so the frequencies can stay encoded
+        return {
+            word_id: (posting_list, bm25.term_bound(self.get_max_tf(word_id), len(posting_list)))
+            for word_id, posting_list in terms.items() if len(posting_list)
+        }
+
+    def _get_mapped(self, barrel_id: int) -> Optional[_MappedBarrel]:
+        """Return the cached memory map for a binary barrel, reopening it if the file changed."""
+        path = self.get_binary_barrel_path(barrel_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._release_mapped(barrel_id)
+            return None
+
+        mapped = self._mapped.get(barrel_id)
+        if mapped is not None and mapped.signature == (stat.st_mtime_ns, stat.st_size):
+            return mapped
+
+        self._release_mapped(barrel_id)
+        try:
+            mapped = _MappedBarrel(path)
+        except (ValueError, struct.error) as e:
+            print(f"⚠️  Warning: Binary barrel {barrel_id} unreadable ({str(e)[:100]}). Falling back to JSON.")
+            return None
+        self._mapped[barrel_id] = mapped
+        return mapped
+
+    def _release_mapped(self, barrel_id: int) -> None:
+        mapped = self._mapped.pop(barrel_id, None)
+        if mapped is not None:
+            mapped.close()
+
+    def add_docID(self, word_id: int, doc_id: Union[int, str], position: int = None) -> None:
         """
         Add a docID and optional position to the correct barrel.
         If position is None, store as old-style list of docIDs.
@@ -0,0 +1,113 @@
+# src/bench_postings.py
+"""
+Microbenchmark for the compressed posting codec (postings.py).
+
+Reports encoded size against the JSON barrel representation and the
+decode cost with and without positions, on synthetic posting lists and
+optionally on every term of an existing barrel directory.
+
+    python search_engine/src/bench_postings.py
+    python search_engine/src/bench_postings.py --barrel-dir search_engine/data/barrels
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from barrels import Barrel
+from postings import PostingList
+
+
+def synthetic_postings(n_docs: int, corpus_size: int, rng: np.random.Generator) -> dict:
+    """{docID: [positions]} with a skewed frequency distribution, like a real term."""
+    docs = np.sort(rng.choice(corpus_size, size=n_docs, replace=False))
+    tfs = np.minimum(rng.zipf(1.8, size=n_docs), 200)
+    return {
+        int(doc): np.sort(rng.choice(5000, size=int(tf), replace=False)).tolist()
+        for doc, tf in zip(docs, tfs)
+    }
+
+
+def time_call(fn, repeat: int) -> float:
+    """Best-of-3 mean seconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def bench_list(name: str, postings: dict, repeat: int) -> None:
+    json_bytes = json.dumps(postings, indent=2).encode("utf-8")
+    encoded = PostingList.from_postings(postings).encode()
+
+    def decode_ranked():
+        PostingList.decode(encoded)
+
+    def decode_with_positions():
+        plist = PostingList.decode(encoded)
+        plist.positions(len(plist) - 1)
+
+    def parse_json():
+        json.loads(json_bytes)
+
+    t_json = time_call(parse_json, repeat)
+    t_ranked = time_call(decode_ranked, repeat)
+    t_positions = time_call(decode_with_positions, repeat)
+    print(
+        f"{name:<18} docs={len(postings):>7,}  json={len(json_bytes):>11,}B  "
+        f"encoded={len(encoded):>10,}B  ratio={len(json_bytes) / max(len(encoded), 1):5.1f}x  |  "
+        f"json.loads={t_json * 1e3:8.3f}ms  decode={t_ranked * 1e3:7.3f}ms  "
+        f"+positions={t_positions * 1e3:7.3f}ms"
+    )
+
+
+def bench_barrels(barrel_dir: str, barrel_size: int) -> None:
+    """Whole-barrel totals for an existing (JSON or binary) barrel directory."""
+    barrel = Barrel(barrel_dir=barrel_dir, barrel_size=barrel_size)
+    barrel_id = 0
+    total_json = total_encoded = 0
+    decode_time = 0.0
+    while True:
+        data = barrel.load_barrel(barrel_id)
+        if not data:
+            break
+        for postings in data.values():
+            plist = PostingList.from_postings(postings)
+            if plist.doc_ids.dtype == object:
+                print("Barrels still use string docIDs; rebuild with build_indexes.py first.")
+                return
+            encoded = plist.encode()
+            total_json += len(json.dumps(postings, indent=2))
+            total_encoded += len(encoded)
+            start = time.perf_counter()
+            PostingList.decode(encoded)
+            decode_time += time.perf_counter() - start
+        print(f"Barrel {barrel_id}: {len(data)} terms")
+        barrel_id += 1
+
+    if total_encoded:
+        print(
+            f"\nTotal: json={total_json:,}B  encoded={total_encoded:,}B  "
+            f"ratio={total_json / total_encoded:.1f}x  decode all terms={decode_time:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Posting codec microbenchmark")
+    parser.add_argument("--barrel-dir", help="Also measure every term of this barrel directory")
+    parser.add_argument("--barrel-size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print("Synthetic posting lists (corpus of 60,000 docs):")
+    for n_docs in (10, 1_000, 10_000, 50_000):
+        bench_list(f"df={n_docs}", synthetic_postings(n_docs, 60_000, rng), args.repeat)
+
+    if args.barrel_dir:
+        print(f"\nBarrels in {args.barrel_dir}:")
+        bench_barrels(args.barrel_dir, args.barrel_size)
@@ -1,11 +1,21 @@
 # src/build_barrel.py
 
+import argparse
 import json
 import os
-from barrels import Barrel
+from barrels import Barrel, _normalize_postings
 
 INVERTED_INDEX_PATH = "search_engine/data/inverted_index.json"
 
+parser = argparse.ArgumentParser(description="Split the inverted index into barrels.")
+parser.add_argument(
+    "--format",
+    choices=["json", "binary"],
+    default="json",
+    help="json: barrel_N.json (legacy); binary: memory-mappable barrel_N.bin with a per-term offset table",
+)
+args = parser.parse_args()
+
 barrel = Barrel(barrel_dir="search_engine/data/barrels", barrel_size=100000)
 
 # Load inverted index
@@ -23,18 +33,19 @@ for fname in os.listdir(barrel.barrel_dir):
 print("Old barrels cleared.\n")
 
 # Step 2: In-memory barrel groups
-barrel_groups = {}  # barrel_id -> {word: posting_list}
+barrel_groups = {}  # barrel_id -> {word: {docID: [positions]} or [docIDs]}
 
 total_words = len(inverted_index)
 
-for i, (wid_str, doc_ids) in enumerate(inverted_index.items(), start=1):
+for i, (wid_str, postings) in enumerate(inverted_index.items(), start=1):
     wid = int(wid_str)
     bid = barrel.get_barrel_id(wid)
 
     if bid not in barrel_groups:
         barrel_groups[bid] = {}
 
-    barrel_groups[bid][wid] = doc_ids
+    # JSON turned the int docID keys into strings; the binary writer needs them back
+    barrel_groups[bid][wid] = _normalize_postings(postings)
 
     # Progress every 50,000 words (fast)
     if i % 50000 == 0:
@@ -44,7 +55,10 @@ print("Finished grouping into barrels.")
 
 # Step 3: write each barrel once
 for bid, data in barrel_groups.items():
-    barrel.save_barrel(bid, data)
-    print(f"Saved barrel {bid} with {len(data)} entries")
+    if args.format == "binary":
+        barrel.save_binary_barrel(bid, data)
+    else:
+        barrel.save_barrel(bid, data)
+    print(f"Saved {args.format} barrel {bid} with {len(data)} entries")
 
 print("\nAll barrels built successfully (FAST MODE).")
@@ -3,6 +3,7 @@
 import os
 import json
 from lexicon import Lexicon
+from doc_ids import DocIdTable
 from forward_index import ForwardIndex
 from inverted_index import InvertedIndex
 
@@ -35,14 +36,17 @@ lex.build(list(tokenized_docs.values()))
 lex.save("search_engine/data/lexicon.json")
 print(f"Lexicon saved. {len(lex.word_to_id)} unique words.")
 
-# 3. Build forward index
+# 3. Build forward index (assigns dense int docIDs)
+doc_ids = DocIdTable()
 fwd = ForwardIndex()
-fwd.build(tokenized_docs, lex)
+fwd.build(tokenized_docs, lex, doc_ids)
 fwd.save()
+fwd.save_doc_lengths()
+doc_ids.save("search_engine/data/doc_ids.json")
 print(f"Forward index saved. {len(fwd.index)} documents indexed.")
 
 # 4. Build inverted index
 inv = InvertedIndex()
-inv.build(fwd.index)
+inv.build(fwd.index, fwd.positions)
 inv.save()
 print(f"Inverted index saved. {len(inv.index)} unique word IDs mapped.")
@@ -0,0 +1,220 @@
+# src/compaction.py
+"""
+Background compaction of the live index's segment files (segments.py).
+
+Every flush adds a segment, and every term lookup visits every segment.
+Under sustained /document/add traffic, query fan-out would therefore grow
+without bound. The compactor merges segments with a size-tiered policy:
+
+- A segment's tier is floor(log_fanout(bytes / base_bytes)).
+- When min_merge or more adjacent segments share a tier, the oldest such
+  run is merged into one segment, which lands about one tier higher. A
+  document is thus rewritten about log_fanout(total / base_bytes) times.
+- If more than max_segments remain anyway (interleaved tiers), the
+  adjacent run of min_merge segments with the fewest bytes is merged.
+
+Only adjacent runs are merged, so the newest entry per docID still wins.
+A merge reads the mapped segments and writes a new file, throttled to
+mb_per_sec. LiveIndex.replace_segments then swaps it in atomically, so
+searches never wait for a merge.
+
+Run on demand:  python compaction.py
+"""
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from barrels import write_binary_barrel
+from postings import merge_posting_lists
+from segments import LiveIndex, live_index
+
+
+class RateLimiter:
+    """Token bucket over bytes per second; 0 disables throttling."""
+
+    def __init__(self, bytes_per_sec: float):
+        self.rate = bytes_per_sec
+        self._allowance = 0.0
+        self._last = time.monotonic()
+
+    def consume(self, n_bytes: int) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        # At most one second of burst
+        self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+        self._last = now
+        self._allowance -= n_bytes
+        if self._allowance < 0:
+            time.sleep(-self._allowance / self.rate)
+
+
+class Compactor:
+    """Size-tiered merging of a LiveIndex's segments on a background thread."""
+
+    def __init__(self, live: LiveIndex, min_merge: int = 4, fanout: int = 4, max_segments: int = 16,
+                 base_bytes: int = 64 * 1024, mb_per_sec: float = 20.0, interval: float = 10.0):
+        self.live = live
+        self.min_merge = max(2, min_merge)
+        self.fanout = max(2, fanout)
+        self.max_segments = max(self.min_merge, max_segments)
+        self.base_bytes = base_bytes
+        self.limiter = RateLimiter(mb_per_sec * 1024 * 1024)
+        self.interval = interval
+        self._merge_lock = threading.Lock()  # one merge at a time
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.merges = 0
+        self.failures = 0
+        self.bytes_merged = 0
+        self.bytes_written = 0
+        self.last_merge_seconds = 0.0
+        self.total_merge_seconds = 0.0
+
+    def tier(self, size: int) -> int:
+        if size <= self.base_bytes:
+            return 0
+        return int(math.log(size / self.base_bytes, self.fanout))
+
+    def pick(self, sizes: List[Tuple[str, int]]) -> Optional[List[str]]:
+        """Names of the next adjacent run of segments to merge (oldest first), or None."""
+        run: List[str] = []
+        run_tier = -1
+        for name, size in sizes:
+            tier = self.tier(size)
+            if run and tier == run_tier:
+                run.append(name)
+                continue
+            if len(run) >= self.min_merge:
+                return run
+            run, run_tier = [name], tier
+        if len(run) >= self.min_merge:
+            return run
+        if len(sizes) > self.max_segments:
+            windows = [sizes[i:i + self.min_merge] for i in range(len(sizes) - self.min_merge + 1)]
+            smallest = min(windows, key=lambda window: sum(size for _, size in window))
+            return [name for name, _ in smallest]
+        return None
+
+    def merge(self, names: List[str]) -> Optional[str]:
+        """Merge a run of adjacent segments into a new one; returns its name (None if the run changed)."""
+        start = time.perf_counter()
+        segments = dict(self.live.snapshot())
+        maps = [segments[name] for name in names]
+        word_ids = np.unique(np.concatenate([mapped.word_ids for mapped in maps]))
+
+        merged = {}
+        bytes_read = 0
+        for word_id in word_ids.tolist():
+            parts = []
+            for mapped in maps:
+                idx = mapped.find(word_id)
+                if idx >= 0:
+                    length = int(mapped.table["length"][idx])
+                    self.limiter.consume(length)
+                    bytes_read += length
+                    parts.append(mapped.posting_list(idx))
+            merged[word_id] = merge_posting_lists(parts)
+
+        merged_name = self.live.reserve_segment_name()
+        merged_path = os.path.join(self.live.directory, merged_name)
+        try:
+            write_binary_barrel(merged_path, merged)
+        except Exception:
+            try:
+                os.remove(merged_path)
+            except FileNotFoundError:
+                pass
+            raise
+        written = os.path.getsize(merged_path)
+        self.limiter.consume(written)
+        if not self.live.replace_segments(names, merged_name):
+            return None
+
+        elapsed = time.perf_counter() - start
+        self.merges += 1
+        self.bytes_merged += bytes_read
+        self.bytes_written += written
+        self.last_merge_seconds = elapsed
+        self.total_merge_seconds += elapsed
+        print(f"🗜️  Merged {len(names)} segments ({bytes_read / 1e6:.2f} MB) into {merged_name} in {elapsed:.2f}s")
+        return merged_name
+
+    def run_once(self) -> bool:
+        """Perform at most one merge; returns True if one was done."""
+        with self._merge_lock:
+            sizes = [(name, len(mapped.mm)) for name, mapped in self.live.snapshot()]
+            names = self.pick(sizes)
+            return bool(names) and self.merge(names) is not None
+
+    def compact(self) -> int:
+        """Merge until the policy is satisfied; returns the number of merges."""
+        merges = 0
+        while self.run_once():
+            merges += 1
+        return merges
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while not self._stop.is_set() and self.run_once():
+                    pass
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️  Compaction failed: {str(e)[:100]}")
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        """Run in a daemon thread, woken by every flush and every `interval` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.live.on_flush = self.wake
+        self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the thread; a merge in progress finishes first (up to timeout)."""
+        if self.live.on_flush == self.wake:
+            self.live.on_flush = None
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Union[int, float, bool]]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "merges": self.merges,
+            "failures": self.failures,
+            "bytes_merged": self.bytes_merged,
+            "bytes_written": self.bytes_written,
+            "last_merge_seconds": round(self.last_merge_seconds, 4),
+            "total_merge_seconds": round(self.total_merge_seconds, 4),
+            "mb_per_sec": self.limiter.rate / (1024 * 1024),
+        }
+
+
+# Global compactor; started by the single-worker server
+compactor = Compactor(
+    live_index,
+    min_merge=int(os.environ.get("COMPACTION_MIN_MERGE", 4)),
+    max_segments=int(os.environ.get("COMPACTION_MAX_SEGMENTS", 16)),
+    mb_per_sec=float(os.environ.get("COMPACTION_MB_PER_SEC", 20)),
+)
+
+
+if __name__ == "__main__":
+    live_index.load()
+    print(f"Merged {compactor.compact()} times; {len(live_index.snapshot())} segments left")
+    print(compactor.stats())
@@ -0,0 +1,82 @@
+# src/doc_ids.py
+
+import json
+import os
+from typing import Dict, List, Union
+
+
+class DocIdTable:
+    """
+    Manages mapping: external docID (CORD-19 hash / doc_N) -> dense int docID.
+    Int IDs are assigned 0, 1, 2, ... so they can index arrays directly.
+    Postings and forward-index entries store the int; strings are only
+    needed again when results leave the engine.
+    """
+
+    def __init__(self):
+        self.doc_to_id: Dict[str, int] = {}
+        self.id_to_doc: List[str] = []
+        self.path = None  # file load() read; the live index checkpoints to it
+
+    def add(self, doc_id: str) -> int:
+        """Return the int ID for doc_id, assigning the next one if it is new."""
+        int_id = self.doc_to_id.get(doc_id)
+        if int_id is None:
+            int_id = len(self.id_to_doc)
+            self.doc_to_id[doc_id] = int_id
+            self.id_to_doc.append(doc_id)
+        return int_id
+
+    def assign(self, doc_id: str, int_id: int) -> None:
+        """Record a known doc_id -> int_id pair (WAL replay); skipped IDs stay empty."""
+        while len(self.id_to_doc) <= int_id:
+            self.id_to_doc.append("")
+        self.id_to_doc[int_id] = doc_id
+        self.doc_to_id[doc_id] = int_id
+
+    def get_id(self, doc_id: str) -> int:
+        return self.doc_to_id.get(doc_id, -1)
+
+    def get_doc(self, int_id: int) -> str:
+        if 0 <= int_id < len(self.id_to_doc):
+            return self.id_to_doc[int_id]
+        return ""
+
+    def to_external(self, doc: Union[int, str]) -> str:
+        """
+        Translate a posting's docID to the external string ID.
+        Legacy barrels still hold string IDs; those pass through unchanged.
+        """
+        if isinstance(doc, str):
+            return doc
+        return self.get_doc(int(doc)) or str(doc)
+
+    def size(self) -> int:
+        return len(self.id_to_doc)
+
+    def save(self, path: str = None) -> None:
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "data", "doc_ids.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Position in the list is the int ID
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.id_to_doc), f)
+        os.replace(temp_path, path)
+
+    def load(self, path: str = None) -> None:
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "data", "doc_ids.json")
+        path = os.path.abspath(path)
+        self.path = path
+        if not os.path.exists(path):
+            print(f"DocID table not found at {path}. Starting empty table.")
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            self.id_to_doc = json.load(f)
+        self.doc_to_id = {doc_id: i for i, doc_id in enumerate(self.id_to_doc) if doc_id}
+
+
+# Create global instance
+doc_id_table = DocIdTable()
+doc_id_table.load()
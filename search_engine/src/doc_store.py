@@ -0,0 +1,218 @@
+# src/doc_store.py
+"""
+Packed document store for result cards: paper_id, title, abstract and
+optionally the compressed body of every document, addressed by dense docID.
+
+    records.bin   append-only records, one per saved document version
+    offsets.bin   fixed-width index: row i = (offset, length) of the
+                  record of docID i; length 0 means "not stored"
+
+A lookup is one 12-byte index read and one positioned read of the
+record, instead of probing directories and parsing a CORD-19 JSON file
+that can hold megabytes of body text. Saving a document again appends
+a new record and repoints its index row; build() rewrites both files.
+
+Record layout: <IIII header (byte lengths of paper_id, title, abstract,
+compressed body), then the UTF-8 paper_id, title and abstract and the
+zlib-compressed body.
+
+Build from the parses with:  python doc_store.py [--body]
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import zlib
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from doc_ids import doc_id_table
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DOC_STORE_DIR = os.path.join(BASE_DIR, "data", "doc_store")
+PARSES_DIRS = [
+    os.path.join(BASE_DIR, "data", "document_parses", "pdf_json"),
+    os.path.join(BASE_DIR, "sample_data"),
+]
+
+RECORD_HEADER = struct.Struct("<IIII")
+OFFSET_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+OFFSET_ROW = struct.Struct("<QI")  # one OFFSET_DTYPE row
+
+
+def _text(field) -> str:
+    if isinstance(field, str):
+        return field
+    if isinstance(field, list):
+        return " ".join(item.get("text", "") for item in field if isinstance(item, dict))
+    return ""
+
+
+def document_fields(doc_data: Dict) -> Tuple[str, str, str]:
+    """(title, abstract, body) of a CORD-19 style document."""
+    title = _text(doc_data.get("metadata", {}).get("title", ""))
+    return title, _text(doc_data.get("abstract", [])), _text(doc_data.get("body_text", []))
+
+
+def encode_record(paper_id: str, title: str, abstract: str, body: str = "") -> bytes:
+    fields = [paper_id.encode("utf-8"), title.encode("utf-8"), abstract.encode("utf-8")]
+    fields.append(zlib.compress(body.encode("utf-8")) if body else b"")
+    return RECORD_HEADER.pack(*(len(field) for field in fields)) + b"".join(fields)
+
+
+def decode_record(buf: bytes, with_body: bool = False) -> Dict[str, str]:
+    lengths = RECORD_HEADER.unpack_from(buf, 0)
+    ends = list(accumulate((RECORD_HEADER.size,) + lengths))
+    paper_id, title, abstract = (buf[ends[i]:ends[i + 1]].decode("utf-8") for i in range(3))
+    record = {"paper_id": paper_id, "title": title, "abstract": abstract}
+    if with_body:
+        body = buf[ends[3]:ends[4]]
+        record["body"] = zlib.decompress(body).decode("utf-8") if body else ""
+    return record
+
+
+class DocStore:
+    """
+    Append-only record file plus fixed-width offset index, both read with
+    positioned reads so lookups need no seeking state or locks.
+    """
+
+    def __init__(self, directory: str = DOC_STORE_DIR):
+        self.directory = directory
+        self.records_path = os.path.join(directory, "records.bin")
+        self.offsets_path = os.path.join(directory, "offsets.bin")
+        self._records_fd: Optional[int] = None
+        self._offsets_fd: Optional[int] = None
+        self._lock = threading.Lock()  # serializes appends
+        self.loaded = False
+
+    def build(self, sources: Iterable[str] = PARSES_DIRS, include_body: bool = False) -> int:
+        """
+        Pack every <doc_id>.json under the source directories (later ones
+        win for duplicate IDs). Documents missing from the docID table are
+        registered in it. Returns the number of stored documents.
+        """
+        files = {}
+        for source in sources:
+            if os.path.isdir(source):
+                for fname in sorted(os.listdir(source)):
+                    if fname.endswith(".json"):
+                        files[fname[:-len(".json")]] = os.path.join(source, fname)
+        print(f"Packing {len(files)} documents into {self.directory}...")
+
+        table_size = doc_id_table.size()
+        doc_ids = {doc_id: doc_id_table.add(doc_id) for doc_id in files}
+        if doc_id_table.size() > table_size:
+            doc_id_table.save()
+
+        os.makedirs(self.directory, exist_ok=True)
+        offsets = np.zeros(doc_id_table.size(), dtype=OFFSET_DTYPE)
+        records_tmp, offsets_tmp = self.records_path + ".tmp", self.offsets_path + ".tmp"
+        position = 0
+        with open(records_tmp, "wb") as out:
+            for i, (doc_id, path) in enumerate(files.items()):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  Skipping {path}: {e}")
+                    continue
+                title, abstract, body = document_fields(data)
+                record = encode_record(data.get("paper_id") or doc_id, title, abstract, body if include_body else "")
+                out.write(record)
+                offsets[doc_ids[doc_id]] = (position, len(record))
+                position += len(record)
+                if (i + 1) % 10000 == 0:
+                    print(f"Packed {i + 1}/{len(files)} documents")
+        offsets.tofile(offsets_tmp)
+
+        self.close()
+        # Records first: the index never points past the end of its record file
+        os.replace(records_tmp, self.records_path)
+        os.replace(offsets_tmp, self.offsets_path)
+        self.load()
+        stored = int(np.count_nonzero(offsets["length"]))
+        print(f"✅ Packed {stored} documents ({position / 1e6:.1f} MB)")
+        return stored
+
+    def load(self) -> bool:
+        if not (os.path.exists(self.records_path) and os.path.exists(self.offsets_path)):
+            return False
+        self.close()
+        self._records_fd = os.open(self.records_path, os.O_RDONLY)
+        self._offsets_fd = os.open(self.offsets_path, os.O_RDONLY)
+        self.loaded = True
+        return True
+
+    def close(self) -> None:
+        for fd in (self._records_fd, self._offsets_fd):
+            if fd is not None:
+                os.close(fd)
+        self._records_fd = self._offsets_fd = None
+        self.loaded = False
+
+    def size(self) -> int:
+        """Number of index rows (the highest stored docID + 1)."""
+        if not self.loaded:
+            return 0
+        return os.fstat(self._offsets_fd).st_size // OFFSET_ROW.size
+
+    def _locate(self, doc_id: int) -> Tuple[int, int]:
+        row = os.pread(self._offsets_fd, OFFSET_ROW.size, doc_id * OFFSET_ROW.size)
+        if len(row) < OFFSET_ROW.size:
+            return 0, 0
+        return OFFSET_ROW.unpack(row)
+
+    def get(self, doc_id: int, with_body: bool = False) -> Optional[Dict[str, str]]:
+        """{"paper_id", "title", "abstract"[, "body"]} of a dense docID, or None if not stored."""
+        if not self.loaded or doc_id < 0:
+            return None
+        offset, length = self._locate(doc_id)
+        if length == 0:
+            return None
+        return decode_record(os.pread(self._records_fd, length, offset), with_body)
+
+    def get_many(self, doc_ids: List[int], with_body: bool = False) -> List[Optional[Dict[str, str]]]:
+        """get() for many docIDs, in input order; records are read in file order."""
+        located = [self._locate(doc_id) if self.loaded and doc_id >= 0 else (0, 0) for doc_id in doc_ids]
+        records: List[Optional[Dict[str, str]]] = [None] * len(doc_ids)
+        for i in sorted(range(len(doc_ids)), key=lambda i: located[i][0]):
+            offset, length = located[i]
+            if length:
+                records[i] = decode_record(os.pread(self._records_fd, length, offset), with_body)
+        return records
+
+    def append(self, doc_id: int, paper_id: str, title: str, abstract: str, body: str = "") -> None:
+        """Store (or replace) one document; creates the store if it does not exist yet."""
+        record = encode_record(paper_id, title, abstract, body)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.records_path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            mode = "r+b" if os.path.exists(self.offsets_path) else "w+b"
+            with open(self.offsets_path, mode) as f:
+                f.seek(0, os.SEEK_END)
+                rows = f.tell() // OFFSET_ROW.size
+                if doc_id >= rows:
+                    # Grow the index with empty rows up to this docID
+                    f.write(bytes((doc_id + 1 - rows) * OFFSET_ROW.size))
+                f.seek(doc_id * OFFSET_ROW.size)
+                f.write(OFFSET_ROW.pack(offset, len(record)))
+            if not self.loaded:
+                self.load()
+
+
+# Global store; the API reads it, DocumentIndexer.save_document appends to it
+doc_store = DocStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack document IDs, titles and abstracts into the document store.")
+    parser.add_argument("--body", action="store_true", help="also store the zlib-compressed body text")
+    parser.add_argument("sources", nargs="*", default=PARSES_DIRS, help="directories of <doc_id>.json parses")
+    args = parser.parse_args()
+    doc_store.build(args.sources, include_body=args.body)
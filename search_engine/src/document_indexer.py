@@ -5,13 +5,20 @@ Handles indexing without blocking search operations.
 """
 import json
 import os
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from datetime import datetime
 import numpy as np
 
 from tokenizer_module import Tokenizer
 from lexicon import lexicon
-from barrels import barrel_manager
+from doc_ids import doc_id_table
+from ranking import bm25
+from autocomplete import prefix_index
+from embedding_store import embedding_store
+from glove_store import lexicon_glove
+from result_cache import result_cache
+from doc_store import doc_store, document_fields
+from segments import live_index
 
 
 class DocumentIndexer:
@@ -31,6 +38,7 @@ class DocumentIndexer:
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.tokenized_dir, exist_ok=True)
         os.makedirs(self.embeddings_dir, exist_ok=True)
+        self._next_doc_number = None  # scanned from data_dir once, then counted up
     
     def extract_text(self, field):
         """Extract text from various field formats."""
@@ -42,26 +50,26 @@ class DocumentIndexer:
     
     def generate_doc_id(self) -> str:
         """Generate a unique document ID."""
-        # Find the highest existing doc_X.json number
-        existing_docs = [f for f in os.listdir(self.data_dir) if f.startswith("doc_") and f.endswith(".json")]
-        
-        if not existing_docs:
-            return "doc_1"
-        
-        # Extract numbers and find max
-        numbers = []
-        for doc in existing_docs:
-            try:
-                num = int(doc.replace("doc_", "").replace(".json", ""))
-                numbers.append(num)
-            except ValueError:
-                continue
-        
-        next_num = max(numbers) + 1 if numbers else 1
+        if self._next_doc_number is None:
+            # Find the highest existing doc_X.json number (once; later IDs count up)
+            existing_docs = [f for f in os.listdir(self.data_dir) if f.startswith("doc_") and f.endswith(".json")]
+            
+            # Extract numbers and find max
+            numbers = []
+            for doc in existing_docs:
+                try:
+                    num = int(doc.replace("doc_", "").replace(".json", ""))
+                    numbers.append(num)
+                except ValueError:
+                    continue
+            
+            self._next_doc_number = max(numbers) + 1 if numbers else 1
+        next_num = self._next_doc_number
+        self._next_doc_number += 1
         return f"doc_{next_num}"
     
     def save_document(self, doc_data: Dict, doc_id: str = None) -> str:
-        """Save document to sample_data directory."""
+        """Save document to sample_data directory and the packed document store."""
         if not doc_id:
             doc_id = self.generate_doc_id()
         
@@ -70,6 +78,9 @@ class DocumentIndexer:
         with open(doc_path, 'w', encoding='utf-8') as f:
             json.dump(doc_data, f, indent=2)
         
+        # Result cards are served from the document store
+        doc_store.append(self.register_doc_id(doc_id), doc_data.get("paper_id") or doc_id, *document_fields(doc_data))
+        
         return doc_id
     
     def tokenize_document(self, doc_data: Dict, doc_id: str) -> List[str]:
@@ -91,35 +102,42 @@ class DocumentIndexer:
         
         return tokens
     
-    def update_lexicon(self, tokens: List[str]) -> Dict[str, int]:
-        """Update lexicon with new words and return word IDs."""
+    def update_lexicon(self, tokens: List[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Update lexicon with new words; return the word IDs of all tokens and
+        of the new words. The lexicon file is checkpointed by the live index,
+        which logs the new words in its WAL until then.
+        """
         word_ids = {}
-        new_words = []
+        new_words = {}
         
         for token in tokens:
+            if token in word_ids:
+                continue
             # Check if word already exists
             word_id = lexicon.get_id(token)
             
             if word_id == 0:  # New word
-                # Add to lexicon
-                new_word_id = lexicon._next_id
-                lexicon.word_to_id[token] = new_word_id
-                lexicon.id_to_word[new_word_id] = token
-                lexicon._next_id += 1
-                word_ids[token] = new_word_id
-                new_words.append(token)
-            else:
-                word_ids[token] = word_id
+                word_id = lexicon.add_word(token)
+                new_words[token] = word_id
+            word_ids[token] = word_id
         
-        # Save updated lexicon if there are new words
         if new_words:
-            lexicon.save()
             print(f"Added {len(new_words)} new words to lexicon")
         
-        return word_ids
+        return word_ids, new_words
+    
+    def register_doc_id(self, doc_id: str) -> int:
+        """Assign (or look up) the dense int docID used in postings (checkpointed by the live index)."""
+        return doc_id_table.add(doc_id)
     
-    def update_barrels(self, doc_id: str, tokens: List[str], word_ids: Dict[str, int]):
-        """Update barrels with new document."""
+    def update_barrels(self, doc_id: int, tokens: List[str], word_ids: Dict[str, int],
+                       key: str = None, new_words: Dict[str, int] = None):
+        """
+        Make the new document searchable via the live index (doc_id is the
+        dense int docID). Its WAL entry also records the external key, the
+        length and the new lexicon words.
+        """
         # Count word positions
         word_positions = {}
         for position, token in enumerate(tokens):
@@ -127,55 +145,41 @@ class DocumentIndexer:
                 word_positions[token] = []
             word_positions[token].append(position)
         
-        # Update barrels
-        failed_updates = 0
+        # Append to the live index (WAL + in-memory delta); the barrels stay immutable
+        postings = {}
         for token, positions in word_positions.items():
             word_id = word_ids.get(token)
             if word_id:
-                try:
-                    # Get barrel for this word
-                    barrel_id = barrel_manager.get_barrel_id(word_id)
-                    barrel_data = barrel_manager.load_barrel(barrel_id)
-                    
-                    # Check if word exists and convert old format to new if needed
-                    if word_id not in barrel_data:
-                        # New word - use dict format
-                        barrel_data[word_id] = {}
-                    elif isinstance(barrel_data[word_id], list):
-                        # Old format (list of doc IDs) - convert to dict format
-                        old_docs = barrel_data[word_id]
-                        barrel_data[word_id] = {doc: [] for doc in old_docs}
-                    
-                    # Add document with positions
-                    barrel_data[word_id][doc_id] = positions
-                    
-                    # Save barrel
-                    barrel_manager.save_barrel(barrel_id, barrel_data)
-                except Exception as e:
-                    print(f"⚠️  Failed to update barrel for word '{token}': {str(e)[:100]}")
-                    failed_updates += 1
-        
-        if failed_updates > 0:
-            print(f"⚠️  {failed_updates} barrel updates failed, but document was added")
-        print(f"Updated barrels with {len(word_positions) - failed_updates}/{len(word_positions)} unique words")
+                postings[word_id] = positions
+        live_index.add_document(doc_id, postings, key=key, length=len(tokens), words=new_words)
+        # Autocomplete ranks by df, which this document raises for each of its words
+        prefix_index.add_document(word_positions)
+        print(f"Updated barrels with {len(postings)}/{len(word_positions)} unique words")
     
     def generate_embedding(self, doc_id: str, tokens: List[str], glove_embeddings) -> bool:
         """Generate and save document embedding."""
         try:
-            # Get vectors for tokens that exist in GloVe
-            vectors = [glove_embeddings[t] for t in tokens if t in glove_embeddings]
+            if lexicon_glove.loaded:
+                # Token IDs -> rows of the lexicon-projected GloVe, one fancy-indexed mean
+                doc_vector = lexicon_glove.embed_tokens(tokens, glove_embeddings)
+            else:
+                # Get vectors for tokens that exist in GloVe
+                vectors = [glove_embeddings[t] for t in tokens if t in glove_embeddings]
+                # Average the vectors
+                doc_vector = np.mean(vectors, axis=0) if vectors else None
             
-            if not vectors:
+            if doc_vector is None:
                 print(f"Warning: No GloVe vectors found for document tokens")
                 return False
             
-            # Average the vectors
-            doc_vector = np.mean(vectors, axis=0)
-            
             # Save embedding
             embedding_path = os.path.join(self.embeddings_dir, f"{doc_id}.npy")
             np.save(embedding_path, doc_vector)
             
+            # Searchable right away; packed into the matrix on the next pack
+            if embedding_store.loaded:
+                embedding_store.add(doc_id_table.add(doc_id), doc_vector)
+            
             return True
         except Exception as e:
             print(f"Error generating embedding: {e}")
@@ -198,10 +202,12 @@ class DocumentIndexer:
             print(f"Tokenized: {len(tokens)} tokens")
             
             # 3. Update lexicon
-            word_ids = self.update_lexicon(tokens)
+            word_ids, new_words = self.update_lexicon(tokens)
             
-            # 4. Update barrels (inverted index)
-            self.update_barrels(doc_id, tokens, word_ids)
+            # 4. Update barrels (inverted index) under the dense int docID
+            int_doc_id = self.register_doc_id(doc_id)
+            bm25.set_doc_length(int_doc_id, len(tokens))
+            self.update_barrels(int_doc_id, tokens, word_ids, key=doc_id, new_words=new_words)
             
             # 5. Generate embedding if GloVe is provided
             embedding_created = False
@@ -216,7 +222,7 @@ class DocumentIndexer:
                 "doc_id": doc_id,
                 "tokens_count": len(tokens),
                 "unique_words": len(set(tokens)),
-                "new_words_added": len([t for t in tokens if lexicon.get_id(t) > 0]),
+                "new_words_added": len(new_words),
                 "embedding_created": embedding_created,
                 "indexing_time": duration,
                 "message": f"Document indexed successfully in {duration:.2f} seconds"
@@ -228,6 +234,10 @@ class DocumentIndexer:
                 "error": str(e),
                 "message": f"Failed to index document: {str(e)}"
             }
+        
+        finally:
+            # The barrels may have changed even if indexing failed part-way
+            result_cache.invalidate()
 
 
 # Global indexer instance
@@ -0,0 +1,177 @@
+# src/embedding_store.py
+"""
+Packed document embeddings for vectorized semantic search.
+
+All document vectors live in one L2-normalized float32 matrix
+(vectors.npy, one row per document) next to an int64 array of the dense
+docIDs of those rows (doc_ids.npy). Both are opened with mmap_mode='r',
+so startup touches two files instead of one .npy per document and the
+pages are shared between processes.
+
+Because rows are normalized, cosine similarity against a normalized
+query is a single matrix-vector product; top-k selection is O(n) via
+ranking.top_k_results.
+
+Documents indexed after packing are kept in a small in-memory overflow
+that every search also scores.
+"""
+import os
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from doc_ids import doc_id_table
+from ranking import top_k_results
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+EMBEDDINGS_DIR = os.path.join(BASE_DIR, "data", "embeddings")
+PACKED_DIR = os.path.join(BASE_DIR, "data", "embeddings_packed")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows stay zero) as float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class EmbeddingStore:
+    """
+    Row-per-document matrix of normalized embeddings, addressed by dense docID.
+    """
+
+    def __init__(self, packed_dir: str = PACKED_DIR):
+        self.packed_dir = packed_dir
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int64)  # docID -> row, -1 if absent
+        self.extra_ids: List[int] = []
+        self.extra_vectors: List[np.ndarray] = []
+        self._fingerprint: Optional[int] = None
+        self.loaded = False
+
+    def pack(self, embeddings_dir: str = EMBEDDINGS_DIR) -> int:
+        """
+        Pack every per-document .npy file into vectors.npy / doc_ids.npy.
+        Documents missing from the docID table are registered in it.
+        Returns the number of packed documents.
+        """
+        files = sorted(f for f in os.listdir(embeddings_dir) if f.endswith(".npy"))
+        print(f"Packing {len(files)} document embeddings...")
+
+        table_size = doc_id_table.size()
+        doc_ids = np.array([doc_id_table.add(f[:-len(".npy")]) for f in files], dtype=np.int64)
+        if doc_id_table.size() > table_size:
+            doc_id_table.save()
+
+        vectors = None
+        for i, fname in enumerate(files):
+            vec = np.load(os.path.join(embeddings_dir, fname))
+            if vectors is None:
+                vectors = np.zeros((len(files), len(vec)), dtype=np.float32)
+            vectors[i] = vec
+            if (i + 1) % 10000 == 0:
+                print(f"Packed {i + 1}/{len(files)} embeddings")
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+
+        # Rows in docID order keep lookups and tie-breaking deterministic
+        order = np.argsort(doc_ids, kind="stable")
+        self.save(doc_ids[order], normalize_rows(vectors[order]))
+        print(f"✅ Packed {len(files)} embeddings into {self.packed_dir}")
+        return len(files)
+
+    def save(self, doc_ids: np.ndarray, vectors: np.ndarray) -> None:
+        os.makedirs(self.packed_dir, exist_ok=True)
+        for name, array in (("vectors.npy", vectors), ("doc_ids.npy", doc_ids)):
+            path = os.path.join(self.packed_dir, name)
+            # np.save appends .npy to names without it
+            temp_path = path[:-len(".npy")] + ".tmp.npy"
+            np.save(temp_path, array)
+            os.replace(temp_path, path)
+
+    def load(self) -> bool:
+        vectors_path = os.path.join(self.packed_dir, "vectors.npy")
+        ids_path = os.path.join(self.packed_dir, "doc_ids.npy")
+        if not (os.path.exists(vectors_path) and os.path.exists(ids_path)):
+            print(f"Packed embeddings not found at {self.packed_dir}. Run: python semantic.py (option 3)")
+            return False
+        self.vectors = np.load(vectors_path, mmap_mode="r")
+        self.doc_ids = np.load(ids_path, mmap_mode="r")
+        self.rows = np.full(int(self.doc_ids.max()) + 1 if len(self.doc_ids) else 0, -1, dtype=np.int64)
+        self.rows[self.doc_ids] = np.arange(len(self.doc_ids))
+        self.extra_ids, self.extra_vectors = [], []
+        self._fingerprint = None
+        self.loaded = True
+        return True
+
+    def fingerprint(self) -> int:
+        """CRC32 of the packed docID order; indexes over the rows (ann.py, quantization.py) store it."""
+        if self._fingerprint is None:
+            self._fingerprint = zlib.crc32(np.ascontiguousarray(self.doc_ids, dtype=np.int64).tobytes())
+        return self._fingerprint
+
+    def size(self) -> int:
+        return len(self.doc_ids) + len(self.extra_ids)
+
+    def dim(self) -> int:
+        if self.vectors.shape[1]:
+            return self.vectors.shape[1]
+        return len(self.extra_vectors[0]) if self.extra_vectors else 0
+
+    def add(self, doc_id: int, vector: np.ndarray) -> None:
+        """Register the embedding of a document indexed after packing."""
+        self.extra_ids.append(int(doc_id))
+        self.extra_vectors.append(normalize_rows(vector))
+
+    def get(self, doc_id: int) -> Optional[np.ndarray]:
+        """Normalized embedding of one document, or None."""
+        if 0 <= doc_id < len(self.rows) and self.rows[doc_id] >= 0:
+            return np.asarray(self.vectors[self.rows[doc_id]])
+        for i in range(len(self.extra_ids) - 1, -1, -1):
+            if self.extra_ids[i] == doc_id:
+                return self.extra_vectors[i]
+        return None
+
+    def gather(self, doc_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (docIDs, normalized vectors) for the given documents, in input
+        order, gathered with one fancy index. Documents without an
+        embedding are left out.
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        rows = np.full(len(doc_ids), -1, dtype=np.int64)
+        in_range = (doc_ids >= 0) & (doc_ids < len(self.rows))
+        rows[in_range] = self.rows[doc_ids[in_range]]
+        packed = rows >= 0
+
+        vectors = np.zeros((len(doc_ids), self.dim()), dtype=np.float32)
+        if packed.any():
+            # Ascending rows read the memory-mapped matrix front to back
+            order = np.argsort(rows[packed], kind="stable")
+            targets = np.flatnonzero(packed)[order]
+            vectors[targets] = self.vectors[rows[packed][order]]
+        found = packed.copy()
+        if self.extra_ids:
+            extra = {doc_id: i for i, doc_id in enumerate(self.extra_ids)}
+            for i in np.flatnonzero(~packed).tolist():
+                j = extra.get(int(doc_ids[i]))
+                if j is not None:
+                    vectors[i] = self.extra_vectors[j]
+                    found[i] = True
+        return doc_ids[found], vectors[found]
+
+    def search(self, query_vec: np.ndarray, top_k: Optional[int] = 10) -> List[Tuple[int, float]]:
+        """[(docID, cosine similarity), ...] over the whole corpus, best first."""
+        query = normalize_rows(query_vec)
+        doc_ids = np.asarray(self.doc_ids)
+        scores = self.vectors @ query if len(doc_ids) else np.zeros(0, dtype=np.float32)
+        if self.extra_ids:
+            doc_ids = np.concatenate((doc_ids, np.array(self.extra_ids, dtype=np.int64)))
+            scores = np.concatenate((scores, np.vstack(self.extra_vectors) @ query))
+        return top_k_results(doc_ids, scores, top_k)
+
+
+# Global store; semantic search and the API load it once
+embedding_store = EmbeddingStore()
@@ -4,21 +4,40 @@ import json
 import os
 from typing import Dict, List
 
+import numpy as np
+
 class ForwardIndex:
     """
-    Document → {wordID: frequency}
+    Document (dense int docID) → {wordID: frequency}
+    Token positions are kept alongside in `positions` (docID → {wordID: [positions]})
+    so the inverted index can carry them into the barrels.
     """
     def __init__(self):
-        self.index: Dict[str, Dict[int, int]] = {}
+        self.index: Dict[int, Dict[int, int]] = {}
+        self.positions: Dict[int, Dict[int, List[int]]] = {}
 
-    def build(self, tokenized_docs: Dict[str, List[str]], lexicon) -> None:
-        for doc_id, tokens in tokenized_docs.items():
-            word_freq = {}
-            for token in tokens:
+    def build(self, tokenized_docs: Dict[str, List[str]], lexicon, doc_ids) -> None:
+        # Sorted so int IDs (and therefore posting lists) come out in a stable order
+        for doc_id in sorted(tokenized_docs):
+            word_positions = {}
+            for position, token in enumerate(tokenized_docs[doc_id]):
                 wid = lexicon.get_id(token)
                 if wid:
-                    word_freq[wid] = word_freq.get(wid, 0) + 1
-            self.index[doc_id] = word_freq
+                    word_positions.setdefault(wid, []).append(position)
+            int_id = doc_ids.add(doc_id)
+            self.index[int_id] = {wid: len(pos) for wid, pos in word_positions.items()}
+            self.positions[int_id] = word_positions
+
+    def doc_lengths(self) -> np.ndarray:
+        """Indexed-token count per int docID (BM25 document length)."""
+        lengths = np.zeros(max(self.index.keys(), default=-1) + 1, dtype=np.int32)
+        for doc_id, word_freq in self.index.items():
+            lengths[doc_id] = sum(word_freq.values())
+        return lengths
+
+    def save_doc_lengths(self, path: str = "search_engine/data/doc_lengths.npy") -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path, self.doc_lengths())
 
     def save(self, path: str = "search_engine/data/forward_index.json") -> None:
         os.makedirs(os.path.dirname(path), exist_ok=True)
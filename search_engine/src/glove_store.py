@@ -0,0 +1,172 @@
+# src/glove_store.py
+"""
+Binary GloVe cache: the text file is parsed once into
+
+    <name>.vocab.txt   words, one per line, sorted
+    <name>.f32.npy     float32 matrix, row i = vector of word i
+
+and then memory-mapped on every start. Workers that map the same file
+share its pages, and nothing is allocated per word.
+
+GloveVectors is a read-only Mapping over the two files, so code written
+for the old {word: vector} dict (`w in glove`, `glove[w]`, `len(glove)`)
+keeps working unchanged.
+
+LexiconGlove keeps only the vectors of lexicon words, addressed by
+wordID, so document and query embeddings become one fancy-indexed mean.
+"""
+import os
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from lexicon import lexicon
+
+LEXICON_GLOVE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "glove")
+
+
+def cache_paths(txt_path: str) -> Tuple[str, str]:
+    stem = txt_path[:-len(".txt")] if txt_path.endswith(".txt") else txt_path
+    return stem + ".vocab.txt", stem + ".f32.npy"
+
+
+def convert_glove(txt_path: str) -> None:
+    """Parse a GloVe text file once and write the binary cache next to it."""
+    vocab_path, matrix_path = cache_paths(txt_path)
+    print(f"Converting {txt_path} to a binary cache (one-time)...")
+
+    with open(txt_path, "r", encoding="utf-8") as f:
+        first = f.readline().rstrip().split(" ")
+        dim = len(first) - 1
+        n = 1 + sum(1 for _ in f)
+
+    words = []
+    vectors = np.empty((n, dim), dtype=np.float32)
+    with open(txt_path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            word, _, values = line.rstrip().partition(" ")
+            words.append(word)
+            vectors[i] = np.fromstring(values, dtype=np.float32, sep=" ")
+
+    order = sorted(range(n), key=words.__getitem__)
+    temp_matrix = matrix_path[:-len(".npy")] + ".tmp.npy"
+    np.save(temp_matrix, vectors[order])
+    with open(vocab_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(words[i] for i in order))
+    # Matrix first: a vocab file only ever appears next to a complete matrix
+    os.replace(temp_matrix, matrix_path)
+    os.replace(vocab_path + ".tmp", vocab_path)
+    print(f"✅ GloVe cache written: {n} words x {dim} dims")
+
+
+class GloveVectors(Mapping):
+    """Read-only {word: float32 vector} view over the binary cache."""
+
+    def __init__(self, vocab_path: str, matrix_path: str):
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            self.words = f.read().split("\n")
+        self.vectors = np.load(matrix_path, mmap_mode="r")
+
+    def _row(self, word: str) -> int:
+        i = bisect_left(self.words, word)
+        if i < len(self.words) and self.words[i] == word:
+            return i
+        return -1
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        i = self._row(word) if isinstance(word, str) else -1
+        if i < 0:
+            raise KeyError(word)
+        return self.vectors[i]
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self._row(word) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+def open_glove(txt_path: str) -> GloveVectors:
+    """Map the binary cache for txt_path, converting the text file first if needed."""
+    vocab_path, matrix_path = cache_paths(txt_path)
+    fresh = os.path.exists(vocab_path) and os.path.exists(matrix_path)
+    if fresh and os.path.exists(txt_path):
+        fresh = os.path.getmtime(vocab_path) >= os.path.getmtime(txt_path)
+    if not fresh:
+        convert_glove(txt_path)
+    return GloveVectors(vocab_path, matrix_path)
+
+
+class LexiconGlove:
+    """
+    GloVe projected onto the lexicon: rows[word_id] is the row of that
+    word's vector in a compact float32 matrix, or -1 if GloVe lacks it.
+    Words added to the lexicon after build() fall back to the full GloVe
+    mapping when one is passed to embed_tokens().
+    """
+
+    def __init__(self, directory: str = LEXICON_GLOVE_DIR):
+        self.matrix_path = os.path.join(directory, "lexicon_glove.f32.npy")
+        self.rows_path = os.path.join(directory, "lexicon_glove.rows.npy")
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.loaded = False
+
+    def build(self, glove: Mapping) -> None:
+        """Keep the vector of every lexicon word that GloVe knows."""
+        max_word_id = max(lexicon.id_to_word.keys(), default=0)
+        self.rows = np.full(max_word_id + 1, -1, dtype=np.int32)
+        word_ids = [w for w, word in sorted(lexicon.id_to_word.items()) if word in glove]
+        self.rows[word_ids] = np.arange(len(word_ids), dtype=np.int32)
+        dim = len(next(iter(glove.values()))) if len(glove) else 0
+        self.vectors = np.zeros((len(word_ids), dim), dtype=np.float32)
+        for row, word_id in enumerate(word_ids):
+            self.vectors[row] = glove[lexicon.get_word(word_id)]
+        self.loaded = True
+        print(f"Projected GloVe onto the lexicon: {len(word_ids)}/{len(lexicon.id_to_word)} words have vectors")
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        np.save(self.matrix_path, self.vectors)
+        np.save(self.rows_path, self.rows)
+
+    def load(self) -> bool:
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.rows_path)):
+            return False
+        self.vectors = np.load(self.matrix_path, mmap_mode="r")
+        self.rows = np.load(self.rows_path)
+        self.loaded = True
+        return True
+
+    def embed(self, word_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """Mean vector of the given wordIDs (repeats count), or None if none has a vector."""
+        word_ids = np.fromiter(word_ids, dtype=np.int64)
+        word_ids = word_ids[(word_ids > 0) & (word_ids < len(self.rows))]
+        rows = self.rows[word_ids]
+        rows = rows[rows >= 0]
+        if not len(rows):
+            return None
+        return self.vectors[rows].mean(axis=0)
+
+    def embed_tokens(self, tokens: List[str], glove: Optional[Mapping] = None) -> Optional[np.ndarray]:
+        """Mean vector of tokens, looked up by wordID."""
+        word_ids = [lexicon.get_id(t) for t in tokens]
+        known = [w for w in word_ids if 0 < w < len(self.rows)]
+        if glove is None or len(known) == len(word_ids):
+            return self.embed(known)
+
+        # Tokens outside the projection (unknown or newer words) use full GloVe
+        vectors = [self.vectors[self.rows[w]] for w in known if self.rows[w] >= 0]
+        vectors += [glove[t] for t, w in zip(tokens, word_ids) if not 0 < w < len(self.rows) and t in glove]
+        if not vectors:
+            return None
+        return np.mean(vectors, axis=0)
+
+
+# Global lexicon-projected GloVe; built by semantic.py, loaded by the API and CLI
+lexicon_glove = LexiconGlove()
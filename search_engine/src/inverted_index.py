@@ -2,23 +2,29 @@
 
 import json
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 class InvertedIndex:
     """
-    wordID → [docIDs]
+    wordID → {int docID: [positions]}   (tf = len(positions))
+    Built without positions it falls back to the old wordID → [int docIDs].
     """
     def __init__(self):
-        self.index: Dict[int, List[str]] = {}
+        self.index: Dict[int, Dict[int, List[int]]] = {}
 
-    def build(self, forward_index: Dict[str, Dict[int, int]]) -> None:
-        for doc_id, word_freq in forward_index.items():
-            for wid in word_freq.keys():
-                if wid not in self.index:
-                    self.index[wid] = []
-                self.index[wid].append(doc_id)
+    def build(self, forward_index: Dict[int, Dict[int, int]],
+              positions: Optional[Dict[int, Dict[int, List[int]]]] = None) -> None:
+        # Docs are visited in docID order, so every posting comes out sorted
+        for doc_id in sorted(forward_index):
+            if positions is None:
+                for wid in forward_index[doc_id]:
+                    self.index.setdefault(wid, []).append(doc_id)
+            else:
+                for wid, word_positions in positions[doc_id].items():
+                    self.index.setdefault(wid, {})[doc_id] = word_positions
 
     def save(self, path: str = "search_engine/data/inverted_index.json") -> None:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.index, f, indent=2)
+            # No indent: with positions, indent=2 puts every integer on its own line
+            json.dump(self.index, f)
@@ -15,6 +15,7 @@ class Lexicon:
         self.word_to_id: Dict[str, int] = {}
         self.id_to_word: Dict[int, str] = {}
         self._next_id = 1  # Track next available ID
+        self.path = None  # file load() read; the live index checkpoints to it
 
     def _is_valid_word(self, word: str) -> bool:
         return re.fullmatch(r"[a-z]{2,50}", word) is not None
@@ -31,6 +32,18 @@ class Lexicon:
                 self.id_to_word[self._next_id] = word
                 self._next_id += 1
 
+    def add_word(self, word: str, word_id: int = None) -> int:
+        """Return the wordID of word, assigning word_id (default: the next ID) if it is new."""
+        existing = self.word_to_id.get(word)
+        if existing is not None:
+            return existing
+        if word_id is None:
+            word_id = self._next_id
+        self.word_to_id[word] = word_id
+        self.id_to_word[word_id] = word
+        self._next_id = max(self._next_id, word_id + 1)
+        return word_id
+
     def get_id(self, word: str) -> int:
         return self.word_to_id.get(word, 0)
 
@@ -44,13 +57,17 @@ class Lexicon:
         if path is None:
             path = os.path.join(os.path.dirname(__file__), "..", "index", "lexicon.json")
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.word_to_id, f, indent=2)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            # Copied first: documents may be added while this is written
+            json.dump(dict(self.word_to_id), f, indent=2)
+        os.replace(temp_path, path)
 
     def load(self, path: str = None) -> None:
         if path is None:
             path = os.path.join(os.path.dirname(__file__), "..", "data", "lexicon.json")
         path = os.path.abspath(path)
+        self.path = path
         if not os.path.exists(path):
             print(f"Lexicon file not found at {path}. Starting empty lexicon.")
             return
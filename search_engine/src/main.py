@@ -1,12 +1,17 @@
 # src/main.py
 from search import single_word_search, multi_word_search, semantic_search, autocomplete_words
 from semantic import load_all_embeddings, load_glove
+from embedding_store import embedding_store
+from doc_ids import doc_id_table
 
 
 def main():
 
-    print("Loading all embeddings into memory (this may take a while)...")
-    embeddings = load_all_embeddings()
+    # Packed embeddings are memory-mapped; per-file loading is only a fallback
+    embeddings = None
+    if not embedding_store.load():
+        print("Loading all embeddings into memory (this may take a while)...")
+        embeddings = load_all_embeddings()
 
     glove = load_glove()
 
@@ -21,23 +26,23 @@ def main():
 
         if choice == "1":
             word = input("Enter search term: ").strip().lower()
-            results = single_word_search(word)
+            results = single_word_search(word, top_k=10)
             if not results:
                 print("No results found.")
             else:
                 print("Top results:")
                 for doc_id, score in results[:10]:
-                    print(f"{doc_id} | Score: {score}")
+                    print(f"{doc_id_table.to_external(doc_id)} | Score: {score}")
 
         elif choice == "2":
             query = input("Enter multi-word query: ").strip().lower()
-            results = multi_word_search(query)
+            results = multi_word_search(query, top_k=10)
             if not results:
                 print("No results found.")
             else:
                 print("Top results:")
                 for doc_id, score in results[:10]:
-                    print(f"{doc_id} | Score: {score}")
+                    print(f"{doc_id_table.to_external(doc_id)} | Score: {score}")
 
         elif choice == "3":
             prefix = input("Enter prefix: ").strip().lower()
@@ -0,0 +1,297 @@
+# src/postings.py
+"""
+Compressed posting lists.
+
+One encoded posting list is laid out as:
+    header    : n_docs, doc block bytes, tf block bytes, position block bytes
+    doc block : varint gaps between sorted int docIDs (first gap is the docID itself)
+    tf block  : varint term frequencies, parallel to the docIDs
+    pos block : for each doc, varint gaps between its sorted positions
+
+Each doc's run of positions is located by its tf. A list merged from
+parts with and without positions (e.g. an old docID-list barrel plus
+live documents) has docs whose positions are unknown. Its header then
+sets POS_COUNTS_FLAG in n_docs, and the position block starts with one
+varint per doc giving the length of that doc's run (0 when unknown).
+
+Ranking only needs docIDs and frequencies, so the position block is kept
+as raw bytes and decoded the first time a caller asks for positions.
+All encoding/decoding is vectorized with NumPy.
+"""
+import struct
+from typing import Dict, List, Union
+
+import numpy as np
+
+POSTING_HEADER = struct.Struct("<IIII")
+POS_COUNTS_FLAG = 1 << 31  # in n_docs: the position block starts with per-doc run lengths
+
+
+def encode_varints(values) -> bytes:
+    """LEB128-style varint encoding of non-negative ints (7 bits per byte, high bit = more)."""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b""
+
+    # Bytes needed per value
+    nbytes = np.ones(values.size, dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+
+    width = int(nbytes.max())
+    out = np.empty((values.size, width), dtype=np.uint8)
+    for i in range(width):
+        chunk = ((values >> np.uint64(7 * i)) & np.uint64(0x7F)).astype(np.uint8)
+        out[:, i] = chunk | np.where(i < nbytes - 1, 0x80, 0).astype(np.uint8)
+    return out[np.arange(width) < nbytes[:, None]].tobytes()
+
+
+def decode_varints(buf) -> np.ndarray:
+    """Inverse of encode_varints(); returns a uint64 array."""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    # Fast path: every value fit in one byte
+    if data.max() < 0x80:
+        return data.astype(np.uint64)
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group = np.repeat(np.arange(ends.size), ends - starts + 1)
+    shifts = ((np.arange(data.size) - starts[group]) * 7).astype(np.uint64)
+    parts = (data & 0x7F).astype(np.uint64) << shifts
+    return np.add.reduceat(parts, starts)
+
+
+def decode_varints_at(buf, rows: np.ndarray) -> np.ndarray:
+    """decode_varints(buf)[rows] without decoding the values that were not asked for."""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if data.max() < 0x80:
+        return data[rows].astype(np.uint64)
+
+    # Gather just the bytes of the selected varints and decode those
+    all_ends = np.flatnonzero(data < 0x80)
+    ends = all_ends[rows]
+    starts = np.concatenate(([0], all_ends[:-1] + 1))[rows]
+    lengths = ends - starts + 1
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return decode_varints(data[np.arange(int(lengths.sum())) + offsets].tobytes())
+
+
+class PostingList:
+    """
+    DocIDs and term frequencies of one word as parallel arrays, sorted by docID.
+    Positions are decoded lazily from the encoded block (or taken from a
+    legacy JSON barrel) only when positions() is called. Frequencies of a
+    decoded list stay encoded until tfs is read; tfs_at() decodes only
+    the rows it is asked for.
+
+    Int docIDs give an int64 array; barrels that still hold legacy string
+    docIDs give an object array, which NumPy sorts and searches the same way.
+    """
+
+    __slots__ = ("doc_ids", "_tfs", "_tf_block", "_pos_block", "_pos_counts", "_positions", "_pos_values", "_pos_starts")
+
+    def __init__(self, doc_ids: np.ndarray, tfs: np.ndarray, pos_block: bytes = b"", positions: List[List[int]] = None,
+                 pos_counts: np.ndarray = None, tf_block: bytes = None):
+        self.doc_ids = doc_ids
+        self._tfs = tfs
+        self._tf_block = tf_block  # encoded frequencies when tfs is None
+        self._pos_block = pos_block
+        self._pos_counts = pos_counts  # run length per doc in pos_block when it is not the tf
+        self._positions = positions
+        self._pos_values = None
+        self._pos_starts = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def df(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def tfs(self) -> np.ndarray:
+        if self._tfs is None:
+            self._tfs = decode_varints(self._tf_block).astype(np.int64)
+        return self._tfs
+
+    def tfs_at(self, rows) -> np.ndarray:
+        """Frequencies of the given rows; an undecoded tf block is only decoded there."""
+        if self._tfs is not None or isinstance(rows, slice):
+            return self.tfs[rows]
+        return decode_varints_at(self._tf_block, rows).astype(np.int64)
+
+    def has_positions(self) -> bool:
+        return bool(self._pos_block) or self._positions is not None
+
+    def positions(self, i: int) -> np.ndarray:
+        """Sorted positions of the i-th document in this list (empty if none were stored)."""
+        if self._positions is not None:
+            return np.asarray(self._positions[i], dtype=np.int64)
+        if not self._pos_block:
+            return np.zeros(0, dtype=np.int64)
+        values = self.all_positions()
+        return values[self._pos_starts[i]:self._pos_starts[i + 1]]
+
+    def position_counts(self) -> np.ndarray:
+        """Number of stored positions per document (0 where they are unknown)."""
+        if self._positions is not None:
+            return np.array([len(p) for p in self._positions], dtype=np.int64)
+        if not self._pos_block:
+            return np.zeros(len(self), dtype=np.int64)
+        return self.tfs if self._pos_counts is None else self._pos_counts
+
+    def all_positions(self) -> np.ndarray:
+        """Every document's positions concatenated in list order; position_counts() gives each one's share."""
+        if self._positions is not None:
+            if not self._positions:
+                return np.zeros(0, dtype=np.int64)
+            return np.concatenate([np.asarray(p, dtype=np.int64) for p in self._positions])
+        if self._pos_values is None:
+            gaps = decode_varints(self._pos_block).astype(np.int64)
+            counts = self.position_counts()
+            starts = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+            # Gaps restart at every document boundary: undo one running sum per doc
+            running = np.cumsum(gaps)
+            base = np.concatenate(([0], running))[starts[:-1]]
+            self._pos_values = running - np.repeat(base, counts)
+            self._pos_starts = starts
+        return self._pos_values
+
+    def encode(self) -> bytes:
+        """Serialize to the compressed layout described at the top of this module."""
+        doc_ids = np.asarray(self.doc_ids, dtype=np.int64)
+        gaps = np.diff(doc_ids, prepend=0)
+        doc_block = encode_varints(gaps)
+        tf_block = self._tf_block if self._tfs is None else encode_varints(self._tfs)
+
+        # A block read from a barrel (or concatenated by merge_posting_lists) is reused as-is
+        pos_block = self._pos_block if self._positions is None else b""
+        if self._positions is not None:
+            pos_gaps = [np.diff(self.positions(i), prepend=0) for i in range(len(self))]
+            if pos_gaps:
+                pos_block = encode_varints(np.concatenate(pos_gaps))
+
+        n_field = len(doc_ids)
+        if self._positions is None and self._pos_counts is not None:
+            pos_block = encode_varints(self._pos_counts) + pos_block
+            n_field |= POS_COUNTS_FLAG
+        header = POSTING_HEADER.pack(n_field, len(doc_block), len(tf_block), len(pos_block))
+        return header + doc_block + tf_block + pos_block
+
+    @classmethod
+    def decode(cls, buf: bytes) -> "PostingList":
+        """Decode the docIDs; the frequency and position blocks are kept encoded."""
+        n_field, doc_len, tf_len, pos_len = POSTING_HEADER.unpack_from(buf, 0)
+        start = POSTING_HEADER.size
+        doc_ids = np.cumsum(decode_varints(buf[start:start + doc_len]).astype(np.int64))
+        start += doc_len
+        tf_block = bytes(buf[start:start + tf_len])
+        start += tf_len
+        pos_block = bytes(buf[start:start + pos_len])
+        pos_counts = None
+        if n_field & POS_COUNTS_FLAG:
+            # One varint per doc: the run-length block ends at the n_docs-th final byte
+            end = int(np.flatnonzero(np.frombuffer(pos_block, dtype=np.uint8) < 0x80)[len(doc_ids) - 1]) + 1
+            pos_counts = decode_varints(pos_block[:end]).astype(np.int64)
+            pos_block = pos_block[end:]
+        return cls(doc_ids, None, pos_block=pos_block, pos_counts=pos_counts, tf_block=tf_block)
+
+    @classmethod
+    def from_postings(cls, postings: Union[List, Dict]) -> "PostingList":
+        """
+        Build from a JSON-barrel posting value.
+        Old barrels (list of docIDs) score 1 per doc; new barrels
+        ({docID: [positions]}) score len(positions).
+        """
+        if isinstance(postings, dict):
+            docs = list(postings.keys())
+            positions = [sorted(postings[d]) for d in docs]
+            tfs = [len(p) for p in positions]
+        else:
+            docs = list(dict.fromkeys(postings))
+            positions = None
+            tfs = [1] * len(docs)
+
+        if docs and all(isinstance(d, int) for d in docs):
+            doc_ids = np.asarray(docs, dtype=np.int64)
+        else:
+            doc_ids = np.asarray(docs, dtype=object)
+        order = np.argsort(doc_ids, kind="stable")
+        if positions is not None:
+            positions = [positions[i] for i in order]
+        return cls(doc_ids[order], np.asarray(tfs, dtype=np.int64)[order], positions=positions)
+
+    def to_postings(self) -> Union[List, Dict]:
+        """Inverse of from_postings(): a dict with positions, or a plain docID list without."""
+        if not self.has_positions():
+            return [doc.item() if isinstance(doc, np.generic) else doc for doc in self.doc_ids]
+        return {
+            doc.item() if isinstance(doc, np.generic) else doc: self.positions(i).tolist()
+            for i, doc in enumerate(self.doc_ids)
+        }
+
+
+def merge_posting_lists(parts: List[PostingList]) -> PostingList:
+    """
+    Union of one word's posting lists from several segments, oldest first.
+    A docID found in several parts keeps its entry from the newest one.
+
+    When each part's docIDs all follow the previous part's (the usual case,
+    since new documents get higher dense docIDs), arrays and encoded
+    position blocks are concatenated without decoding any positions.
+    Documents from parts without positions keep their tfs and get empty
+    position runs, so the other documents keep theirs.
+    """
+    parts = [part for part in parts if part is not None and len(part)]
+    if not parts:
+        return PostingList(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    if len(parts) == 1:
+        return parts[0]
+
+    doc_ids = np.concatenate([part.doc_ids for part in parts])
+    tfs = np.concatenate([part.tfs for part in parts])
+    ascending = all(prev.doc_ids[-1] < part.doc_ids[0] for prev, part in zip(parts, parts[1:]))
+    if not any(part.has_positions() for part in parts):
+        if ascending:
+            return PostingList(doc_ids, tfs)
+        _, first = np.unique(doc_ids[::-1], return_index=True)
+        keep = len(doc_ids) - 1 - first
+        return PostingList(doc_ids[keep], tfs[keep])
+    counts = np.concatenate([part.position_counts() for part in parts])
+    # Run lengths only need storing where some doc's differs from its tf
+    pos_counts = None if np.array_equal(counts, tfs) else counts
+    if ascending and all(part._pos_block or not part.has_positions() for part in parts):
+        # Position gaps restart at every document, so blocks concatenate as-is
+        return PostingList(doc_ids, tfs, pos_block=b"".join(part._pos_block for part in parts), pos_counts=pos_counts)
+
+    # General case: newest entry per docID. np.unique keeps the first
+    # occurrence, so search the parts newest first
+    if ascending:
+        keep = np.arange(len(doc_ids))
+    else:
+        _, first = np.unique(doc_ids[::-1], return_index=True)
+        keep = len(doc_ids) - 1 - first  # ascending docIDs, newest entry of each
+
+    # Gather the kept documents' slices of the flat position arrays and
+    # re-encode them directly, without per-document Python lists
+    values = np.concatenate([part.all_positions() for part in parts])
+    starts = np.concatenate(([0], np.cumsum(counts)))[keep]
+    kept_counts = counts[keep]
+    out_starts = np.cumsum(kept_counts) - kept_counts
+    rows = np.repeat(starts - out_starts, kept_counts) + np.arange(int(kept_counts.sum()))
+    kept = values[rows]
+    gaps = np.diff(kept, prepend=0)
+    first_rows = out_starts[kept_counts > 0]
+    gaps[first_rows] = kept[first_rows]  # gaps restart at every document
+    kept_tfs = tfs[keep]
+    kept_pos_counts = None if np.array_equal(kept_counts, kept_tfs) else kept_counts
+    return PostingList(doc_ids[keep], kept_tfs, pos_block=encode_varints(gaps), pos_counts=kept_pos_counts)
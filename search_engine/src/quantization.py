@@ -0,0 +1,209 @@
+# src/quantization.py
+"""
+Compressed document embeddings: optional PCA, then int8 scalar quantization.
+
+Each (optionally PCA-projected) dimension is mapped linearly from its
+[min, max] range onto int8, so a 100-dim float32 vector (400 bytes)
+becomes 100 bytes, or fewer after PCA.
+
+Scoring is asymmetric: the float query is folded into the quantizer's
+scale once, and dot products run straight on the int8 codes. The
+per-dimension offsets add the same constant to every document, so they
+can be dropped for ranking. The best rerank candidates are then rescored
+exactly against the float matrix in embedding_store. That matrix is
+memory-mapped, so only those rows are paged in.
+
+quantizer.npz records the row count and docID-order fingerprint of the
+packing the codes were built from; codes from another packing are
+rejected.
+
+Build and report memory/recall with:  python quantization.py [--dim 48] --evaluate
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import embedding_store, normalize_rows
+from ranking import top_k_results
+
+_CHUNK = 65536  # codes widened to float32 per block while scoring
+
+
+class QuantizedEmbeddings:
+    """
+    int8 codes (codes.npy, memory-mapped) plus the quantizer parameters
+    (quantizer.npz: per-dimension low/scale, optional PCA mean/components).
+    """
+
+    def __init__(self):
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.low = np.zeros(0, dtype=np.float32)
+        self.scale = np.zeros(0, dtype=np.float32)
+        self.pca_mean: Optional[np.ndarray] = None
+        self.pca_components: Optional[np.ndarray] = None  # (dim, reduced_dim)
+        self.loaded = False
+        self._load_failed = False  # remembered so queries do not retry the filesystem
+
+    @property
+    def codes_path(self) -> str:
+        return os.path.join(embedding_store.packed_dir, "codes.npy")
+
+    @property
+    def params_path(self) -> str:
+        return os.path.join(embedding_store.packed_dir, "quantizer.npz")
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.pca_components is None:
+            return vectors
+        return (vectors - self.pca_mean) @ self.pca_components
+
+    def fit_pca(self, dim: int, sample_size: int = 50000, seed: int = 0) -> None:
+        """Principal components of a sample of the packed embeddings."""
+        vectors = embedding_store.vectors
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(len(vectors), sample_size), replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+        self.pca_mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - self.pca_mean, full_matrices=False)
+        self.pca_components = vt[:dim].T.astype(np.float32)
+
+    def build(self, dim: Optional[int] = None) -> None:
+        """Quantize the packed embeddings, after PCA to dim dimensions if given."""
+        vectors = embedding_store.vectors
+        if len(vectors) == 0:
+            raise ValueError("No packed embeddings to quantize; pack them first")
+        self.pca_mean = self.pca_components = None
+        if dim is not None and dim < vectors.shape[1]:
+            self.fit_pca(dim)
+
+        low = np.full(self._project(vectors[:1]).shape[1], np.inf, dtype=np.float32)
+        high = np.full_like(low, -np.inf)
+        for start in range(0, len(vectors), _CHUNK):
+            block = self._project(vectors[start:start + _CHUNK])
+            low = np.minimum(low, block.min(axis=0))
+            high = np.maximum(high, block.max(axis=0))
+        self.low = low
+        self.scale = np.maximum(high - low, 1e-12) / 255.0
+
+        self.codes = np.empty((len(vectors), len(low)), dtype=np.int8)
+        for start in range(0, len(vectors), _CHUNK):
+            block = self._project(vectors[start:start + _CHUNK])
+            self.codes[start:start + len(block)] = np.rint((block - self.low) / self.scale - 128.0).clip(-128, 127)
+        self.loaded = True
+
+    def save(self) -> None:
+        np.save(self.codes_path, self.codes)
+        params = {"low": self.low, "scale": self.scale,
+                  "n_rows": len(embedding_store.doc_ids), "fingerprint": embedding_store.fingerprint()}
+        if self.pca_components is not None:
+            params.update(pca_mean=self.pca_mean, pca_components=self.pca_components)
+        np.savez(self.params_path, **params)
+        self._load_failed = False
+
+    def load(self) -> bool:
+        self.loaded = False
+        self._load_failed = True
+        if not (os.path.exists(self.codes_path) and os.path.exists(self.params_path)):
+            return False
+        params = np.load(self.params_path)
+        codes = np.load(self.codes_path, mmap_mode="r")
+        if ("n_rows" not in params or int(params["n_rows"]) != len(embedding_store.doc_ids)
+                or int(params["fingerprint"]) != embedding_store.fingerprint() or len(codes) != len(embedding_store.doc_ids)):
+            print(f"⚠️  {self.codes_path} does not match the packed embeddings; rebuild it (python quantization.py)")
+            return False
+        self.codes = codes
+        self.low, self.scale = params["low"], params["scale"]
+        self.pca_mean = params["pca_mean"] if "pca_mean" in params else None
+        self.pca_components = params["pca_components"] if "pca_components" in params else None
+        self._load_failed = False
+        self.loaded = True
+        return True
+
+    def ready(self) -> bool:
+        """Loaded, trying load() once rather than on every query."""
+        if not self.loaded and not self._load_failed:
+            self.load()
+        return self.loaded
+
+    def invalidate(self) -> None:
+        """Delete the codes (they no longer match the packed embeddings)."""
+        for path in (self.codes_path, self.params_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.pca_mean = self.pca_components = None
+        self.loaded = False
+        self._load_failed = True
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Dot products with the decoded codes, minus a per-query constant (rank-equivalent)."""
+        weights = (self._project(query) * self.scale).astype(np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), _CHUNK):
+            block = self.codes[start:start + _CHUNK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weights
+        return scores
+
+    def search(self, query_vec: np.ndarray, top_k: Optional[int] = 10, rerank: int = 100) -> List[Tuple[int, float]]:
+        """
+        [(docID, cosine similarity), ...]: the rerank best documents by code
+        scores, rescored exactly with the float vectors, best first.
+        """
+        query = normalize_rows(query_vec)
+        approx = self.approximate_scores(query)
+        shortlist = max(rerank, top_k or 0)
+        if shortlist < len(approx):
+            rows = np.sort(np.argpartition(-approx, shortlist - 1)[:shortlist])
+        else:
+            rows = np.arange(len(approx))
+        doc_ids = np.asarray(embedding_store.doc_ids[rows])
+        scores = np.asarray(embedding_store.vectors[rows]) @ query
+        if embedding_store.extra_ids:
+            doc_ids = np.concatenate((doc_ids, np.array(embedding_store.extra_ids, dtype=np.int64)))
+            scores = np.concatenate((scores, np.vstack(embedding_store.extra_vectors) @ query))
+        return top_k_results(doc_ids, scores, top_k)
+
+    def evaluate(self, n_queries: int = 200, top_k: int = 10, reranks=(0, 10, 50, 100, 500), seed: int = 1) -> None:
+        """Print memory against the float matrix and recall@top_k / latency per rerank depth."""
+        float_bytes = embedding_store.vectors.size * 4
+        code_bytes = self.codes.size
+        print(f"float32 matrix: {float_bytes / 1e6:.1f} MB, int8 codes: {code_bytes / 1e6:.1f} MB "
+              f"({float_bytes / max(1, code_bytes):.1f}x smaller, dim {embedding_store.dim()} -> {self.codes.shape[1]})")
+
+        rng = np.random.default_rng(seed)
+        n = len(embedding_store.vectors)
+        rows = rng.choice(n, size=min(n_queries, n), replace=False)
+        queries = normalize_rows(np.asarray(embedding_store.vectors[np.sort(rows)]) + rng.normal(0, 0.05, (len(rows), embedding_store.dim())))
+        exact = [{d for d, _ in embedding_store.search(q, top_k)} for q in queries]
+        for rerank in reranks:
+            start = time.perf_counter()
+            if rerank:
+                found = [{d for d, _ in self.search(q, top_k, rerank)} for q in queries]
+            else:
+                # Codes only, no float rerank
+                found = [set(np.asarray(embedding_store.doc_ids)[np.argsort(-self.approximate_scores(q))[:top_k]].tolist()) for q in queries]
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = np.mean([len(f & e) / max(1, len(e)) for f, e in zip(found, exact)])
+            print(f"rerank={rerank:<4} recall@{top_k}={recall:.3f}  {ms:.2f} ms/query")
+
+
+# Global quantized view of the packed embeddings
+quantized_embeddings = QuantizedEmbeddings()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the packed embeddings to int8 (optionally after PCA).")
+    parser.add_argument("--dim", type=int, default=None, help="PCA dimension (default: keep all)")
+    parser.add_argument("--evaluate", action="store_true", help="report memory and recall against float search")
+    args = parser.parse_args()
+
+    if embedding_store.load():
+        quantized_embeddings.build(args.dim)
+        quantized_embeddings.save()
+        print(f"✅ Saved int8 codes to {quantized_embeddings.codes_path}")
+        if args.evaluate:
+            quantized_embeddings.evaluate()
@@ -0,0 +1,441 @@
+# src/query_engine.py
+"""
+Query evaluation over sorted posting arrays with BM25 scoring.
+
+Conjunctive (AND) queries resolve terms to wordIDs and document
+frequencies first, using only the barrel term tables. A query with a
+missing term stops before any postings are read. Otherwise the terms are
+intersected from the rarest upward, so the candidate set never grows
+past the rarest term's df and each further step is a binary search of
+the few surviving docIDs into the next list.
+
+OR evaluation prunes with MaxScore: each term has an upper bound on its
+BM25 contribution, and once k documents are known, a candidate whose
+partial score plus the bounds of the terms still to be scored cannot
+reach the current k-th score is dropped unscored. Terms past that point
+only probe the surviving candidates, and their frequencies are decoded
+for the hits alone.
+
+AND evaluation prunes the same way, but a partial score is no valid
+threshold there, since the candidate may still miss a later term. The
+threshold is taken from complete matches instead: the best candidates
+of the rarest term are probed through every other list first, and the
+k-th full score among those that match all terms bounds the final k-th.
+
+Phrase and proximity queries run the same doc-level AND first and only
+then decode and merge the stored token positions of the survivors.
+
+execute_plan() runs boolean plans from query_parser: AND is an
+intersection, NOT a difference and OR a MaxScore union, all over
+sorted docID arrays.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from barrels import barrel_manager
+from lexicon import lexicon
+from ranking import bm25, top_k_results
+from query_parser import And, Or, Phrase, Term
+
+
+def intersect_sorted(candidates: np.ndarray, postings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intersect two sorted, duplicate-free docID arrays.
+    Returns (indices into candidates, indices into postings) of the common docIDs.
+
+    When candidates is much shorter, each candidate is located in postings
+    by binary search (galloping-style, O(m log n)); otherwise a linear
+    merge (np.intersect1d) is cheaper.
+    """
+    m, n = len(candidates), len(postings)
+    if m == 0 or n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    if m * max(int(np.log2(n)), 1) < m + n:
+        pos = np.searchsorted(postings, candidates)
+        pos_clipped = np.minimum(pos, n - 1)
+        hit = (pos < n) & (postings[pos_clipped] == candidates)
+        return np.flatnonzero(hit), pos_clipped[hit]
+
+    _, idx_c, idx_p = np.intersect1d(candidates, postings, assume_unique=True, return_indices=True)
+    return idx_c, idx_p
+
+
+def resolve_terms(words: List[str], prefetched: Optional[Dict] = None) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Map query words to (word, wordID, df), rarest first.
+    Returns None as soon as one word is unknown or has no postings.
+    Repeated words are only counted once. With prefetched terms (from
+    barrel_manager.fetch_terms) the barrels are not consulted.
+    """
+    terms = []
+    for word in dict.fromkeys(words):
+        word_id = lexicon.get_id(word)
+        if word_id == 0:
+            print(f"Word '{word}' not in lexicon.")
+            return None
+        if prefetched is None:
+            df = barrel_manager.get_df(word_id)
+        else:
+            df = len(prefetched[word_id][0]) if word_id in prefetched else 0
+        if df == 0:
+            print(f"WordID {word_id} for '{word}' has no postings.")
+            return None
+        terms.append((word, word_id, df))
+    terms.sort(key=lambda term: term[2])
+    return terms
+
+
+AND_PROBE_FACTOR = 4  # candidates probed per requested result to find complete-match thresholds
+
+
+def _kth_score(scores: np.ndarray, top_k: int) -> float:
+    """Current pruning threshold: the k-th best score, or 0 while fewer than k docs are known."""
+    if top_k is None or len(scores) < top_k:
+        return 0.0
+    return float(np.partition(scores, len(scores) - top_k)[len(scores) - top_k])
+
+
+def conjunctive_search(words: List[str], top_k: Optional[int] = None, prefetched: Optional[Dict] = None) -> List[Tuple]:
+    """
+    Documents containing every word, scored by the sum of the words'
+    BM25 contributions, best first.
+    prefetched maps wordID -> (PostingList, upper bound), as returned by
+    barrel_manager.fetch_terms, so a batch of queries can share postings.
+    """
+    docs, scores = conjunctive_scores(words, top_k, prefetched)
+    return top_k_results(docs, scores, top_k)
+
+
+def conjunctive_scores(words: List[str], top_k: Optional[int] = None, prefetched: Optional[Dict] = None):
+    """
+    (docIDs, scores) of the AND query, in docID order. Without top_k every
+    matching document is returned; with it, documents that cannot reach
+    the top-k may be dropped (see _complete_threshold).
+    """
+    terms = resolve_terms(words, prefetched)
+    if not terms:
+        return _empty()
+
+    if prefetched is None:
+        lists = [barrel_manager.get_postings(word_id) for _, word_id, _ in terms]
+        bounds = [barrel_manager.get_max_score(word_id) for _, word_id, _ in terms] if top_k else []
+    else:
+        lists = [prefetched[word_id][0] for _, word_id, _ in terms]
+        bounds = [prefetched[word_id][1] for _, word_id, _ in terms]
+    dfs = [df for _, _, df in terms]
+
+    rarest = lists[0]
+    docs = rarest.doc_ids
+    scores = bm25.score(docs, rarest.tfs, dfs[0])
+
+    threshold = 0.0
+    if top_k and len(terms) > 1 and len(docs) > top_k:
+        remaining = np.cumsum(bounds[::-1])[::-1].tolist() + [0.0]
+        threshold = _complete_threshold(docs, scores, lists[1:], dfs[1:], top_k)
+    for i in range(1, len(terms)):
+        if threshold > 0:
+            # Even with every remaining term at its bound these cannot reach the top-k
+            alive = scores + remaining[i] >= threshold
+            docs, scores = docs[alive], scores[alive]
+        idx_docs, idx_post = intersect_sorted(docs, lists[i].doc_ids)
+        docs = docs[idx_docs]
+        scores = scores[idx_docs] + bm25.score(docs, lists[i].tfs_at(idx_post), dfs[i])
+        if not len(docs):
+            return _empty()
+
+    return docs, scores
+
+
+def _complete_threshold(docs: np.ndarray, scores: np.ndarray, lists: List, dfs: List[int], top_k: int) -> float:
+    """
+    Lower bound on the final k-th AND score: probe the best-scoring
+    candidates of the rarest term through every other list and take the
+    k-th full score among those that matched all of them (0 if fewer did).
+    """
+    n_probe = min(len(docs), AND_PROBE_FACTOR * top_k)
+    probe = np.sort(np.argpartition(-scores, n_probe - 1)[:n_probe])
+    probe_docs, probe_scores = docs[probe], scores[probe]
+    for postings, df in zip(lists, dfs):
+        idx_docs, idx_post = intersect_sorted(probe_docs, postings.doc_ids)
+        probe_docs = probe_docs[idx_docs]
+        probe_scores = probe_scores[idx_docs] + bm25.score(probe_docs, postings.tfs_at(idx_post), df)
+    return _kth_score(probe_scores, top_k)
+
+
+def _union(docs: np.ndarray, scores: np.ndarray, new_docs: np.ndarray, new_scores: np.ndarray):
+    """Merge two sorted scored docID arrays, summing scores of shared docIDs."""
+    if not len(docs):
+        return new_docs, new_scores
+    merged, inverse = np.unique(np.concatenate((docs, new_docs)), return_inverse=True)
+    summed = np.bincount(inverse, weights=np.concatenate((scores, new_scores)), minlength=len(merged))
+    return merged, summed
+
+
+class ScoredList:
+    """
+    A sorted docID array whose scores are computed on demand, either for
+    the whole list or only for selected rows. Term postings score lazily
+    with BM25; already evaluated sub-queries just index their score array.
+    """
+
+    def __init__(self, doc_ids: np.ndarray, score_rows):
+        self.doc_ids = doc_ids
+        self.score_rows = score_rows
+
+    @classmethod
+    def from_postings(cls, postings, df: int) -> "ScoredList":
+        return cls(postings.doc_ids, lambda rows: bm25.score(postings.doc_ids[rows], postings.tfs_at(rows), df))
+
+    @classmethod
+    def from_arrays(cls, doc_ids: np.ndarray, scores: np.ndarray) -> "ScoredList":
+        return cls(doc_ids, lambda rows: scores[rows])
+
+
+def max_score_union(sources: List[Tuple[float, Callable]], top_k: Optional[int] = None):
+    """
+    OR of scored lists with MaxScore pruning; returns (docIDs, scores).
+
+    sources are (upper_bound, load) pairs, where load() returns a
+    ScoredList and is only called when that source is visited. Sources
+    are visited from the highest bound down. While the bounds of the
+    unvisited sources could still lift an unseen document into the top-k,
+    their docs are merged in ("essential" sources). After that, the
+    remaining sources only add scores to existing candidates, and
+    candidates that cannot reach the threshold are dropped.
+    """
+    sources = sorted(sources, key=lambda source: source[0], reverse=True)
+    remaining = np.cumsum([bound for bound, _ in sources][::-1])[::-1].tolist() + [0.0]
+
+    docs = np.zeros(0, dtype=np.int64)
+    scores = np.zeros(0, dtype=np.float64)
+    essential = True
+    for i, (_, load) in enumerate(sources):
+        scored = load()
+        if essential:
+            docs, scores = _union(docs, scores, scored.doc_ids, scored.score_rows(slice(None)))
+        else:
+            idx_docs, idx_list = intersect_sorted(docs, scored.doc_ids)
+            scores[idx_docs] += scored.score_rows(idx_list)
+
+        threshold = _kth_score(scores, top_k)
+        if threshold > 0 and remaining[i + 1] < threshold:
+            # No unseen document can reach the top-k any more
+            essential = False
+            alive = scores + remaining[i + 1] >= threshold
+            docs, scores = docs[alive], scores[alive]
+
+    return docs, scores
+
+
+def _term_source(word_id: int, df: int) -> Tuple[float, Callable]:
+    """(upper bound, loader) for one term; postings are only decoded if visited."""
+    def load():
+        return ScoredList.from_postings(barrel_manager.get_postings(word_id), df)
+    return barrel_manager.get_max_score(word_id), load
+
+
+def disjunctive_search(words: List[str], top_k: Optional[int] = None) -> List[Tuple]:
+    """
+    Documents containing any of the words (OR), scored by BM25, best first.
+    Unknown words are skipped. Evaluated with max_score_union().
+    """
+    sources = []
+    for word in dict.fromkeys(words):
+        word_id = lexicon.get_id(word)
+        df = barrel_manager.get_df(word_id) if word_id else 0
+        if df:
+            sources.append(_term_source(word_id, df))
+    if not sources:
+        return []
+
+    docs, scores = max_score_union(sources, top_k)
+    return top_k_results(docs, scores, top_k)
+
+
+def _conjunctive_postings(terms: List[Tuple[str, int, int]]):
+    """
+    Doc-level AND of resolved terms (rarest first), keeping for every term
+    the index of each surviving document inside that term's PostingList,
+    so positions can be fetched afterwards.
+    Returns (docIDs, {word: (PostingList, indices)}).
+    """
+    lists = {word: barrel_manager.get_postings(word_id) for word, word_id, _ in terms}
+    docs = lists[terms[0][0]].doc_ids
+    rows = {terms[0][0]: np.arange(len(docs))}
+    for word, _, _ in terms[1:]:
+        idx_docs, idx_post = intersect_sorted(docs, lists[word].doc_ids)
+        docs = docs[idx_docs]
+        rows = {w: r[idx_docs] for w, r in rows.items()}
+        rows[word] = idx_post
+        if not len(docs):
+            break
+    return docs, {word: (lists[word], rows[word]) for word in rows}
+
+
+def phrase_matches(words: List[str]):
+    """
+    (docIDs, scores) of documents containing the words as an exact phrase
+    (consecutive token positions), scored by BM25 over the phrase frequency.
+    Positions are only decoded for documents that survive the doc-level AND.
+    """
+    terms = resolve_terms(words)
+    if not terms:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    docs, matched = _conjunctive_postings(terms)
+
+    keep, phrase_tfs = [], []
+    for i in range(len(docs)):
+        # Shift each word's positions back by its offset in the phrase;
+        # phrase starts are the positions common to every word
+        starts = None
+        for offset, word in enumerate(words):
+            plist, rows = matched[word]
+            shifted = plist.positions(rows[i]) - offset
+            starts = shifted if starts is None else np.intersect1d(starts, shifted, assume_unique=True)
+            if not len(starts):
+                break
+        if len(starts):
+            keep.append(i)
+            phrase_tfs.append(len(starts))
+
+    docs = docs[keep]
+    return docs, bm25.score(docs, np.asarray(phrase_tfs, dtype=np.int64), max(len(docs), 1))
+
+
+def phrase_search(words: List[str], top_k: Optional[int] = None) -> List[Tuple]:
+    """Documents containing the words as an exact phrase, best first."""
+    docs, scores = phrase_matches(words)
+    return top_k_results(docs, scores, top_k)
+
+
+def proximity_search(words: List[str], window: int = 5, top_k: Optional[int] = None) -> List[Tuple]:
+    """
+    NEAR query: documents where every word occurs within `window` tokens
+    of an occurrence of the rarest word, in any order. The number of such
+    anchor occurrences is the match frequency used for BM25 scoring.
+    """
+    terms = resolve_terms(words)
+    if not terms:
+        return []
+    docs, matched = _conjunctive_postings(terms)
+    anchor = terms[0][0]
+
+    keep, near_tfs = [], []
+    for i in range(len(docs)):
+        plist, rows = matched[anchor]
+        anchors = plist.positions(rows[i])
+        ok = np.ones(len(anchors), dtype=bool)
+        for word, _, _ in terms[1:]:
+            plist, rows = matched[word]
+            positions = plist.positions(rows[i])
+            # Any occurrence of this word inside [anchor - window, anchor + window]?
+            lo = np.searchsorted(positions, anchors - window, side="left")
+            hi = np.searchsorted(positions, anchors + window, side="right")
+            ok &= hi > lo
+            if not ok.any():
+                break
+        hits = int(ok.sum())
+        if hits:
+            keep.append(i)
+            near_tfs.append(hits)
+
+    if not keep:
+        return []
+    docs = docs[keep]
+    scores = bm25.score(docs, np.asarray(near_tfs), len(docs))
+    return top_k_results(docs, scores, top_k)
+
+
+def _empty():
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+
+def _estimate(node) -> int:
+    """Upper bound on a plan node's result size, from term-table dfs only."""
+    if isinstance(node, Term):
+        word_id = lexicon.get_id(node.word)
+        return barrel_manager.get_df(word_id) if word_id else 0
+    if isinstance(node, Phrase):
+        return min(_estimate(Term(word)) for word in node.words)
+    if isinstance(node, And):
+        return min(_estimate(child) for child in node.include)
+    return sum(_estimate(child) for child in node.children)
+
+
+def _source(node) -> Tuple[float, Callable]:
+    """(upper bound, loader) of an OR branch for max_score_union()."""
+    if isinstance(node, Term):
+        word_id = lexicon.get_id(node.word)
+        df = barrel_manager.get_df(word_id) if word_id else 0
+        if df:
+            return _term_source(word_id, df)
+        docs, scores = _empty()
+    else:
+        docs, scores = _evaluate(node)
+    bound = float(scores.max()) if len(scores) else 0.0
+    return bound, lambda: ScoredList.from_arrays(docs, scores)
+
+
+def _evaluate(node, top_k: Optional[int] = None):
+    """Evaluate a plan node to sorted (docIDs, scores) arrays."""
+    if isinstance(node, Term):
+        word_id = lexicon.get_id(node.word)
+        postings = barrel_manager.get_postings(word_id) if word_id else None
+        if postings is None:
+            return _empty()
+        return postings.doc_ids, bm25.score(postings.doc_ids, postings.tfs, len(postings))
+
+    if isinstance(node, Phrase):
+        return phrase_matches(node.words)
+
+    if isinstance(node, Or):
+        # top_k only prunes at the root: below an AND any doc may still matter
+        return max_score_union([_source(child) for child in node.children], top_k)
+
+    # And: intersect the cheapest operand first and stop as soon as nothing is left
+    include = sorted(node.include, key=_estimate)
+    if _estimate(include[0]) == 0:
+        return _empty()
+    docs, scores = _evaluate(include[0])
+    for child in include[1:]:
+        if not len(docs):
+            return _empty()
+        child_docs, child_scores = _evaluate(child)
+        idx_docs, idx_child = intersect_sorted(docs, child_docs)
+        docs = docs[idx_docs]
+        scores = scores[idx_docs] + child_scores[idx_child]
+
+    # Difference: drop everything matched by an excluded branch
+    for child in node.exclude:
+        if not len(docs):
+            break
+        child_docs, _ = _evaluate(child)
+        idx_docs, _ = intersect_sorted(docs, child_docs)
+        if len(idx_docs):
+            keep = np.ones(len(docs), dtype=bool)
+            keep[idx_docs] = False
+            docs, scores = docs[keep], scores[keep]
+    return docs, scores
+
+
+def execute_plan(plan, top_k: Optional[int] = None) -> List[Tuple]:
+    """
+    Run a compiled boolean query (query_parser.compile_query) and return
+    [(docID, score), ...], best first. Every operator works on sorted
+    docID/score arrays; nothing is materialized as per-branch dicts.
+    """
+    docs, scores = plan_scores(plan, top_k)
+    return top_k_results(docs, scores, top_k)
+
+
+def plan_scores(plan, top_k: Optional[int] = None):
+    """(docIDs, scores) of a compiled boolean query, in docID order."""
+    if plan is None:
+        return _empty()
+    if isinstance(plan, And) and not plan.exclude and all(isinstance(c, Term) for c in plan.include):
+        # Plain AND of words: the rarest-first intersection
+        return conjunctive_scores([child.word for child in plan.include], top_k)
+    return _evaluate(plan, top_k)
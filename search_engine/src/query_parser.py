@@ -0,0 +1,215 @@
+# src/query_parser.py
+"""
+Boolean query language compiled to a plan tree.
+
+Grammar (operators are case-insensitive, AND binds tighter than OR):
+    query    := or_expr
+    or_expr  := and_expr ("OR" and_expr)*
+    and_expr := not_expr (["AND"] not_expr)*      adjacent operands mean AND
+    not_expr := "NOT" not_expr | "-" not_expr | primary
+    primary  := "(" or_expr ")" | '"' phrase '"' | word
+
+Example: covid AND (vaccine OR "spike protein") NOT mouse
+
+compile_query() normalizes the parse into plan nodes: nested ANDs/ORs
+are flattened and NOTs become the exclude list of their enclosing AND.
+A NOT with nothing positive to subtract from is rejected. Words are run
+through the indexing Tokenizer; a stopword disappears, and a word that
+splits into several tokens becomes a phrase.
+"""
+import re
+from typing import List, Optional
+
+from tokenizer_module import Tokenizer
+
+_tokenizer = Tokenizer(remove_stopwords=True)
+_LEXER = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(-)(?=\S)|([^\s()"]+))')
+
+
+class QueryParseError(ValueError):
+    """Raised for malformed boolean queries."""
+
+
+class Term:
+    __slots__ = ("word",)
+
+    def __init__(self, word: str):
+        self.word = word
+
+    def __repr__(self):
+        return f"Term({self.word!r})"
+
+
+class Phrase:
+    __slots__ = ("words",)
+
+    def __init__(self, words: List[str]):
+        self.words = words
+
+    def __repr__(self):
+        return f"Phrase({' '.join(self.words)!r})"
+
+
+class And:
+    """Documents matching every include node and none of the exclude nodes."""
+    __slots__ = ("include", "exclude")
+
+    def __init__(self, include: list, exclude: list = None):
+        self.include = include
+        self.exclude = exclude or []
+
+    def __repr__(self):
+        if self.exclude:
+            return f"And({self.include!r}, exclude={self.exclude!r})"
+        return f"And({self.include!r})"
+
+
+class Or:
+    __slots__ = ("children",)
+
+    def __init__(self, children: list):
+        self.children = children
+
+    def __repr__(self):
+        return f"Or({self.children!r})"
+
+
+class Not:
+    """Only exists between parsing and compile_query(); never part of a plan."""
+    __slots__ = ("child",)
+
+    def __init__(self, child):
+        self.child = child
+
+
+def _lex(text: str) -> List[tuple]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _LEXER.match(text, pos)
+        if match is None or match.end() == pos:
+            raise QueryParseError(f"Unexpected character at position {pos}: {text[pos]!r}")
+        lparen, rparen, phrase, minus, word = match.groups()
+        if lparen:
+            tokens.append(("(", None))
+        elif rparen:
+            tokens.append((")", None))
+        elif phrase is not None:
+            tokens.append(("PHRASE", phrase))
+        elif minus:
+            tokens.append(("NOT", None))
+        elif word.upper() in ("AND", "OR", "NOT"):
+            tokens.append((word.upper(), None))
+        else:
+            tokens.append(("WORD", word))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise QueryParseError("Query is empty")
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise QueryParseError(f"Unexpected {self.peek()} at token {self.pos + 1}")
+        return node
+
+    def or_expr(self):
+        children = [self.and_expr()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.and_expr())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def and_expr(self):
+        children = [self.not_expr()]
+        while self.peek() in ("AND", "NOT", "WORD", "PHRASE", "("):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.not_expr())
+        return children[0] if len(children) == 1 else And(children)
+
+    def not_expr(self):
+        if self.peek() == "NOT":
+            self.take()
+            return Not(self.not_expr())
+        return self.primary()
+
+    def primary(self):
+        kind = self.peek()
+        if kind is None:
+            raise QueryParseError("Query ends where a term was expected")
+        kind, value = self.take()
+        if kind == "(":
+            node = self.or_expr()
+            if self.peek() != ")":
+                raise QueryParseError("Missing closing parenthesis")
+            self.take()
+            return node
+        if kind in ("WORD", "PHRASE"):
+            words = _tokenizer.tokenize(value)
+            if not words:
+                return None  # stopword / noise: contributes nothing
+            return Term(words[0]) if len(words) == 1 else Phrase(words)
+        raise QueryParseError(f"Unexpected {kind} where a term was expected")
+
+
+def _normalize(node):
+    """Flatten nested operators, fold NOTs into And.exclude and drop empty operands."""
+    if node is None or isinstance(node, (Term, Phrase)):
+        return node
+
+    if isinstance(node, Not):
+        raise QueryParseError("NOT needs a positive term to subtract from, e.g. 'virus NOT influenza'")
+
+    if isinstance(node, Or):
+        children = []
+        for child in node.children:
+            child = _normalize(child)
+            if isinstance(child, Or):
+                children.extend(child.children)
+            elif child is not None:
+                children.append(child)
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else Or(children)
+
+    include, exclude = [], []
+    for child in node.include:
+        if isinstance(child, Not):
+            negated = _normalize(child.child)
+            if negated is not None:
+                exclude.append(negated)
+            continue
+        child = _normalize(child)
+        if isinstance(child, And):
+            include.extend(child.include)
+            exclude.extend(child.exclude)
+        elif child is not None:
+            include.append(child)
+    if not include:
+        if exclude:
+            raise QueryParseError("NOT needs a positive term to subtract from, e.g. 'virus NOT influenza'")
+        return None
+    if len(include) == 1 and not exclude:
+        return include[0]
+    return And(include, exclude)
+
+
+def compile_query(text: str):
+    """Parse a boolean query into a plan tree (Term / Phrase / And / Or), or None if nothing is searchable."""
+    return _normalize(_Parser(_lex(text)).parse())
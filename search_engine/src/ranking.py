@@ -0,0 +1,191 @@
+# src/ranking.py
+"""
+Scoring helpers shared by the search functions.
+"""
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from doc_ids import doc_id_table
+
+
+class BM25:
+    """
+    Okapi BM25 term scoring over dense int docIDs.
+
+    Document lengths come from the forward index (doc_lengths.npy, indexed
+    by int docID). Documents without a known length, including barrels that
+    still use string docIDs, are scored as if they had the average length.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.avgdl = 1.0
+        self.min_length = 1.0  # shortest length lengths() can return
+        self.path = None
+        self._buffer = None  # spare capacity behind doc_lengths while documents are added
+        self._length_sum = 0  # of the known (> 0) lengths, for incremental avgdl
+        self._length_count = 0
+        self._min_row = 0
+
+    def num_docs(self) -> int:
+        return max(len(self.doc_lengths), doc_id_table.size())
+
+    def idf(self, df: int) -> float:
+        # The +1 inside the log keeps idf positive, so partial sums are lower bounds
+        n = max(self.num_docs(), df)
+        return float(np.log(1.0 + (n - df + 0.5) / (df + 0.5)))
+
+    def lengths(self, doc_ids: np.ndarray) -> np.ndarray:
+        if doc_ids.dtype == object or len(self.doc_lengths) == 0:
+            return np.full(len(doc_ids), self.avgdl)
+        known = doc_ids < len(self.doc_lengths)
+        lengths = np.full(len(doc_ids), self.avgdl)
+        lengths[known] = self.doc_lengths[doc_ids[known]]
+        return lengths
+
+    def score(self, doc_ids: np.ndarray, tfs: np.ndarray, df: int) -> np.ndarray:
+        """BM25 contribution of one term for each (docID, tf) pair."""
+        tfs = tfs.astype(np.float64)
+        norm = self.k1 * (1.0 - self.b + self.b * self.lengths(doc_ids) / self.avgdl)
+        return self.idf(df) * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+    def saturation(self, max_tf: float) -> float:
+        """
+        Upper bound of the tf part of score() for postings whose largest tf
+        is max_tf. It grows with tf and shrinks with document length, so
+        the shortest possible length gives a bound that holds for any
+        document, with the current avgdl.
+        """
+        if max_tf <= 0:
+            return 0.0
+        norm = self.k1 * (1.0 - self.b + self.b * self.min_length / self.avgdl)
+        return max_tf * (self.k1 + 1.0) / (max_tf + norm)
+
+    def term_bound(self, max_tf: float, df: int) -> float:
+        """
+        Upper bound of score(..., df) over a term's postings. Barrels store
+        only max_tf, so the bound follows N, avgdl and df as documents are added.
+        """
+        return self.idf(df) * self.saturation(max_tf)
+
+    def set_doc_length(self, doc_id: int, length: int) -> None:
+        """
+        Record the length of a newly indexed document. avgdl and min_length
+        are updated incrementally; the table is persisted when the live
+        index checkpoints (segments.py), not on every add.
+        """
+        n = len(self.doc_lengths)
+        if doc_id >= n:
+            # Grow by doubling into a spare buffer; doc_lengths stays a view of it
+            if self._buffer is None or self.doc_lengths.base is not self._buffer or len(self._buffer) <= doc_id:
+                self._buffer = np.zeros(max(doc_id + 1, 2 * n), dtype=np.int32)
+                self._buffer[:n] = self.doc_lengths
+            self.doc_lengths = self._buffer[:doc_id + 1]
+        old = int(self.doc_lengths[doc_id])
+        self.doc_lengths[doc_id] = length
+        if old > 0:
+            self._length_sum -= old
+            self._length_count -= 1
+        if length > 0:
+            self._length_sum += length
+            self._length_count += 1
+        if doc_id >= n:
+            # Rows skipped over stay unset (0)
+            self._min_row = 0 if doc_id > n else (min(self._min_row, length) if n else length)
+        elif length < self._min_row:
+            self._min_row = length
+        elif old == self._min_row and length > old:
+            self._min_row = int(self.doc_lengths.min())
+        self.avgdl = self._length_sum / self._length_count if self._length_count else 1.0
+        self.min_length = min(float(self._min_row), self.avgdl)
+
+    def _update_avgdl(self) -> None:
+        known = self.doc_lengths[self.doc_lengths > 0]
+        self._length_sum, self._length_count = int(known.sum()), len(known)
+        self.avgdl = float(known.mean()) if len(known) else 1.0
+        # Docs outside the table score with avgdl; rows never set score with 0
+        self._min_row = int(self.doc_lengths.min()) if len(self.doc_lengths) else 0
+        self.min_length = min(float(self._min_row), self.avgdl) if len(self.doc_lengths) else self.avgdl
+
+    def save(self, path: str = None) -> None:
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "data", "doc_lengths.npy")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # np.save appends .npy to names without it
+        temp_path = path[:-len(".npy")] + ".tmp.npy" if path.endswith(".npy") else path + ".tmp.npy"
+        np.save(temp_path, self.doc_lengths)
+        os.replace(temp_path, path)
+
+    def load(self, path: str = None) -> None:
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), "..", "data", "doc_lengths.npy")
+        path = os.path.abspath(path)
+        self.path = path
+        if not os.path.exists(path):
+            print(f"Document lengths not found at {path}. BM25 will skip length normalization.")
+            return
+        self.doc_lengths = np.load(path).astype(np.int32)
+        self._update_avgdl()
+
+
+def top_k_results(doc_ids: np.ndarray, scores: np.ndarray, top_k: Optional[int] = None) -> List[Tuple]:
+    """
+    Return [(docID, score), ...] for the top_k highest scores, best first.
+
+    Selection is O(n) (np.partition); only the k survivors are sorted.
+    Ties are broken by position in the input, i.e. by ascending docID for
+    posting-ordered arrays, so the result is deterministic.
+    top_k=None returns every document, fully sorted.
+    """
+    order = ranked_order(scores, top_k)
+    return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
+
+
+def ranked_order(scores: np.ndarray, top_k: Optional[int] = None) -> np.ndarray:
+    """Indices of the top_k best scores (all of them for None), in top_k_results() order."""
+    n = len(scores)
+    if n == 0 or (top_k is not None and top_k <= 0):
+        return np.zeros(0, dtype=np.int64)
+
+    if top_k is not None and top_k < n:
+        kth = np.partition(-scores, top_k - 1)[top_k - 1]
+        above = np.flatnonzero(-scores < kth)
+        ties = np.flatnonzero(-scores == kth)[:top_k - len(above)]
+        idx = np.concatenate((above, ties))
+    else:
+        idx = np.arange(n)
+
+    return idx[np.lexsort((idx, -scores[idx]))]
+
+
+def ranked_below(doc_ids: np.ndarray, scores: np.ndarray, after: Tuple[int, float]):
+    """
+    (docIDs, scores) of the documents that top_k_results() orders after
+    the result row `after` = (docID, score): lower score, or equal score
+    and higher docID.
+    """
+    doc_id, score = after
+    keep = (scores < score) | ((scores == score) & (doc_ids > doc_id))
+    return doc_ids[keep], scores[keep]
+
+
+def results_after(doc_ids: np.ndarray, scores: np.ndarray, top_k: Optional[int],
+                  after: Optional[Tuple[int, float]] = None) -> List[Tuple]:
+    """
+    The next top_k results in top_k_results() order (score descending,
+    then docID ascending) that rank strictly below `after`, the last
+    (docID, score) row of the previous page. doc_ids must be ascending.
+    Only the remaining documents are partitioned; nothing is re-sorted.
+    """
+    if after is not None:
+        doc_ids, scores = ranked_below(doc_ids, scores, after)
+    return top_k_results(doc_ids, scores, top_k)
+
+
+# Global scorer
+bm25 = BM25()
+bm25.load()
@@ -0,0 +1,114 @@
+# src/result_cache.py
+"""
+In-process cache of search results, shared by every API request.
+
+Entries are keyed by (mode, normalized query, top_k, extra parameters)
+and evicted least-recently-used once their estimated size exceeds a byte
+budget (RESULT_CACHE_MB, default 64).
+
+The index generation is bumped (and the cache cleared) whenever a
+document is indexed. A search records the generation it started under
+and put() drops results computed under an older one, so a query that
+raced with /document/add never stores pre-update results.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_ENTRY_OVERHEAD = 200  # key tuple, OrderedDict node, bookkeeping
+_RESULT_OVERHEAD = 64  # (docID, score) tuple and list slot
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so equivalent spellings of a query share an entry."""
+    return " ".join(query.split())
+
+
+def _estimate_bytes(key: Tuple, results: Sequence) -> int:
+    size = _ENTRY_OVERHEAD + sum(sys.getsizeof(part) for part in key)
+    for result in results:
+        if isinstance(result, np.ndarray):
+            size += result.nbytes
+        else:
+            size += _RESULT_OVERHEAD + sum(sys.getsizeof(value) for value in result)
+    return size
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU with generation invalidation. Values are result lists
+    [(docID, score), ...] or, for export, (docIDs, scores) array pairs.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[List]:
+        """Cached results for key (marked most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def put(self, key: Tuple, results: Sequence, generation: int) -> None:
+        """Store results computed under `generation`; stale or oversized results are dropped."""
+        results = tuple(results)
+        size = _estimate_bytes(key, results)
+        with self._lock:
+            if generation != self.generation or size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (results, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self) -> int:
+        """Start a new index generation and drop every entry. Returns the new generation."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+            return self.generation
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "generation": self.generation,
+            }
+
+
+def _budget_bytes() -> int:
+    try:
+        return max(0, int(float(os.environ.get("RESULT_CACHE_MB", 64)) * 1024 * 1024))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+# Global cache; the API reads and fills it, DocumentIndexer invalidates it
+result_cache = ResultCache(_budget_bytes())
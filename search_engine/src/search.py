@@ -1,57 +1,215 @@
 # src/search.py
+import numpy as np
+
 from barrels import barrel_manager
 from lexicon import lexicon
 from autocomplete import get_autocomplete_suggestions
+from spelling import get_spelling_suggestions
+from wildcard import expand_wildcard
 from semantic import semantic_search_query
+from ranking import bm25, top_k_results
+from query_engine import conjunctive_search, phrase_search as _phrase_search, proximity_search as _proximity_search
+from query_engine import execute_plan, disjunctive_search, conjunctive_scores, plan_scores
+from query_parser import compile_query
+from tokenizer_module import Tokenizer
+
+# Same tokenization as indexing, so query positions line up with stored positions
+query_tokenizer = Tokenizer(remove_stopwords=True)
 
-def single_word_search(word):
-    """Return list of (docID, score) tuples for a single word."""
+def _term_postings(word):
+    """Return the PostingList for a word, or None if it has no postings."""
     word_id = lexicon.get_id(word)
     if word_id == 0:
         print(f"Word '{word}' not in lexicon.")
-        return []
-
-    barrel_id = barrel_manager.get_barrel_id(word_id)
-    barrel_data = barrel_manager.load_barrel(barrel_id)
+        return None
 
-    postings = barrel_data.get(word_id, [])
-
-    if not postings:
+    postings = barrel_manager.get_postings(word_id)
+    if postings is None or not len(postings):
+        barrel_id = barrel_manager.get_barrel_id(word_id)
         print(f"WordID {word_id} for '{word}' not found in barrel {barrel_id}.")
+        return None
+    return postings
+
+
+def single_word_search(word, top_k=None):
+    """
+    Return list of (docID, score) tuples for a single word, best first.
+    DocIDs are dense ints (see doc_ids.py); translate them with
+    doc_id_table.to_external() before showing them to users.
+    top_k limits the result to the k best documents without sorting the rest.
+    """
+    postings = _term_postings(word)
+    if postings is None:
         return []
 
-    # Old barrels: list of docIDs → score = 1
-    if isinstance(postings, list):
-        results = {doc_id: 1 for doc_id in postings}
-    # New barrels: dict with positions → score = len(positions)
-    elif isinstance(postings, dict):
-        results = {doc_id: len(pos_list) for doc_id, pos_list in postings.items()}
-    else:
-        results = {}
-
-    # Return sorted list by score descending
-    return sorted(results.items(), key=lambda x: x[1], reverse=True)
+    # BM25 from frequencies and document lengths; positions are never decoded here
+    scores = bm25.score(postings.doc_ids, postings.tfs, len(postings))
+    return top_k_results(postings.doc_ids, scores, top_k)
 
 
-def multi_word_search(query):
-    """Return docs that match all words (AND search)."""
+def multi_word_search(query, top_k=None):
+    """
+    Return docs that match all words (AND search), best first.
+    Terms are intersected rarest-first and scored by their summed BM25
+    contributions (see query_engine.conjunctive_search).
+    """
     words = query.lower().split()
     if not words:
         return []
-
-    # Get results for first word
-    results = dict(single_word_search(words[0]))
-    if not results:
+    return conjunctive_search(words, top_k)
+
+
+BATCH_MODES = ("single", "multi")
+
+
+def batch_search(queries):
+    """
+    Run many single-/multi-word queries together.
+    queries is a list of (mode, query, top_k); returns one result list per
+    query, in order. The postings of every distinct term are fetched once,
+    grouped by barrel, and shared by all queries that use the term.
+    Raises ValueError for modes outside BATCH_MODES.
+    """
+    term_lists = []
+    for mode, query, _ in queries:
+        if mode == "single":
+            word = query.strip().lower()
+            term_lists.append([word] if word else [])
+        elif mode == "multi":
+            term_lists.append(query.lower().split())
+        else:
+            raise ValueError(f"unsupported batch mode '{mode}' (expected one of {', '.join(BATCH_MODES)})")
+
+    word_ids = {lexicon.get_id(word) for words in term_lists for word in words}
+    word_ids.discard(0)
+    prefetched = barrel_manager.fetch_terms(word_ids)
+
+    # A single word is scored exactly like a one-term AND query
+    return [
+        conjunctive_search(words, top_k, prefetched)
+        for words, (_, _, top_k) in zip(term_lists, queries)
+    ]
+
+
+PAGE_MODES = ("single", "multi", "boolean")
+
+
+def scored_documents(mode, query):
+    """
+    Every match of a single / multi / boolean query as (docIDs, scores)
+    arrays in docID order, unsorted, for pagination and export.
+    Raises ValueError for other modes and QueryParseError for bad boolean queries.
+    """
+    if mode == "single":
+        postings = _term_postings(query.strip().lower())
+        if postings is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        return postings.doc_ids, bm25.score(postings.doc_ids, postings.tfs, len(postings))
+    if mode == "multi":
+        return conjunctive_scores(query.lower().split())
+    if mode == "boolean":
+        return plan_scores(compile_query(query))
+    raise ValueError(f"unsupported mode '{mode}' (expected one of {', '.join(PAGE_MODES)})")
+
+
+def search_page(mode, query, page_size=10, after=None, offset=0):
+    """
+    One page of results: the page_size best documents ranked below
+    after = (docID, score), the last row of the previous page (None for
+    the first page), and offset = how many rows the earlier pages held.
+
+    Runs the pruned top-(offset + page_size) query and keeps the rows past
+    the cursor, so a page costs no more than that query. If documents
+    added since the previous page pushed the cursor further down, the
+    query is widened until the page is full or the results run out.
+    Raises ValueError for other modes or a cursor from another index.
+    """
+    top_k = offset + page_size
+    while True:
+        rows = _ranked(mode, query, top_k)
+        if after is not None and rows and isinstance(rows[0][0], str) != isinstance(after[0], str):
+            # A cursor from another index (int vs legacy string docIDs)
+            raise ValueError("cursor does not match this index")
+        page = [row for row in rows if after is None or _ranks_below(row, after)][:page_size]
+        if len(page) == page_size or len(rows) < top_k:
+            return page
+        top_k *= 2
+
+
+def _ranked(mode, query, top_k):
+    """The top_k results of a single / multi / boolean query, best first."""
+    if mode == "single":
+        return single_word_search(query.strip().lower(), top_k)
+    if mode == "multi":
+        return multi_word_search(query, top_k)
+    if mode == "boolean":
+        return boolean_search(query, top_k)
+    raise ValueError(f"unsupported mode '{mode}' (expected one of {', '.join(PAGE_MODES)})")
+
+
+def _ranks_below(row, after) -> bool:
+    """Whether (docID, score) row comes after `after` in ranking order (score desc, docID asc)."""
+    return row[1] < after[1] or (row[1] == after[1] and row[0] > after[0])
+
+
+def phrase_search(phrase, top_k=None):
+    """
+    Return docs containing the exact phrase, e.g. "spike protein", best first.
+    Stopwords are dropped exactly as during indexing.
+    """
+    words = query_tokenizer.tokenize(phrase.strip().strip('"'))
+    if not words:
         return []
+    return _phrase_search(words, top_k)
 
-    # Intersect with other words
-    for word in words[1:]:
-        word_results = dict(single_word_search(word))
-        results = {doc: score for doc, score in results.items() if doc in word_results}
-        if not results:
-            break
 
-    return sorted(results.items(), key=lambda x: x[1], reverse=True)
+def proximity_search(query, window=5, top_k=None):
+    """Return docs where all words occur within `window` tokens of each other, best first."""
+    words = query_tokenizer.tokenize(query)
+    if not words:
+        return []
+    return _proximity_search(words, window, top_k)
+
+
+def boolean_search(query, top_k=None):
+    """
+    Return docs matching a boolean query such as
+    covid AND (vaccine OR "spike protein") NOT mouse, best first.
+    Raises query_parser.QueryParseError for malformed queries.
+    """
+    return execute_plan(compile_query(query), top_k)
+
+
+def wildcard_search(pattern, top_k=None, max_expansions=50):
+    """
+    Return docs containing any word matching a wildcard pattern such as
+    sars*, *virus or cov*d, best first. The pattern expands to at most
+    max_expansions words (most frequent first), which are OR-ed together.
+    Raises ValueError for patterns too broad to look up (e.g. "a*").
+    """
+    words = expand_wildcard(pattern.strip(), max_expansions)
+    if not words:
+        return []
+    return disjunctive_search(words, top_k)
+
+
+def did_you_mean(query):
+    """
+    Return the query with every unknown term replaced by its closest
+    lexicon word (see spelling.py), or None if no term needed correcting.
+    """
+    words = query_tokenizer.tokenize(query)
+    corrected = []
+    changed = False
+    for word in words:
+        word_id = lexicon.get_id(word)
+        if word_id == 0 or barrel_manager.get_df(word_id) == 0:
+            suggestions = get_spelling_suggestions(word, top_n=1)
+            if suggestions:
+                word = suggestions[0]
+                changed = True
+        corrected.append(word)
+    return " ".join(corrected) if changed else None
 
 
 def semantic_search(query, glove, embeddings, top_k):
@@ -67,4 +225,9 @@ def semantic_search(query, glove, embeddings, top_k):
 
 def autocomplete_words(prefix, top_n=10):
     """Return autocomplete suggestions for a prefix."""
-    return get_autocomplete_suggestions(prefix, top_n)
\ No newline at end of file
+    return get_autocomplete_suggestions(prefix, top_n)
+
+
+def spelling_suggestions(word, top_n=5):
+    """Return the closest lexicon words to a misspelled word, for autocomplete fallback."""
+    return get_spelling_suggestions(word, top_n)
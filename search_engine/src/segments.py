@@ -0,0 +1,351 @@
+# src/segments.py
+"""
+LSM-style write path for documents indexed after the barrels were built.
+
+    <barrel_dir>/segments/wal.log        write-ahead log, one JSON line per added document
+    <barrel_dir>/segments/seg_N.bin      immutable flushed segments (binary barrel format)
+    <barrel_dir>/segments/manifest.json  live segment files, oldest first
+
+Adding a document appends one WAL entry (fsync'd) and updates an
+in-memory delta {wordID: {docID: positions}}. The entry holds the
+postings plus what the document added to the global tables: its external
+docID, its length and its new lexicon words. Its cost therefore depends
+on the size of the document, not of the barrels or the tables.
+barrel_manager merges the segments and the delta into every lookup
+(get_postings, get_df, get_max_tf, fetch_terms, document_frequencies),
+so a new document is searchable at once. A docID added again keeps only
+its newest postings, and dfs count it once.
+
+Once the delta holds flush_docs documents, it is written out as a new
+segment file and the manifest is replaced atomically. The lexicon, docID
+table and document lengths are then checkpointed to their files, and
+only after that is the WAL truncated. On startup the WAL is replayed
+into the tables and the delta. compaction.py merges runs of segments in
+the background (replace_segments).
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from barrels import _MappedBarrel, barrel_manager, write_binary_barrel
+from doc_ids import doc_id_table
+from lexicon import lexicon
+from postings import PostingList, merge_posting_lists
+from ranking import bm25
+
+SEGMENT_NAME = re.compile(r"^seg_(\d+)\.bin$")
+
+
+class LiveIndex:
+    """Immutable segment files plus a WAL-backed in-memory delta."""
+
+    def __init__(self, flush_docs: int = 1000):
+        self.flush_docs = flush_docs
+        self.directory: Optional[str] = None
+        self.segments: List[Tuple[str, _MappedBarrel]] = []  # oldest first
+        self.delta: Dict[int, Dict[int, List[int]]] = {}
+        self.delta_docs = 0
+        self._delta_lists: Dict[int, PostingList] = {}  # encoded delta postings, per word
+        self._live_lists: Dict[int, PostingList] = {}  # segments + delta merged, per word
+        self._version = 0  # bumped on every change, so stale merges are not cached
+        self._wal = None
+        self._lock = threading.Lock()  # guards segments / delta for readers
+        self._write_lock = threading.RLock()  # serializes adds, flushes and swaps
+        self.on_flush: Optional[Callable[[], None]] = None  # e.g. wakes the compactor
+        self.loaded = False
+
+    @property
+    def wal_path(self) -> str:
+        return os.path.join(self.directory, "wal.log")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def load(self, directory: Optional[str] = None) -> bool:
+        """Map the segments in the manifest, replay the WAL and attach to barrel_manager."""
+        with self._write_lock:
+            self.close()
+            self.directory = directory or os.path.join(barrel_manager.barrel_dir, "segments")
+            os.makedirs(self.directory, exist_ok=True)
+
+            names = []
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    names = json.load(f)
+            segments = []
+            for name in names:
+                try:
+                    segments.append((name, _MappedBarrel(os.path.join(self.directory, name))))
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  Skipping segment {name}: {str(e)[:100]}")
+            # Leftovers of a flush or merge interrupted before its manifest swap
+            for fname in os.listdir(self.directory):
+                if fname.endswith(".tmp") or (SEGMENT_NAME.match(fname) and fname not in names):
+                    os.remove(os.path.join(self.directory, fname))
+
+            replayed = 0
+            if os.path.exists(self.wal_path):
+                with open(self.wal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # Torn last write; everything before it is intact
+                            break
+                        self._replay_tables(entry)
+                        self._apply(entry["doc"], {int(w): p for w, p in entry["postings"].items()})
+                        replayed += 1
+
+            with self._lock:
+                self.segments = segments
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+            self.loaded = True
+            barrel_manager.live = self
+        if segments or replayed:
+            print(f"Live index: {len(segments)} segments, {replayed} documents replayed from the WAL")
+        return True
+
+    def close(self) -> None:
+        with self._write_lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            with self._lock:
+                for _, mapped in self.segments:
+                    mapped.close()
+                self.segments = []
+                self.delta, self._delta_lists, self._live_lists, self.delta_docs = {}, {}, {}, 0
+                self._version += 1
+            if barrel_manager.live is self:
+                barrel_manager.live = None
+            self.loaded = False
+
+    @staticmethod
+    def _replay_tables(entry: Dict) -> None:
+        """Re-apply a WAL entry's lexicon words, docID and length (idempotent)."""
+        for word, word_id in entry.get("words", {}).items():
+            lexicon.add_word(word, word_id)
+        if "key" in entry:
+            doc_id_table.assign(entry["key"], entry["doc"])
+        if "length" in entry:
+            bm25.set_doc_length(entry["doc"], entry["length"])
+
+    def _apply(self, doc_id: int, postings: Dict[int, List[int]]) -> None:
+        with self._lock:
+            for word_id, positions in postings.items():
+                self.delta.setdefault(word_id, {})[doc_id] = positions
+                self._delta_lists.pop(word_id, None)
+                self._live_lists.pop(word_id, None)
+            self.delta_docs += 1
+            self._version += 1
+
+    def add_document(self, doc_id: int, postings: Dict[int, List[int]], key: Optional[str] = None,
+                     length: Optional[int] = None, words: Optional[Dict[str, int]] = None) -> None:
+        """
+        Durably add one document's postings ({wordID: positions}, dense docID).
+        key (external docID), length and words (new lexicon entries) are the
+        caller's in-memory table updates; they are logged so a restart can
+        replay them before the next checkpoint.
+        Flushes the delta to a new segment once it holds flush_docs documents.
+        """
+        with self._write_lock:
+            if not self.loaded:
+                self.load()
+            entry = {"doc": int(doc_id), "postings": {str(w): list(p) for w, p in postings.items()}}
+            if key is not None:
+                entry["key"] = key
+            if length is not None:
+                entry["length"] = int(length)
+            if words:
+                entry["words"] = words
+            self._wal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            self._apply(int(doc_id), postings)
+            if self.delta_docs >= self.flush_docs:
+                self.flush()
+
+    def _next_segment_name(self) -> str:
+        numbers = [int(m.group(1)) for m in map(SEGMENT_NAME.match, os.listdir(self.directory)) if m]
+        return f"seg_{max(numbers, default=0) + 1:06d}.bin"
+
+    def reserve_segment_name(self) -> str:
+        """A fresh segment file name, held by an empty placeholder until it is written."""
+        with self._write_lock:
+            name = self._next_segment_name()
+            open(os.path.join(self.directory, name), "wb").close()
+            return name
+
+    def write_manifest(self, names: List[str]) -> None:
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(names, f)
+        os.replace(temp_path, self.manifest_path)
+
+    @staticmethod
+    def checkpoint_tables() -> None:
+        """Persist the lexicon, docID table and document lengths the WAL entries extend."""
+        lexicon.save(lexicon.path)
+        doc_id_table.save(doc_id_table.path)
+        bm25.save(bm25.path)
+
+    def flush(self) -> Optional[str]:
+        """Write the delta out as an immutable segment; returns its file name (None if empty)."""
+        with self._write_lock:
+            if not self.loaded or not self.delta:
+                return None
+            name = self._next_segment_name()
+            write_binary_barrel(os.path.join(self.directory, name), self.delta)
+            mapped = _MappedBarrel(os.path.join(self.directory, name))
+            # Manifest and tables first: after a crash before the truncate the
+            # WAL replays into a delta that duplicates the segment, and merging
+            # keeps one copy per docID; the tables replay idempotently
+            self.write_manifest([n for n, _ in self.segments] + [name])
+            self.checkpoint_tables()
+            flushed = self.delta_docs
+            with self._lock:
+                self.segments = self.segments + [(name, mapped)]
+                self.delta, self._delta_lists, self._live_lists, self.delta_docs = {}, {}, {}, 0
+                self._version += 1
+            self._wal.seek(0)
+            self._wal.truncate()
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+        print(f"💾 Flushed {flushed} documents to segment {name}")
+        if self.on_flush is not None:
+            self.on_flush()
+        return name
+
+    def snapshot(self) -> List[Tuple[str, _MappedBarrel]]:
+        """The live (name, segment) list, oldest first; never mutated in place."""
+        with self._lock:
+            return self.segments
+
+    def replace_segments(self, names: List[str], merged_name: str) -> bool:
+        """
+        Atomically swap a contiguous run of segments for the merged segment
+        written to merged_name. Readers holding the old segment list keep
+        using those maps until they finish; only the files are unlinked.
+        Returns False (and discards the merged file) if the run is gone.
+        """
+        merged_path = os.path.join(self.directory, merged_name)
+        with self._write_lock:
+            current = [name for name, _ in self.segments]
+            start = current.index(names[0]) if names[0] in current else -1
+            if start < 0 or current[start:start + len(names)] != names:
+                os.remove(merged_path)
+                return False
+            mapped = _MappedBarrel(merged_path)
+            kept = self.segments[:start] + [(merged_name, mapped)] + self.segments[start + len(names):]
+            self.write_manifest([name for name, _ in kept])
+            with self._lock:
+                self.segments = kept
+                # Cached merges still reference the replaced maps
+                self._live_lists = {}
+                self._version += 1
+            for name in names:
+                os.remove(os.path.join(self.directory, name))
+        return True
+
+    def _delta_list(self, word_id: int) -> Optional[PostingList]:
+        """The delta's postings of word_id; the caller holds self._lock."""
+        cached = self._delta_lists.get(word_id)
+        if cached is None:
+            postings = self.delta.get(word_id)
+            if not postings:
+                return None
+            # Encoded like the barrels, so merging just concatenates position blocks
+            cached = PostingList.decode(PostingList.from_postings(postings).encode())
+            self._delta_lists[word_id] = cached
+        return cached
+
+    def live_list(self, word_id: int) -> Optional[PostingList]:
+        """word_id's postings over the segments and the delta, newest entry per docID, or None."""
+        with self._lock:
+            cached = self._live_lists.get(word_id)
+            if cached is not None:
+                return cached
+            segments, version = self.segments, self._version
+            delta = self._delta_list(word_id)
+        parts = []
+        for _, mapped in segments:
+            idx = mapped.find(word_id)
+            if idx >= 0:
+                parts.append(mapped.posting_list(idx))
+        parts.append(delta)
+        if all(part is None for part in parts):
+            return None
+        merged = merge_posting_lists(parts)
+        with self._lock:
+            # An add, flush or swap since the snapshot may have made it stale
+            if self._version == version:
+                self._live_lists[word_id] = merged
+        return merged
+
+    def word_ids(self) -> np.ndarray:
+        """Sorted wordIDs with postings in the segments or the delta."""
+        with self._lock:
+            segments = self.segments
+            delta_words = np.fromiter(self.delta.keys(), dtype=np.int64, count=len(self.delta))
+        return np.unique(np.concatenate([mapped.word_ids.astype(np.int64) for _, mapped in segments] + [delta_words]))
+
+    def df(self, word_id: int, base: Optional[PostingList] = None) -> int:
+        """
+        Documents containing word_id across the segments, the delta and, if
+        given, the base barrel postings, each docID counted once.
+        """
+        live = self.live_list(word_id)
+        if live is None:
+            return len(base) if base is not None else 0
+        if base is None or not len(base) or base.doc_ids.dtype == object:
+            # Legacy string docIDs never collide with the live index's ints
+            return len(live) + (len(base) if base is not None else 0)
+        rows = np.searchsorted(base.doc_ids, live.doc_ids)
+        inside = rows < len(base)
+        overlap = int(np.count_nonzero(base.doc_ids[rows[inside]] == live.doc_ids[inside]))
+        return len(base) + len(live) - overlap
+
+    def max_tf(self, word_id: int) -> int:
+        """Largest tf of word_id over the segments and the delta."""
+        live = self.live_list(word_id)
+        return int(live.tfs.max()) if live is not None and len(live) else 0
+
+    def merge(self, word_id: int, base: Optional[PostingList]) -> Optional[PostingList]:
+        """The base barrel postings of word_id merged with the segments' and the delta's."""
+        live = self.live_list(word_id)
+        if live is None:
+            return base
+        return merge_posting_lists([base, live])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            segments = self.segments
+            delta_docs, delta_terms = self.delta_docs, len(self.delta)
+        return {
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(mapped.path) for _, mapped in segments),
+            "delta_docs": delta_docs,
+            "delta_terms": delta_terms,
+            "wal_bytes": os.path.getsize(self.wal_path) if self.loaded and os.path.exists(self.wal_path) else 0,
+        }
+
+
+# Global live index; loaded by the API, written by DocumentIndexer
+live_index = LiveIndex(flush_docs=int(os.environ.get("LIVE_FLUSH_DOCS", 1000)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or flush the live (WAL + delta) index.")
+    parser.add_argument("--flush", action="store_true", help="write the WAL-backed delta out as a segment")
+    args = parser.parse_args()
+
+    live_index.load()
+    if args.flush:
+        live_index.flush()
+    print(live_index.stats())
@@ -2,7 +2,13 @@
 import os
 import json
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from doc_ids import doc_id_table
+from embedding_store import embedding_store, normalize_rows
+from ann import ann_index
+from quantization import quantized_embeddings
+from glove_store import lexicon_glove, open_glove
+from ranking import top_k_results
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -19,16 +25,12 @@ os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
 
 def load_glove(path=GLOVE_PATH):
     """
-    Load pre-trained GloVe embeddings.
+    Load pre-trained GloVe embeddings as a {word: vector} mapping.
+    The text file is converted once to a binary cache that is then
+    memory-mapped (see glove_store.py).
     """
-    glove = {}
     print("Loading GloVe embeddings...")
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            values = line.strip().split()
-            word = values[0]
-            vector = np.asarray(values[1:], dtype="float32")
-            glove[word] = vector
+    glove = open_glove(path)
     print(f"Loaded {len(glove)} word vectors.")
     return glove
 
@@ -39,7 +41,10 @@ def load_glove(path=GLOVE_PATH):
 def average_embedding(tokens, glove):
     """
     Compute average word embedding for a document or query.
+    Uses the lexicon-projected GloVe (token IDs -> rows) when it is built.
     """
+    if lexicon_glove.loaded or lexicon_glove.load():
+        return lexicon_glove.embed_tokens(tokens, glove)
     vectors = [glove[t] for t in tokens if t in glove]
     if not vectors:
         return None
@@ -83,6 +88,42 @@ def build_embeddings():
             print(f"Processed {processed} documents...")
 
     print(f"\n✅ Semantic embeddings built for {processed} documents.")
+    pack_embeddings()
+
+
+def pack_embeddings():
+    """
+    Pack the per-document .npy files into one normalized float32 matrix
+    (see embedding_store.py) that search memory-maps at startup. The IVF
+    index and int8 codes are deleted, since their rows refer to the
+    previous packing.
+    """
+    embedding_store.pack(EMBEDDINGS_DIR)
+    embedding_store.load()
+    ann_index.invalidate()
+    quantized_embeddings.invalidate()
+
+
+def build_lexicon_glove():
+    """
+    Project GloVe onto lexicon wordIDs (see glove_store.LexiconGlove), so
+    only vectors of words in the corpus are kept.
+    """
+    lexicon_glove.build(load_glove())
+    lexicon_glove.save()
+    print(f"✅ Lexicon GloVe saved to {lexicon_glove.matrix_path}")
+
+
+def build_ann_index(n_lists=None):
+    """
+    Build the IVF approximate nearest-neighbour index (see ann.py) over
+    the packed embeddings, for full-corpus semantic search.
+    """
+    if not embedding_store.loaded and not embedding_store.load():
+        return
+    ann_index.build(n_lists)
+    ann_index.save()
+    print(f"✅ IVF index saved to {ann_index.path}")
 
 # =========================
 # LOAD ALL EMBEDDINGS
@@ -113,12 +154,17 @@ def load_all_embeddings():
 # SEMANTIC SEARCH
 # =========================
 
-def semantic_search_query(query, top_k=10, glove=None, preloaded_embeddings=None):
+def semantic_search_query(query, top_k=10, glove=None, preloaded_embeddings=None, nprobe=None):
     """
     Perform semantic search using cosine similarity.
     query: string
     top_k: number of results to return
-    preloaded_embeddings: optional dict of doc_id -> vector
+    preloaded_embeddings: optional dict of doc_id -> vector; by default the
+    packed embedding store is searched: through the IVF index when one is
+    built (nprobe clusters, see ann.py), else on the int8 codes with a float
+    rerank when quantized (see quantization.py), else by one matrix-vector
+    product.
+    Returns [(external doc_id, score), ...], best first.
     """
     # glove = load_glove()
     query_tokens = query.lower().split()
@@ -127,15 +173,37 @@ def semantic_search_query(query, top_k=10, glove=None, preloaded_embeddings=None
         print("No valid embeddings found for the query.")
         return []
 
-    results = []
-    embeddings = preloaded_embeddings
-
-    for doc_id, doc_vec in embeddings.items():
-        score = cosine_similarity(query_vec.reshape(1, -1), doc_vec.reshape(1, -1))[0][0]
-        results.append((doc_id, float(score)))
+    if preloaded_embeddings is None:
+        if not embedding_store.loaded and not embedding_store.load():
+            return []
+        if ann_index.ready():
+            results = ann_index.search(query_vec, top_k, nprobe)
+        elif quantized_embeddings.ready():
+            results = quantized_embeddings.search(query_vec, top_k)
+        else:
+            results = embedding_store.search(query_vec, top_k)
+        return [(doc_id_table.to_external(doc_id), score) for doc_id, score in results]
+
+    # Legacy dict of per-document vectors: stack once, score in one product
+    doc_ids = np.array(list(preloaded_embeddings.keys()), dtype=object)
+    if not len(doc_ids):
+        return []
+    matrix = normalize_rows(np.vstack(list(preloaded_embeddings.values())))
+    return top_k_results(doc_ids, matrix @ normalize_rows(query_vec), top_k)
 
-    results.sort(key=lambda x: x[1], reverse=True)
-    return results[:top_k]
+def rerank_candidates(query_vec, doc_ids, top_k=10):
+    """
+    Rescore candidate docIDs (e.g. keyword hits) by cosine similarity to
+    query_vec: one gather from the packed store and one matrix product.
+    Returns [(docID, score), ...], best first; candidates without an
+    embedding are dropped.
+    """
+    if not embedding_store.loaded and not embedding_store.load():
+        return []
+    found, vectors = embedding_store.gather(doc_ids)
+    if not len(found):
+        return []
+    return top_k_results(found, vectors @ normalize_rows(query_vec), top_k)
 
 # =========================
 # CLI TEST
@@ -144,14 +212,22 @@ def semantic_search_query(query, top_k=10, glove=None, preloaded_embeddings=None
 if __name__ == "__main__":
     print("1. Build embeddings")
     print("2. Semantic search")
+    print("3. Pack embeddings")
+    print("4. Build ANN index")
+    print("5. Project GloVe onto lexicon")
     choice = input("Choice: ")
 
     if choice == "1":
         build_embeddings()
     elif choice == "2":
         query = input("Enter query: ")
-        embeddings = load_all_embeddings()
-        results = semantic_search_query(query, preloaded_embeddings=embeddings)
+        results = semantic_search_query(query, glove=load_glove())
         print("\nSemantic Results:")
         for doc_id, score in results:
-            print(f"{doc_id}  (score={score:.4f})")
\ No newline at end of file
+            print(f"{doc_id}  (score={score:.4f})")
+    elif choice == "3":
+        pack_embeddings()
+    elif choice == "4":
+        build_ann_index()
+    elif choice == "5":
+        build_lexicon_glove()
\ No newline at end of file
@@ -0,0 +1,297 @@
+# src/spelling.py
+"""
+Typo-tolerant term lookup ("did you mean") with a symmetric-delete index.
+
+SymSpell idea: two words are within edit distance d only if some string
+obtained by deleting at most d characters from one equals such a string
+obtained from the other. At build time every lexicon word registers all
+of its deletes (of its first prefix_length characters, which bounds the
+index size). At query time the same deletes of the misspelled word are
+looked up, and only the few words they hit are verified with a real
+edit distance.
+
+Deletes are stored as sorted CRC32 keys with a parallel array of word
+rows; each indexed word keeps its wordID, df, length, letter set and its
+letters as one row of a fixed-width uint8 matrix. A lookup is one
+np.searchsorted over all of the query's deletes, a length and letter-set
+filter, and one bit-parallel edit distance over every remaining
+candidate at once, so no candidate is visited in a Python loop. Hash
+collisions only add candidates that the distance check then rejects.
+
+The arrays are saved as .npy files by `python spelling.py` and
+memory-mapped at startup, like the packed embeddings.
+"""
+import os
+import threading
+import zlib
+from typing import List, Set, Tuple
+
+import numpy as np
+
+from barrels import barrel_manager
+from lexicon import lexicon
+
+SPELLING_INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "spelling_index")
+_ARRAYS = ("keys", "rows", "word_ids", "dfs", "lengths", "chars", "letter_sets", "params")
+MAX_WORD_LENGTH = 64  # one uint64 bit per letter in batch_edit_distance()
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """word plus every string reachable by deleting up to max_distance characters."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for w in frontier:
+            if len(w) > 1:
+                for i in range(len(w)):
+                    next_frontier.add(w[:i] + w[i + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def _key(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _letters(word: str) -> bytes:
+    # Lexicon words are ASCII; any other character counts as one mismatching letter
+    return word.encode("ascii", "replace")
+
+
+def _letter_set(letters: bytes) -> int:
+    """Bitmask of the letters in a word, folded into 32 bits (a-z each get their own)."""
+    mask = 0
+    for letter in letters:
+        mask |= 1 << (letter % 32)
+    return mask
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or max_distance + 1 as soon as it must exceed the limit.
+    """
+    limit = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return limit
+
+    # Shared prefix and suffix never cost anything
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Only cells within max_distance of the diagonal can stay under the limit
+    prev_prev = None
+    prev = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [limit] * (len(b) + 1)
+        if i <= max_distance:
+            cur[0] = i
+        row_min = limit
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            value = prev[j - 1] if a[i - 1] == b[j - 1] else prev[j - 1] + 1
+            if prev[j] + 1 < value:
+                value = prev[j] + 1
+            if cur[j - 1] + 1 < value:
+                value = cur[j - 1] + 1
+            if prev_prev is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev_prev[j - 2] + 1)
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return limit
+        prev_prev, prev = prev, cur
+    return min(prev[-1], limit)
+
+
+def batch_edit_distance(word: bytes, chars: np.ndarray, lengths: np.ndarray, max_distance: int) -> np.ndarray:
+    """
+    edit_distance() of word against every row of chars (uint8, zero-padded;
+    row i holds the lengths[i] <= MAX_WORD_LENGTH letters of a candidate), capped at
+    max_distance + 1.
+
+    Bit-parallel OSA (Myers' algorithm with Hyyro's transposition term):
+    each candidate's DP column is two uint64 delta vectors, so one query
+    letter is a handful of vectorized integer ops over all candidates at once.
+    """
+    n, width = chars.shape
+    one = np.uint64(1)
+    # Bit j of a letter's mask is set where the candidate has that letter at position j
+    letters = sorted(set(word))
+    packed = np.packbits(chars == np.array(letters, dtype=np.uint8)[:, None, None], axis=2, bitorder="little")
+    padded = np.zeros((len(letters), n, 8), dtype=np.uint8)
+    padded[:, :, :packed.shape[2]] = packed
+    masks = dict(zip(letters, padded.view(np.uint64)[:, :, 0]))
+    vp = np.full(n, np.iinfo(np.uint64).max, dtype=np.uint64)
+    vn = np.zeros(n, dtype=np.uint64)
+    d0 = np.zeros(n, dtype=np.uint64)
+    pm_prev = d0
+    for letter in word:
+        pm = masks[letter]
+        transposed = ((~d0 & pm) << one) & pm_prev
+        d0 = (((pm & vp) + vp) ^ vp) | pm | vn | transposed
+        hp = vn | ~(d0 | vp)
+        hn = vp & d0
+        x = (hp << one) | one
+        vn = x & d0
+        vp = (hn << one) | ~(x | d0)
+        pm_prev = pm
+    # The last DP column starts at len(word) and moves by its vertical deltas
+    filled = np.iinfo(np.uint64).max >> (np.uint64(64) - lengths.astype(np.uint64))
+    distances = len(word) + np.bitwise_count(vp & filled).astype(np.int16) - np.bitwise_count(vn & filled)
+    return np.minimum(distances, max_distance + 1)
+
+
+class SpellingIndex:
+    """
+    Symmetric-delete index over lexicon words with df >= min_df.
+    suggest() returns corrections within max_distance, closest first and
+    then most frequent first.
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 6, min_df: int = 2):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_df = min_df
+        self.keys = np.zeros(0, dtype=np.uint32)
+        self.rows = np.zeros(0, dtype=np.int32)  # word row of each delete key
+        self.word_ids = np.zeros(0, dtype=np.int32)
+        self.dfs = np.zeros(0, dtype=np.int32)
+        self.lengths = np.zeros(0, dtype=np.int16)
+        self.chars = np.zeros((0, 0), dtype=np.uint8)
+        self.letter_sets = np.zeros(0, dtype=np.uint32)
+        self.built = False
+
+    def build(self, word_ids: np.ndarray, words: List[str], dfs: np.ndarray) -> None:
+        # Longer tokens are never real words and would not fit batch_edit_distance()
+        kept = [i for i, word in enumerate(words) if len(word) <= MAX_WORD_LENGTH]
+        words = [words[i] for i in kept]
+        word_ids, dfs = np.asarray(word_ids)[kept], np.asarray(dfs)[kept]
+        keys, owners = [], []
+        for i, word in enumerate(words):
+            for delete in _deletes(word[:self.prefix_length], self.max_distance):
+                keys.append(_key(delete))
+                owners.append(i)
+        keys = np.asarray(keys, dtype=np.uint32)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = np.asarray(owners, dtype=np.int32)[order]
+        self.word_ids = np.asarray(word_ids, dtype=np.int32)
+        self.dfs = np.asarray(dfs, dtype=np.int32)
+        self.lengths = np.array([len(word) for word in words], dtype=np.int16)
+        self.chars = np.zeros((len(words), int(self.lengths.max(initial=0))), dtype=np.uint8)
+        self.letter_sets = np.zeros(len(words), dtype=np.uint32)
+        for i, word in enumerate(words):
+            letters = _letters(word)
+            self.chars[i, :len(word)] = np.frombuffer(letters, dtype=np.uint8)
+            self.letter_sets[i] = _letter_set(letters)
+        self.built = True
+
+    def build_from_lexicon(self) -> None:
+        """Index every lexicon word whose df (from the barrel term tables) is at least min_df."""
+        max_word_id = max(lexicon.id_to_word.keys(), default=0)
+        dfs = barrel_manager.document_frequencies(max_word_id)
+        word_ids = np.flatnonzero(dfs >= self.min_df)
+        self.build(word_ids, [lexicon.get_word(int(w)) for w in word_ids], dfs[word_ids])
+        print(f"Spelling index built: {len(word_ids)} words, {len(self.keys)} deletes")
+
+    def suggest(self, word: str, max_distance: int = None, top_n: int = 5) -> List[Tuple[str, int, int]]:
+        """[(word, distance, df), ...] for lexicon words within max_distance of word."""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        if not word or not len(self.keys):
+            return []
+
+        # Query keys share the index dtype so searchsorted never casts self.keys
+        keys = np.array([_key(d) for d in _deletes(word[:self.prefix_length], max_distance)], dtype=np.uint32)
+        lo = np.searchsorted(self.keys, keys, side="left")
+        counts = np.searchsorted(self.keys, keys, side="right") - lo
+        # Every index position in the [lo, hi) runs, without a Python loop
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        rows = np.sort(self.rows[starts + np.arange(len(starts))])
+        # Deduplicate; a sort plus neighbour compare is much cheaper than np.unique here
+        rows = rows[np.concatenate((rows[:1] >= 0, rows[1:] != rows[:-1]))]
+        rows = rows[np.abs(self.lengths[rows] - len(word)) <= max_distance]
+        # An edit adds or removes at most two letters from the word's letter set
+        letters = _letters(word)
+        differing = np.bitwise_count(self.letter_sets[rows] ^ np.uint32(_letter_set(letters)))
+        rows = rows[differing <= 2 * max_distance]
+        if not len(rows):
+            return []
+
+        width = min(self.chars.shape[1], len(word) + max_distance)
+        distances = batch_edit_distance(letters, self.chars[rows, :width], self.lengths[rows], max_distance)
+        close = distances <= max_distance
+        rows, distances = rows[close], distances[close]
+        dfs = self.dfs[rows]
+
+        # Rank by (distance, -df) in numpy; only ties at the cut need the word itself
+        order = np.lexsort((-dfs, distances))
+        if len(order) > top_n:
+            last = order[top_n - 1]
+            cut = (distances < distances[last]) | ((distances == distances[last]) & (dfs >= dfs[last]))
+            order = order[:np.count_nonzero(cut)]
+        results = [
+            (lexicon.get_word(int(self.word_ids[rows[i]])), int(distances[i]), int(dfs[i]))
+            for i in order
+        ]
+        results.sort(key=lambda r: (r[1], -r[2], r[0]))
+        return results[:top_n]
+
+    def save(self, directory: str = SPELLING_INDEX_DIR) -> None:
+        os.makedirs(directory, exist_ok=True)
+        params = np.array([self.max_distance, self.prefix_length, self.min_df])
+        for name in _ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            temp_path = path[:-len(".npy")] + ".tmp.npy"
+            np.save(temp_path, params if name == "params" else getattr(self, name))
+            os.replace(temp_path, path)
+
+    def load(self, directory: str = SPELLING_INDEX_DIR) -> bool:
+        """Memory-map the arrays written by save(); False if any is missing."""
+        paths = {name: os.path.join(directory, f"{name}.npy") for name in _ARRAYS}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return False
+        for name in _ARRAYS[:-1]:
+            setattr(self, name, np.load(paths[name], mmap_mode="r"))
+        self.max_distance, self.prefix_length, self.min_df = (int(v) for v in np.load(paths["params"]))
+        self.built = True
+        return True
+
+
+# Global spelling index: loaded from disk if built at index time, else built at server startup
+spelling_index = SpellingIndex()
+_build_lock = threading.Lock()
+
+
+def ensure_spelling_index() -> None:
+    """Load the spelling index, or build it from the lexicon if it was never saved; done once."""
+    if spelling_index.built:
+        return
+    with _build_lock:
+        # Another thread may have finished while this one waited
+        if not spelling_index.built and not spelling_index.load():
+            spelling_index.build_from_lexicon()
+
+
+def get_spelling_suggestions(word: str, top_n: int = 5) -> List[str]:
+    """Closest lexicon words to a (probably misspelled) word, best first."""
+    ensure_spelling_index()
+    return [candidate for candidate, _, _ in spelling_index.suggest(word.lower(), top_n=top_n)]
+
+
+# Build at index time
+if __name__ == "__main__":
+    spelling_index.build_from_lexicon()
+    spelling_index.save()
+    print(f"Saved spelling index to {os.path.abspath(SPELLING_INDEX_DIR)}")
@@ -0,0 +1,146 @@
+# src/wildcard.py
+"""
+Wildcard term expansion (sars*, *virus, cov*d) with a character k-gram index.
+
+Every lexicon word is padded as "$word$" and registered under each of its
+k-grams. A pattern's literal pieces give the k-grams any match must
+contain ("cov*d" -> $co, cov); intersecting their posting lists yields a
+small candidate set, which is then checked against the pattern itself.
+
+Layout is CSR over numpy arrays: sorted int64 gram keys, an offsets
+array, and one int32 array of wordIDs (sorted within each gram).
+"""
+import os
+import re
+from typing import List
+
+import numpy as np
+
+from barrels import barrel_manager
+from lexicon import lexicon
+
+WILDCARD_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "wildcard_index.npz")
+
+
+def _gram_key(gram: str) -> int:
+    key = 0
+    for ch in gram:
+        key = (key << 21) | ord(ch)
+    return key
+
+
+def _grams(text: str, k: int) -> List[int]:
+    return [_gram_key(text[i:i + k]) for i in range(len(text) - k + 1)]
+
+
+def pattern_regex(pattern: str) -> "re.Pattern":
+    """'*' matches any run of characters, '?' exactly one."""
+    parts = (".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in pattern)
+    return re.compile("".join(parts) + r"\Z")
+
+
+class KGramIndex:
+    """
+    Maps k-grams to the wordIDs containing them. expand() returns the
+    lexicon words matching a wildcard pattern, most frequent first.
+    """
+
+    def __init__(self, k: int = 3):
+        self.k = k
+        self.gram_keys = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.word_ids = np.zeros(0, dtype=np.int32)
+        self.dfs = np.zeros(0, dtype=np.int32)
+        self.built = False
+
+    def build(self, word_ids: np.ndarray, words: List[str], dfs: np.ndarray) -> None:
+        keys, owners = [], []
+        for word_id, word in zip(np.asarray(word_ids).tolist(), words):
+            for key in set(_grams(f"${word}$", self.k)):
+                keys.append(key)
+                owners.append(word_id)
+        keys = np.asarray(keys, dtype=np.int64)
+        owners = np.asarray(owners, dtype=np.int32)
+        order = np.lexsort((owners, keys))
+        keys, self.word_ids = keys[order], owners[order]
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+        self.gram_keys = keys[starts]
+        self.offsets = np.r_[starts, len(keys)].astype(np.int64)
+        self.dfs = np.asarray(dfs, dtype=np.int32)
+        self.built = True
+
+    def build_from_lexicon(self) -> None:
+        """Index every lexicon word with postings; dfs come from the barrel term tables."""
+        max_word_id = max(lexicon.id_to_word.keys(), default=0)
+        dfs = barrel_manager.document_frequencies(max_word_id)
+        word_ids = np.flatnonzero(dfs > 0)
+        self.build(word_ids, [lexicon.get_word(int(w)) for w in word_ids], dfs)
+        print(f"Wildcard index built: {len(word_ids)} words, {len(self.gram_keys)} {self.k}-grams")
+
+    def _posting(self, key: int) -> np.ndarray:
+        idx = np.searchsorted(self.gram_keys, key)
+        if idx == len(self.gram_keys) or self.gram_keys[idx] != key:
+            return np.zeros(0, dtype=np.int32)
+        return self.word_ids[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def expand(self, pattern: str, max_expansions: int = 50) -> List[str]:
+        """
+        Lexicon words matching pattern, most frequent first, at most
+        max_expansions of them. Raises ValueError if the pattern has no
+        k-gram to look up (e.g. "a*").
+        """
+        pattern = pattern.lower()
+        keys = set()
+        for piece in re.split(r"[*?]", f"${pattern}$"):
+            keys.update(_grams(piece, self.k))
+        if not keys:
+            raise ValueError(f"Wildcard pattern '{pattern}' is too broad to expand; add more letters")
+
+        # Rarest gram first keeps every intermediate candidate set small
+        postings = sorted((self._posting(key) for key in keys), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        regex = pattern_regex(pattern)
+        matches = [w for w in candidates.tolist() if regex.match(lexicon.get_word(w) or "")]
+        matches.sort(key=lambda w: (-int(self.dfs[w]) if w < len(self.dfs) else 0, w))
+        return [lexicon.get_word(w) for w in matches[:max_expansions]]
+
+    def save(self, path: str = WILDCARD_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path, gram_keys=self.gram_keys, offsets=self.offsets,
+            word_ids=self.word_ids, dfs=self.dfs, k=np.array([self.k]),
+        )
+
+    def load(self, path: str = WILDCARD_INDEX_PATH) -> bool:
+        if not os.path.exists(path):
+            return False
+        data = np.load(path)
+        self.gram_keys, self.offsets = data["gram_keys"], data["offsets"]
+        self.word_ids, self.dfs = data["word_ids"], data["dfs"]
+        self.k = int(data["k"][0])
+        self.built = True
+        return True
+
+
+# Global wildcard index: loaded from disk if built at index time, else built on first use
+wildcard_index = KGramIndex()
+
+
+def expand_wildcard(pattern: str, max_expansions: int = 50) -> List[str]:
+    """Lexicon words matching a wildcard pattern, most frequent first."""
+    if not wildcard_index.built and not wildcard_index.load():
+        wildcard_index.build_from_lexicon()
+    return wildcard_index.expand(pattern, max_expansions)
+
+
+# Build at index time
+if __name__ == "__main__":
+    wildcard_index.build_from_lexicon()
+    wildcard_index.save()
+    print(f"Saved wildcard index to {os.path.abspath(WILDCARD_INDEX_PATH)}")
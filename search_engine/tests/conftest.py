@@ -0,0 +1,112 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The engine's modules import each other by name from src/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+
+@pytest.fixture
+def search_index(tmp_path, monkeypatch):
+    """
+    Build a throwaway index in tmp_path and point the global lexicon,
+    docID table, BM25 scorer and barrel_manager at it.
+
+    Returns build(postings, doc_lengths=None): postings maps word ->
+    {int docID: tf or [positions]}; wordIDs are assigned in word order.
+    """
+    from barrels import barrel_manager
+    from doc_ids import doc_id_table
+    from lexicon import lexicon
+    from ranking import bm25
+
+    monkeypatch.setattr(barrel_manager, "barrel_dir", str(tmp_path / "barrels"))
+    monkeypatch.setattr(barrel_manager, "barrel_size", 100000)
+    monkeypatch.setattr(barrel_manager, "_mapped", {})
+    monkeypatch.setattr(barrel_manager, "live", None)
+    monkeypatch.setattr(lexicon, "word_to_id", {})
+    monkeypatch.setattr(lexicon, "id_to_word", {})
+    monkeypatch.setattr(lexicon, "_next_id", 1)
+    monkeypatch.setattr(doc_id_table, "doc_to_id", {})
+    monkeypatch.setattr(doc_id_table, "id_to_doc", [])
+    monkeypatch.setattr(bm25, "doc_lengths", np.zeros(0, dtype=np.int32))
+    monkeypatch.setattr(bm25, "avgdl", 1.0)
+    monkeypatch.setattr(bm25, "path", str(tmp_path / "doc_lengths.npy"))
+    monkeypatch.setattr(lexicon, "path", str(tmp_path / "lexicon.json"))
+    monkeypatch.setattr(doc_id_table, "path", str(tmp_path / "doc_ids.json"))
+    os.makedirs(barrel_manager.barrel_dir, exist_ok=True)
+
+    def build(postings, doc_lengths=None):
+        n_docs = 1 + max(doc for docs in postings.values() for doc in docs)
+        for i in range(n_docs):
+            doc_id_table.add(f"doc_{i}")
+        for word in postings:
+            word_id = lexicon._next_id
+            lexicon.word_to_id[word] = word_id
+            lexicon.id_to_word[word_id] = word
+            lexicon._next_id += 1
+        if doc_lengths is None:
+            doc_lengths = [10] * n_docs
+        bm25.doc_lengths = np.asarray(doc_lengths, dtype=np.int32)
+        bm25._update_avgdl()
+
+        data = {}
+        for word, docs in postings.items():
+            data[lexicon.get_id(word)] = {
+                doc: list(value) if isinstance(value, (list, tuple)) else list(range(value))
+                for doc, value in docs.items()
+            }
+        barrel_manager.save_binary_barrel(0, data)
+        return {word: lexicon.get_id(word) for word in postings}
+
+    return build
+
+
+@pytest.fixture
+def packed_embeddings(tmp_path, monkeypatch):
+    """pack(doc_ids): write and load random packed embeddings for those docIDs in tmp_path."""
+    from embedding_store import embedding_store, normalize_rows
+
+    monkeypatch.setattr(embedding_store, "packed_dir", str(tmp_path))
+    rng = np.random.default_rng(0)
+
+    def pack(doc_ids, dim=8):
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        embedding_store.save(doc_ids, normalize_rows(rng.normal(size=(len(doc_ids), dim)).astype(np.float32)))
+        assert embedding_store.load()
+
+    return pack
+
+
+@pytest.fixture
+def live(search_index, tmp_path):
+    """A LiveIndex over a small base barrel (docs 0-3), tables checkpointed to tmp_path."""
+    from segments import LiveIndex
+
+    search_index({"alpha": {0: 2, 1: 1}, "beta": {1: 3, 2: 1, 3: 1}})
+    LiveIndex.checkpoint_tables()
+    index = LiveIndex(flush_docs=1000)
+    index.load(str(tmp_path / "segments"))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    app.backend.api without the startup loader (GloVe, embeddings, live
+    index from data/): tests set api.search_engine to what they need.
+    """
+    import types
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    monkeypatch.syspath_prepend(root)
+    if "app.backend.api" not in sys.modules:
+        loader = types.ModuleType("app.backend.loader")
+        loader.search_engine = None
+        monkeypatch.setitem(sys.modules, "app.backend.loader", loader)
+    import app.backend.api as api_module
+
+    return api_module
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from ann import IVFIndex
+from embedding_store import embedding_store
+
+
+def test_ivf_round_trip(packed_embeddings):
+    packed_embeddings(range(50))
+    index = IVFIndex()
+    index.build(n_lists=4)
+    index.save()
+    query = np.asarray(embedding_store.vectors[7])
+
+    reloaded = IVFIndex()
+    assert reloaded.load()
+    assert reloaded.search(query, 5, nprobe=4) == index.search(query, 5, nprobe=4)
+    assert reloaded.search(query, 1, nprobe=4)[0][0] == 7
+
+
+@pytest.mark.parametrize("doc_ids", [range(51), list(range(49)) + [99]])
+def test_ivf_rejects_index_of_other_packing(packed_embeddings, doc_ids):
+    packed_embeddings(range(50))
+    index = IVFIndex()
+    index.build(n_lists=4)
+    index.save()
+
+    packed_embeddings(doc_ids)  # same or different row count, different docID order
+    assert not IVFIndex().load()
+
+
+def test_ivf_failed_load_is_remembered(packed_embeddings, monkeypatch):
+    packed_embeddings(range(20))
+    index = IVFIndex()
+    calls = []
+    original = IVFIndex.load
+    monkeypatch.setattr(IVFIndex, "load", lambda self: calls.append(1) or original(self))
+    assert not index.ready()
+    assert not index.ready()
+    assert len(calls) == 1
+
+
+def test_ivf_invalidate_deletes_index(packed_embeddings):
+    packed_embeddings(range(20))
+    index = IVFIndex()
+    index.build(n_lists=2)
+    index.save()
+    index.invalidate()
+    assert not index.ready()
+    assert not IVFIndex().load()
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+
+class _Engine:
+    """The parts of loader.SearchEngineLoader the semantic endpoint uses."""
+
+    def __init__(self, glove, embeddings):
+        self.glove = glove
+        self.embeddings = embeddings
+
+    def get_glove(self):
+        return self.glove
+
+    def get_embedding(self, doc_id):
+        return self.embeddings.get(doc_id)
+
+
+@pytest.fixture
+def unpacked_semantic(api, search_index, monkeypatch):
+    """An index whose embeddings were never packed: per-document vectors only."""
+    from embedding_store import embedding_store
+    import semantic
+
+    monkeypatch.setattr(embedding_store, "loaded", False)
+    monkeypatch.setattr(semantic.lexicon_glove, "loaded", False)
+    monkeypatch.setattr(semantic.lexicon_glove, "load", lambda: False)
+    search_index({"spike": {0: 1, 1: 2, 2: 1}, "protein": {0: 1, 1: 1, 2: 3, 3: 1}})
+    glove = {"spike": np.array([1.0, 0.0, 0.0]), "protein": np.array([0.0, 1.0, 0.0])}
+    embeddings = {
+        "doc_0": np.array([1.0, 1.0, 0.0]),   # same direction as the query
+        "doc_1": np.array([1.0, 0.0, 1.0]),
+        # doc_2 has no embedding file
+    }
+    monkeypatch.setattr(api, "search_engine", _Engine(glove, embeddings))
+
+
+def test_semantic_rerank_without_packed_embeddings(api, unpacked_semantic):
+    results = api._semantic_search("spike protein", top_k=5, candidate_pool=10, nprobe=None)
+    assert [doc_id for doc_id, _ in results] == ["doc_0", "doc_1"]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(0.5)
+
+
+def test_semantic_without_query_vector_keeps_keyword_order(api, unpacked_semantic, monkeypatch):
+    from doc_ids import doc_id_table
+    from search import multi_word_search
+
+    monkeypatch.setattr(api.search_engine, "glove", {})
+    keyword = [(doc_id_table.to_external(doc), score) for doc, score in multi_word_search("spike protein", top_k=10)]
+    assert api._semantic_search("spike protein", top_k=2, candidate_pool=10, nprobe=None) == keyword[:2]
+
+
+def _page_all(api, query, mode, page_size, between=None):
+    import asyncio
+
+    rows, cursor = [], None
+    while True:
+        request = api.PageRequest(query=query, mode=mode, page_size=page_size, cursor=cursor)
+        page = asyncio.run(api.page_search_endpoint(request))
+        rows += [(r.doc_id, r.score) for r in page.results]
+        cursor = page.next_cursor
+        if cursor is None:
+            return rows
+        if between is not None:
+            between()
+
+
+@pytest.mark.parametrize("mode, query", [("single", "fever"), ("multi", "fever cough"), ("boolean", "fever AND (cough OR rash)")])
+def test_pages_resume_after_cache_eviction(api, search_index, monkeypatch, mode, query):
+    from doc_ids import doc_id_table
+    from result_cache import result_cache
+    from search import search_page
+
+    rng = np.random.default_rng(2)
+    search_index({
+        word: {int(doc): int(rng.integers(1, 4)) for doc in rng.choice(60, size, replace=False)}
+        for word, size in (("fever", 40), ("cough", 45), ("rash", 30))
+    }, doc_lengths=rng.integers(5, 15, 60).tolist())
+    full = [(doc_id_table.to_external(doc), score) for doc, score in search_page(mode, query, page_size=1000)]
+    assert len(full) > 10
+    # A page never scores the whole result set
+    monkeypatch.setattr(api, "scored_documents", None)
+    # Every page is computed from scratch: no cached scores to resume from
+    assert _page_all(api, query, mode, 3, between=result_cache.invalidate) == full
+    assert _page_all(api, query, mode, 7) == full
+
+
+def test_page_cursor_compatibility(api, search_index):
+    import asyncio
+    from fastapi import HTTPException
+
+    search_index({"a": {doc: 1 + doc % 3 for doc in range(10)}})
+    first = asyncio.run(api.page_search_endpoint(api.PageRequest(query="a", mode="single", page_size=4)))
+    doc, score = api._decode_cursor(first.next_cursor)[0]
+    assert api._decode_cursor(first.next_cursor)[1] == 4
+
+    # A cursor issued without an offset still resumes at the right row
+    old = api.base64.urlsafe_b64encode(api.json.dumps([doc, score]).encode()).decode()
+    resumed = asyncio.run(api.page_search_endpoint(api.PageRequest(query="a", mode="single", page_size=4, cursor=old)))
+    current = asyncio.run(api.page_search_endpoint(api.PageRequest(query="a", mode="single", page_size=4, cursor=first.next_cursor)))
+    assert resumed.results == current.results
+
+    foreign = api._encode_cursor("doc_3", score, 4)
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(api.page_search_endpoint(api.PageRequest(query="a", mode="single", page_size=4, cursor=foreign)))
+    assert err.value.status_code == 400
+
+
+def _export(api, **fields):
+    import asyncio
+    import json
+
+    async def collect():
+        response = await api.export_search_endpoint(api.ExportRequest(**fields))
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return [json.loads(line) for line in asyncio.run(collect()).splitlines()]
+
+
+def test_ndjson_export_streams_every_match_best_first(api, search_index, monkeypatch):
+    from doc_ids import doc_id_table
+    from result_cache import result_cache
+    from search import multi_word_search
+
+    monkeypatch.setattr(api, "EXPORT_CHUNK_SIZE", 4)  # several chunks
+    search_index({"fever": {doc: 1 + doc % 4 for doc in range(25)}, "cough": {doc: 1 for doc in range(0, 25, 2)}})
+    result_cache.invalidate()
+    expected = [{"doc_id": doc_id_table.to_external(doc), "score": score} for doc, score in multi_word_search("fever cough")]
+    assert _export(api, query="Fever  cough") == expected
+    assert _export(api, query="fever cough", limit=5) == expected[:5]
+    assert [row["doc_id"] for row in _export(api, query="fever NOT cough", mode="boolean")] == [
+        doc_id_table.to_external(doc) for doc, _ in api.boolean_search("fever NOT cough")]
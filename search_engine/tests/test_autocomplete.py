@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from autocomplete import PrefixIndex
+
+WORDS = ["vaccine", "vaccines", "vaccinated", "vaccinia", "valve", "variant", "variants", "viral", "virus", "vitamin"]
+DFS = [50, 30, 12, 2, 7, 40, 25, 60, 90, 5]
+
+
+def _exhaustive(words, dfs, prefix, top_n):
+    matches = [(w, d) for w, d in zip(words, dfs) if w.startswith(prefix)]
+    return [w for w, _ in sorted(matches, key=lambda m: (-m[1], m[0]))[:top_n]]
+
+
+@pytest.fixture
+def index():
+    index = PrefixIndex(precompute_depth=2, precompute_n=3)
+    index.build(WORDS, np.array(DFS))
+    return index
+
+
+@pytest.mark.parametrize("prefix", ["v", "va", "vac", "vacc", "vari", "vir", "x"])
+@pytest.mark.parametrize("top_n", [1, 3, 5])
+def test_suggest_matches_exhaustive_ranking(index, prefix, top_n):
+    assert index.suggest(prefix, top_n) == _exhaustive(WORDS, DFS, prefix, top_n)
+
+
+@pytest.mark.parametrize("max_recent", [1024, 2, 5])
+def test_added_documents_update_frozen_tops(max_recent):
+    rng = np.random.default_rng(4)
+    index = PrefixIndex(precompute_depth=2, precompute_n=3, max_recent=max_recent)
+    index.build(WORDS, np.array(DFS))
+    words, dfs = list(WORDS), list(DFS)
+    for word in ["vaccinia"] * 60 + ["vax", "vax", "val"]:
+        index.add_document([word])
+        if word not in words:
+            words.append(word)
+            dfs.append(0)
+        dfs[words.index(word)] += 1
+    # Plus random multi-word documents
+    for _ in range(40):
+        doc = set(rng.choice(words, 3).tolist())
+        index.add_document(doc)
+        for word in doc:
+            dfs[words.index(word)] += 1
+
+    assert index.recent == sorted(index.recent) and len(index.recent) < max_recent
+    assert index.words == sorted(index.words)
+    for prefix in ["v", "va", "vac", "vaccin", "vax", "vi"]:
+        for top_n in (1, 3, 6):
+            assert index.suggest(prefix, top_n) == _exhaustive(words, dfs, prefix, top_n)
+
+
+def test_untouched_prefixes_skip_the_overflow(index):
+    index.add_document(["vitamin"])
+    assert index.recent == ["vitamin"]
+    assert index.suggest("va", 3) == ["vaccine", "variant", "vaccines"]
+    assert index.suggest("vit", 1) == ["vitamin"]
+
+
+def test_overflow_folds_into_the_base_list(index):
+    index.max_recent = 2
+    index.add_document(["vax"])
+    index.add_document(["zika", "vitamin"])
+    assert index.recent == [] and "vax" in index.words and "zika" in index.words
+    assert index.top["z"] == ["zika"]
+    assert index.suggest("vi", 3) == ["virus", "viral", "vitamin"]
+    assert index.suggest("vax", 1) == ["vax"]
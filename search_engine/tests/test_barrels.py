@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+
+from barrels import (
+    BINARY_HEADER, BINARY_MAGIC, CODEC_COMPRESSED, CODEC_JSON, TERM_TABLE_DTYPE_V3,
+    _MappedBarrel, barrel_manager,
+)
+from postings import PostingList
+from ranking import bm25
+
+POSITIONAL = {
+    1: {0: [4, 9], 3: [1], 7: [0, 2, 5]},
+    2: {3: [8]},
+    5: {1: [3, 6, 7, 11], 7: [1]},
+}
+
+
+def test_binary_barrel_round_trip(search_index):
+    search_index({"unused": {7: 1}})
+    barrel_manager.save_binary_barrel(0, POSITIONAL)
+    mapped = _MappedBarrel(barrel_manager.get_binary_barrel_path(0))
+    assert mapped.codec == CODEC_COMPRESSED and mapped.has_max_tf
+    assert mapped.table["df"].tolist() == [3, 1, 2]
+    assert mapped.table["max_tf"].tolist() == [3, 1, 4]
+    mapped.close()
+
+    assert barrel_manager.load_binary_barrel(0) == POSITIONAL
+    assert barrel_manager.load_postings(5) == POSITIONAL[5]
+    assert barrel_manager.load_postings(4) is None
+    plist = barrel_manager.get_postings(1)
+    assert plist.doc_ids.tolist() == [0, 3, 7] and plist.tfs.tolist() == [2, 1, 3]
+    assert plist.positions(2).tolist() == [0, 2, 5]
+    assert [barrel_manager.get_df(w) for w in (1, 2, 4, 5)] == [3, 1, 0, 2]
+    assert barrel_manager.document_frequencies(5).tolist() == [0, 3, 1, 0, 0, 2]
+    assert barrel_manager.get_max_tf(5) == 4
+
+
+def test_rewritten_binary_barrel_is_remapped(search_index):
+    search_index({"unused": {7: 1}})
+    barrel_manager.save_binary_barrel(0, POSITIONAL)
+    assert barrel_manager.get_df(1) == 3
+    barrel_manager.save_binary_barrel(0, {1: {2: [0]}})
+    assert barrel_manager.get_df(1) == 1 and barrel_manager.get_postings(5) is None
+
+
+def test_string_doc_ids_use_json_payloads(search_index):
+    search_index({"unused": {0: 1}})
+    data = {1: {"a1f3": [0, 5], "0c9e": [2]}, 2: ["b77d", "a1f3"]}
+    barrel_manager.save_binary_barrel(0, data)
+    mapped = _MappedBarrel(barrel_manager.get_binary_barrel_path(0))
+    assert mapped.codec == CODEC_JSON
+    mapped.close()
+
+    assert barrel_manager.load_binary_barrel(0) == data
+    plist = barrel_manager.get_postings(1)
+    assert plist.doc_ids.dtype == object
+    assert plist.doc_ids.tolist() == ["0c9e", "a1f3"] and plist.tfs.tolist() == [1, 2]
+    # Old docID-list postings count one occurrence per document
+    assert barrel_manager.get_postings(2).tfs.tolist() == [1, 1]
+
+
+def test_json_barrel_round_trip(search_index):
+    search_index({"unused": {7: 1}})
+    barrel_manager._release_mapped(0)
+    os.remove(barrel_manager.get_binary_barrel_path(0))
+    barrel_manager.save_barrel(0, POSITIONAL)
+    assert os.path.exists(barrel_manager.get_barrel_path(0))
+    # JSON object keys come back as strings; docIDs and wordIDs are restored to ints
+    assert barrel_manager.load_barrel(0) == POSITIONAL
+    assert barrel_manager.get_df(1) == 3 and barrel_manager.get_max_tf(5) == 4
+
+
+def _write_v3(path, data):
+    """A version 3 barrel: its table stores a write-time BM25 bound instead of max_tf."""
+    word_ids = sorted(data)
+    table = np.zeros(len(word_ids), dtype=TERM_TABLE_DTYPE_V3)
+    payloads = [PostingList.from_postings(data[w]).encode() for w in word_ids]
+    offset = BINARY_HEADER.size + table.nbytes
+    for i, (word_id, payload) in enumerate(zip(word_ids, payloads)):
+        table[i] = (word_id, len(data[word_id]), offset, len(payload), 0.001)
+        offset += len(payload)
+    with open(path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, 3, CODEC_COMPRESSED, len(word_ids), 0))
+        f.write(table.tobytes())
+        f.write(b"".join(payloads))
+
+
+def test_version_3_barrels_ignore_stored_bounds(search_index):
+    search_index({"unused": {7: 1}})
+    barrel_manager._release_mapped(0)
+    _write_v3(barrel_manager.get_binary_barrel_path(0), POSITIONAL)
+    mapped = _MappedBarrel(barrel_manager.get_binary_barrel_path(0))
+    assert not mapped.has_max_tf
+    mapped.close()
+
+    assert barrel_manager.load_binary_barrel(0) == POSITIONAL
+    assert barrel_manager.get_max_tf(5) == 4
+    plist = barrel_manager.get_postings(5)
+    actual = bm25.score(plist.doc_ids, plist.tfs, barrel_manager.get_df(5)).max()
+    assert actual <= barrel_manager.get_max_score(5) + 1e-9
+    assert barrel_manager.get_max_score(5) == bm25.term_bound(4, 2)
+
+
+def test_offline_build_carries_tf_and_positions(search_index, tmp_path):
+    import json
+
+    from barrels import _normalize_postings
+    from doc_ids import DocIdTable
+    from forward_index import ForwardIndex
+    from inverted_index import InvertedIndex
+    from lexicon import Lexicon
+
+    tokenized = {"doc_b": ["spike", "protein", "spike"], "doc_a": ["protein", "binds"]}
+    lex = Lexicon()
+    lex.build(list(tokenized.values()))
+    fwd = ForwardIndex()
+    fwd.build(tokenized, lex, DocIdTable())
+    inv = InvertedIndex()
+    inv.build(fwd.index, fwd.positions)
+    path = str(tmp_path / "inverted_index.json")
+    inv.save(path)
+
+    search_index({"unused": {0: 1}})
+    with open(path, encoding="utf-8") as f:
+        saved = {int(wid): _normalize_postings(p) for wid, p in json.load(f).items()}
+    barrel_manager.save_binary_barrel(0, saved)
+
+    spike = barrel_manager.get_postings(lex.get_id("spike"))
+    assert spike.doc_ids.tolist() == [1] and spike.tfs.tolist() == [2]
+    assert spike.positions(0).tolist() == [0, 2]
+    protein = barrel_manager.get_postings(lex.get_id("protein"))
+    assert protein.doc_ids.tolist() == [0, 1] and protein.tfs.tolist() == [1, 1]
+    assert [protein.positions(r).tolist() for r in range(2)] == [[0], [1]]
@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+
+import compaction
+from compaction import Compactor, RateLimiter
+
+KB = 1024
+
+
+def _sizes(*kbs):
+    return [(f"seg_{i:06d}.bin", int(kb * KB)) for i, kb in enumerate(kbs, 1)]
+
+
+def test_tier_grows_by_fanout():
+    compactor = Compactor(None, fanout=4, base_bytes=64 * KB)
+    assert [compactor.tier(kb * KB) for kb in (1, 64, 255, 256, 1024, 4096)] == [0, 0, 0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("kbs, expected", [
+    ((1, 2, 3, 4), [1, 2, 3, 4]),  # one tier-0 run
+    ((1, 2, 3), None),  # run too short
+    ((5000, 1, 2, 3, 4), [2, 3, 4, 5]),  # the big segment is in its own tier
+    ((1, 2, 3, 4, 300, 300, 300, 300), [1, 2, 3, 4]),  # oldest run first
+    ((1, 2, 300, 3, 4, 5, 6, 300), [4, 5, 6, 7]),  # only adjacent segments merge
+])
+def test_pick_merges_oldest_same_tier_run(kbs, expected):
+    compactor = Compactor(None, min_merge=4, fanout=4, max_segments=16, base_bytes=64 * KB)
+    picked = compactor.pick(_sizes(*kbs))
+    assert picked == (None if expected is None else [f"seg_{i:06d}.bin" for i in expected])
+
+
+def test_pick_caps_segment_count_with_smallest_window():
+    compactor = Compactor(None, min_merge=2, fanout=4, max_segments=3, base_bytes=64 * KB)
+    # Alternating tiers never form a run, so only the segment cap applies
+    assert compactor.pick(_sizes(1, 300, 2)) is None
+    assert compactor.pick(_sizes(1, 300, 2, 1200, 3)) == ["seg_000001.bin", "seg_000002.bin"]
+    assert compactor.pick(_sizes(60, 300, 2, 1200, 3, 290)) == ["seg_000005.bin", "seg_000006.bin"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock that time.sleep advances; returns the list of sleeps."""
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(round(seconds, 6))
+        now[0] += seconds
+
+    monkeypatch.setattr(compaction.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(compaction.time, "sleep", sleep)
+    return now, sleeps
+
+
+def test_rate_limiter_throttles_to_rate(clock):
+    now, sleeps = clock
+    limiter = RateLimiter(1000)
+    limiter.consume(500)
+    limiter.consume(1000)
+    assert sleeps == [0.5, 1.0]
+    now[0] += 0.25  # time spent working earns allowance
+    limiter.consume(500)
+    assert sleeps == [0.5, 1.0, 0.25]
+
+
+def test_rate_limiter_burst_is_capped_at_one_second(clock):
+    now, sleeps = clock
+    limiter = RateLimiter(1000)
+    now[0] += 60
+    limiter.consume(1000)
+    assert sleeps == []
+    limiter.consume(500)
+    assert sleeps == [0.5]
+
+
+def test_rate_limiter_zero_rate_never_sleeps(clock):
+    _, sleeps = clock
+    limiter = RateLimiter(0)
+    limiter.consume(10 ** 9)
+    assert sleeps == []
+
+
+def _segments(live, count):
+    for doc in range(10, 10 + count):
+        live.add_document(doc, {1: [0, doc]})
+        live.flush()
+    return [name for name, _ in live.snapshot()]
+
+
+def test_merge_replaces_run_with_one_segment(live):
+    names = _segments(live, 4)
+    compactor = Compactor(live, min_merge=2, mb_per_sec=0)
+    merged = compactor.merge(names[1:3])
+    assert [name for name, _ in live.snapshot()] == [names[0], merged, names[3]]
+    with open(live.manifest_path, encoding="utf-8") as f:
+        assert json.load(f) == [names[0], merged, names[3]]
+    assert not any(os.path.exists(os.path.join(live.directory, name)) for name in names[1:3])
+    assert live.live_list(1).doc_ids.tolist() == [10, 11, 12, 13]
+
+
+def test_merge_write_failure_keeps_segments(live, monkeypatch):
+    names = _segments(live, 2)
+
+    def failing_write(path, barrel):
+        # The placeholder is gone too, as if the write died mid-replace
+        os.remove(path)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(compaction, "write_binary_barrel", failing_write)
+    with pytest.raises(OSError, match="disk full"):
+        Compactor(live, min_merge=2, mb_per_sec=0).merge(names)
+    assert [name for name, _ in live.snapshot()] == names
+    assert sorted(f for f in os.listdir(live.directory) if f.endswith(".bin")) == names
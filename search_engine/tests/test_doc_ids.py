@@ -0,0 +1,32 @@
+from doc_ids import DocIdTable
+
+
+def test_ids_are_dense_and_stable():
+    table = DocIdTable()
+    assert [table.add(doc) for doc in ["c9f1", "a07e", "c9f1", "doc_3"]] == [0, 1, 0, 2]
+    assert table.size() == 3
+    assert table.get_id("a07e") == 1 and table.get_id("missing") == -1
+    assert table.get_doc(2) == "doc_3" and table.get_doc(7) == "" and table.get_doc(-1) == ""
+
+
+def test_to_external_passes_legacy_string_ids_through():
+    table = DocIdTable()
+    table.add("c9f1")
+    assert table.to_external(0) == "c9f1"
+    assert table.to_external("legacy_hash") == "legacy_hash"
+    assert table.to_external(42) == "42"  # unknown int IDs stay recognizable
+
+
+def test_assign_and_save_load_round_trip(tmp_path):
+    table = DocIdTable()
+    table.add("c9f1")
+    table.assign("replayed", 4)  # WAL replay past IDs this process never saw
+    assert table.id_to_doc == ["c9f1", "", "", "", "replayed"]
+    assert table.add("next") == 5
+
+    path = str(tmp_path / "doc_ids.json")
+    table.save(path)
+    loaded = DocIdTable()
+    loaded.load(path)
+    assert loaded.path == path and loaded.id_to_doc == table.id_to_doc
+    assert loaded.doc_to_id == {"c9f1": 0, "replayed": 4, "next": 5}
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from doc_store import DocStore
+
+
+def _parse(paper_id, title, abstract, body=""):
+    return {
+        "paper_id": paper_id,
+        "metadata": {"title": title},
+        "abstract": [{"text": abstract}],
+        "body_text": [{"text": part} for part in body.split("|") if part],
+    }
+
+
+@pytest.fixture
+def sources(tmp_path):
+    first, second = tmp_path / "pdf_json", tmp_path / "sample_data"
+    first.mkdir()
+    second.mkdir()
+    (first / "c9f1.json").write_text(json.dumps(_parse("c9f1", "Spike protein", "Binding assay", "Intro|Methods")))
+    (first / "a07e.json").write_text(json.dumps(_parse("a07e", "Old title", "Old abstract")))
+    (second / "a07e.json").write_text(json.dumps(_parse("a07e", "Ünïcode title", "Later source wins")))
+    (second / "broken.json").write_text("{not json")
+    return [str(first), str(second)]
+
+
+def test_build_and_positioned_reads(search_index, sources, tmp_path, monkeypatch):
+    from doc_ids import doc_id_table
+
+    search_index({"spike": {0: 1}})  # doc_0 already has int ID 0
+    monkeypatch.setattr(doc_id_table, "save", lambda path=None: None)
+    store = DocStore(str(tmp_path / "store"))
+    assert store.build(sources, include_body=True) == 2
+
+    c9f1, a07e = doc_id_table.get_id("c9f1"), doc_id_table.get_id("a07e")
+    assert store.get(c9f1) == {"paper_id": "c9f1", "title": "Spike protein", "abstract": "Binding assay"}
+    assert store.get(c9f1, with_body=True)["body"] == "Intro Methods"
+    assert store.get(a07e)["title"] == "Ünïcode title"
+    assert store.get(0) is None and store.get(-1) is None and store.get(10 ** 6) is None
+    assert store.get_many([a07e, 0, c9f1]) == [store.get(a07e), None, store.get(c9f1)]
+
+
+def test_append_replaces_and_grows_the_index(tmp_path):
+    store = DocStore(str(tmp_path / "store"))
+    assert not store.load() and store.get(0) is None
+    store.append(3, "doc_3", "First version", "Abstract")
+    assert store.loaded and store.size() == 4 and store.get(1) is None
+    store.append(3, "doc_3", "Second version", "Abstract", body="Full text")
+    store.append(1, "doc_1", "Other", "")
+    assert store.get(3, with_body=True) == {
+        "paper_id": "doc_3", "title": "Second version", "abstract": "Abstract", "body": "Full text",
+    }
+    reopened = DocStore(str(tmp_path / "store"))
+    assert reopened.load() and reopened.get_many([1, 3, 2]) == [store.get(1), store.get(3), None]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from embedding_store import embedding_store, normalize_rows
+from ranking import top_k_results
+
+
+def _brute_force(doc_ids, vectors, query, top_k):
+    return top_k_results(np.asarray(doc_ids), normalize_rows(vectors) @ normalize_rows(query), top_k)
+
+
+def _assert_same_ranking(results, expected):
+    assert [doc for doc, _ in results] == [doc for doc, _ in expected]
+    assert np.allclose([score for _, score in results], [score for _, score in expected], atol=1e-6)
+
+
+@pytest.fixture
+def packed_with_extra(packed_embeddings):
+    """Docs 0, 2, ..., 38 packed; docs 41 and 45 added after packing."""
+    packed_embeddings(range(0, 40, 2))
+    rng = np.random.default_rng(9)
+    extra = {41: rng.normal(size=8), 45: rng.normal(size=8)}
+    for doc_id, vector in extra.items():
+        embedding_store.add(doc_id, vector)
+    doc_ids = np.concatenate((np.asarray(embedding_store.doc_ids), list(extra)))
+    vectors = np.vstack((np.asarray(embedding_store.vectors), normalize_rows(np.vstack(list(extra.values())))))
+    return doc_ids, vectors
+
+
+def test_search_scores_packed_and_extra_vectors(packed_with_extra):
+    doc_ids, vectors = packed_with_extra
+    query = vectors[doc_ids.tolist().index(45)] + 0.1
+    results = embedding_store.search(query, top_k=5)
+    assert results[0][0] == 45
+    _assert_same_ranking(results, _brute_force(doc_ids, vectors, query, 5))
+    assert len(embedding_store.search(query, top_k=None)) == len(doc_ids) == embedding_store.size()
+
+
+def test_gather_keeps_input_order_and_drops_missing(packed_with_extra):
+    requested = np.array([45, 6, 3, -1, 1000, 0, 41, 38])
+    found, vectors = embedding_store.gather(requested)
+    assert found.tolist() == [45, 6, 0, 41, 38]
+    for doc_id, vector in zip(found.tolist(), vectors):
+        assert np.array_equal(vector, embedding_store.get(doc_id))
+    assert embedding_store.get(3) is None and embedding_store.get(1000) is None
+
+
+def test_rerank_candidates_uses_gathered_vectors(packed_with_extra):
+    from semantic import rerank_candidates
+
+    doc_ids, vectors = packed_with_extra
+    query = np.arange(8, dtype=np.float32)
+    candidates = np.array([41, 10, 11, 4, 45])
+    keep = np.isin(doc_ids, candidates)
+    _assert_same_ranking(rerank_candidates(query, candidates, top_k=3), _brute_force(doc_ids[keep], vectors[keep], query, 3))
+
+
+def test_semantic_search_packed_and_legacy_dict(packed_with_extra, search_index, monkeypatch):
+    import semantic
+    from doc_ids import doc_id_table
+
+    search_index({"spike": {doc: 1 for doc in range(46)}})
+    monkeypatch.setattr(semantic.ann_index, "ready", lambda: False)
+    monkeypatch.setattr(semantic.quantized_embeddings, "ready", lambda: False)
+    glove = {"spike": np.linspace(-1, 1, 8), "protein": np.ones(8)}
+    query = semantic.average_embedding(["spike", "protein"], glove)
+
+    doc_ids, vectors = packed_with_extra
+    expected = [(doc_id_table.to_external(doc), score) for doc, score in _brute_force(doc_ids, vectors, query, 4)]
+    _assert_same_ranking(semantic.semantic_search_query("spike protein", top_k=4, glove=glove), expected)
+
+    # Legacy in-memory dict of unnormalized per-document vectors, keyed by external ID
+    legacy = {f"doc_{doc}": vector * (doc + 1) for doc, vector in zip(doc_ids.tolist(), vectors)}
+    _assert_same_ranking(semantic.semantic_search_query("spike protein", top_k=4, glove=glove, preloaded_embeddings=legacy), expected)
+    assert semantic.semantic_search_query("unknown words", glove=glove, preloaded_embeddings=legacy) == []
+
+
+def test_pack_per_document_files(search_index, tmp_path, monkeypatch):
+    from doc_ids import doc_id_table
+    from embedding_store import EmbeddingStore
+
+    search_index({"spike": {0: 1, 1: 1}})  # doc_0, doc_1 already have int IDs
+    saved = []
+    monkeypatch.setattr(doc_id_table, "save", lambda path=None: saved.append(doc_id_table.size()))
+    source = tmp_path / "embeddings"
+    source.mkdir()
+    vectors = {"new_doc": [0.0, 3.0, 4.0], "doc_1": [2.0, 0.0, 0.0], "doc_0": [1.0, 1.0, 0.0]}
+    for name, vector in vectors.items():
+        np.save(source / f"{name}.npy", np.array(vector, dtype=np.float32))
+
+    store = EmbeddingStore(str(tmp_path / "packed"))
+    assert store.pack(str(source)) == 3
+    assert saved == [3] and doc_id_table.get_id("new_doc") == 2  # registered and saved once
+
+    loaded = EmbeddingStore(str(tmp_path / "packed"))
+    assert loaded.load() and isinstance(loaded.vectors, np.memmap)
+    assert loaded.doc_ids.tolist() == [0, 1, 2]  # rows in docID order
+    assert np.allclose(loaded.vectors, [[2 ** -0.5, 2 ** -0.5, 0], [1, 0, 0], [0, 0.6, 0.8]])
+    assert np.allclose(loaded.get(2), [0, 0.6, 0.8]) and loaded.get(3) is None
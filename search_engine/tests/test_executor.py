@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+
+def test_saturated_pool_fails_fast_with_retry_after(api):
+    from app.backend.executor import BoundedExecutor, PoolSaturated
+
+    pool = BoundedExecutor("test", workers=1, queue_size=1, retry_after=7)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 1 and pool.stats()["queue_depth"] == 1
+        with pytest.raises(PoolSaturated) as err:
+            await pool.run(lambda: "rejected")
+        release.set()
+        return err.value, await running, await queued, await pool.run(lambda: "after")
+
+    try:
+        rejected, *results = asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert rejected.status_code == 503 and rejected.headers == {"Retry-After": "7"}
+    assert results == [True, "queued", "after"]
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["queue_depth"] == 0
+
+
+def test_endpoint_passes_the_503_through(api, search_index, monkeypatch):
+    from fastapi import HTTPException
+    from app.backend.executor import BoundedExecutor
+    from result_cache import result_cache
+
+    search_index({"fever": {0: 1}})
+    result_cache.invalidate()  # a cached page would never reach the pool
+    full = BoundedExecutor("search", workers=1, queue_size=0)
+    full.in_flight = 1  # every slot taken
+    monkeypatch.setattr(api, "search_pool", full)
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(api.page_search_endpoint(api.PageRequest(query="fever", mode="single")))
+    assert err.value.status_code == 503 and "Retry-After" in err.value.headers
+    full.shutdown()
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from glove_store import GloveVectors, LexiconGlove, cache_paths, open_glove
+
+GLOVE_TEXT = "virus 0.5 -1 2\nfever 1 0 0\nantibody 0 0.25 1\ncough -2 3 0.5\n"
+
+
+@pytest.fixture
+def glove_txt(tmp_path):
+    path = tmp_path / "glove.test.3d.txt"
+    path.write_text(GLOVE_TEXT, encoding="utf-8")
+    return str(path)
+
+
+def test_open_glove_converts_once_then_maps(glove_txt):
+    glove = open_glove(glove_txt)
+    vocab_path, matrix_path = cache_paths(glove_txt)
+    assert os.path.exists(vocab_path) and os.path.exists(matrix_path)
+    assert isinstance(glove, GloveVectors) and isinstance(glove.vectors, np.memmap)
+    assert list(glove) == ["antibody", "cough", "fever", "virus"] and len(glove) == 4
+    assert glove["virus"].tolist() == [0.5, -1.0, 2.0]
+    assert "fever" in glove and "zika" not in glove and 3 not in glove
+    with pytest.raises(KeyError):
+        glove["zika"]
+
+    # A fresh cache is reused as-is; a newer text file is converted again
+    mtime = os.path.getmtime(matrix_path)
+    open_glove(glove_txt)
+    assert os.path.getmtime(matrix_path) == mtime
+    with open(glove_txt, "a", encoding="utf-8") as f:
+        f.write("zika 0 0 1\n")
+    os.utime(glove_txt, (mtime + 10, mtime + 10))
+    assert "zika" in open_glove(glove_txt)
+
+
+
+def test_lexicon_projection_embeds_by_word_id(glove_txt, search_index, tmp_path, monkeypatch):
+    import semantic
+    from lexicon import lexicon
+
+    glove = open_glove(glove_txt)
+    search_index({"virus": {0: 1}, "fever": {0: 1}, "mask": {0: 1}})  # "mask" has no GloVe vector
+    projected = LexiconGlove(str(tmp_path / "projected"))
+    projected.build(glove)
+    assert projected.rows[1:].tolist() == [0, 1, -1] and projected.vectors.shape == (2, 3)
+
+    tokens = ["virus", "fever", "virus", "mask"]
+    expected = np.mean([glove[t] for t in tokens if t in glove], axis=0)
+    assert np.allclose(projected.embed_tokens(tokens), expected)
+    assert projected.embed_tokens(["mask"]) is None
+    # Words outside the projection (e.g. newer lexicon words) fall back to full GloVe
+    lexicon.add_word("cough")
+    assert np.allclose(projected.embed_tokens(["virus", "cough"], glove), (glove["virus"] + glove["cough"]) / 2)
+
+    projected.save()
+    reloaded = LexiconGlove(str(tmp_path / "projected"))
+    assert reloaded.load() and np.allclose(reloaded.embed(lexicon.get_id(t) for t in tokens), expected)
+    monkeypatch.setattr(semantic, "lexicon_glove", reloaded)
+    assert np.allclose(semantic.average_embedding(tokens, glove), expected)
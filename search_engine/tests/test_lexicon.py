@@ -0,0 +1,37 @@
+from doc_ids import DocIdTable
+from lexicon import Lexicon
+
+
+def test_lexicon_round_trip(tmp_path):
+    lexicon = Lexicon()
+    lexicon.build([["virus", "cell", "x1"], ["cell", "protein"]])
+    assert lexicon.add_word("vaccine") == 4
+    assert lexicon.add_word("cell") == lexicon.get_id("cell")
+    lexicon.save(str(tmp_path / "lexicon.json"))
+
+    loaded = Lexicon()
+    loaded.load(str(tmp_path / "lexicon.json"))
+    assert loaded.word_to_id == lexicon.word_to_id
+    assert loaded.get_word(4) == "vaccine"
+    assert loaded.add_word("spike") == 5
+
+
+def test_lexicon_add_word_with_logged_id():
+    lexicon = Lexicon()
+    assert lexicon.add_word("virus", 7) == 7
+    assert lexicon.add_word("virus", 9) == 7  # replaying an entry twice is harmless
+    assert lexicon.add_word("cell") == 8
+
+
+def test_doc_id_table_round_trip(tmp_path):
+    table = DocIdTable()
+    assert [table.add(doc) for doc in ("a1f3", "doc_1", "a1f3")] == [0, 1, 0]
+    table.assign("doc_4", 4)  # IDs 2-3 were never logged
+    table.save(str(tmp_path / "doc_ids.json"))
+
+    loaded = DocIdTable()
+    loaded.load(str(tmp_path / "doc_ids.json"))
+    assert loaded.size() == 5
+    assert loaded.get_id("doc_4") == 4 and loaded.get_doc(2) == ""
+    assert loaded.to_external(3) == "3" and loaded.to_external("a1f3") == "a1f3"
+    assert loaded.add("doc_5") == 5
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from postings import PostingList, decode_varints, encode_varints, merge_posting_lists
+
+
+def _encoded(postings):
+    """A PostingList as read back from a barrel (positions kept encoded)."""
+    return PostingList.decode(PostingList.from_postings(postings).encode())
+
+
+def _positions(plist):
+    return {int(doc): plist.positions(i).tolist() for i, doc in enumerate(plist.doc_ids)}
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2 ** 31, 2 ** 40], dtype=np.uint64)
+    assert decode_varints(encode_varints(values)).tolist() == values.tolist()
+
+
+def test_posting_list_round_trip():
+    postings = {5: [3, 1, 9], 2: [0], 40: [7, 8]}
+    plist = _encoded(postings)
+    assert plist.doc_ids.tolist() == [2, 5, 40]
+    assert plist.tfs.tolist() == [1, 3, 2]
+    assert _positions(plist) == {2: [0], 5: [1, 3, 9], 40: [7, 8]}
+    assert plist.to_postings() == {2: [0], 5: [1, 3, 9], 40: [7, 8]}
+
+
+def test_merge_ascending_parts_concatenates_blocks():
+    merged = merge_posting_lists([_encoded({1: [0, 4]}), None, _encoded({3: [2], 8: [1, 5, 6]})])
+    assert merged.doc_ids.tolist() == [1, 3, 8]
+    assert _positions(_encoded(merged.to_postings())) == {1: [0, 4], 3: [2], 8: [1, 5, 6]}
+    assert _positions(PostingList.decode(merged.encode())) == {1: [0, 4], 3: [2], 8: [1, 5, 6]}
+
+
+def test_merge_keeps_newest_entry_per_doc():
+    older = _encoded({1: [0], 4: [1, 2], 9: [3]})
+    newer = _encoded({4: [7], 6: [0, 1]})
+    merged = PostingList.decode(merge_posting_lists([older, newer]).encode())
+    assert merged.doc_ids.tolist() == [1, 4, 6, 9]
+    assert merged.tfs.tolist() == [1, 1, 2, 1]
+    assert _positions(merged) == {1: [0], 4: [7], 6: [0, 1], 9: [3]}
+
+
+@pytest.mark.parametrize("encoded", [False, True])
+def test_merge_mixed_positions_round_trip(encoded):
+    # An old docID-list part (tf 1, no positions) overlapping a positional one
+    without = PostingList.from_postings([2, 5, 9])
+    with_positions = _encoded({5: [1, 4, 6], 7: [0, 2]}) if encoded else PostingList.from_postings({5: [1, 4, 6], 7: [0, 2]})
+    merged = merge_posting_lists([without, with_positions])
+    decoded = PostingList.decode(merged.encode())
+    for plist in (merged, decoded):
+        assert plist.doc_ids.tolist() == [2, 5, 7, 9]
+        assert plist.tfs.tolist() == [1, 3, 2, 1]
+        # Docs from the positional part keep theirs; the others have none
+        assert plist.has_positions()
+        assert _positions(plist) == {2: [], 5: [1, 4, 6], 7: [0, 2], 9: []}
+
+
+def test_merge_list_barrel_with_newer_positional_docs():
+    # The usual live-index case: base docID list, then newer docs with positions
+    base = PostingList.from_postings([1, 4, 8])
+    live = _encoded({10: [3], 12: [0, 7]})
+    merged = PostingList.decode(merge_posting_lists([base, live]).encode())
+    assert merged.tfs.tolist() == [1, 1, 1, 1, 2]
+    assert _positions(merged) == {1: [], 4: [], 8: [], 10: [3], 12: [0, 7]}
+    # Merging again (compaction of merged segments) keeps the run lengths
+    again = PostingList.decode(merge_posting_lists([merged, _encoded({15: [2, 5]})]).encode())
+    assert _positions(again) == {1: [], 4: [], 8: [], 10: [3], 12: [0, 7], 15: [2, 5]}
+
+
+def test_merge_overlapping_parts_matches_dict_merge():
+    rng = np.random.default_rng(2)
+    parts, expected = [], {}
+    for part in range(4):
+        postings = {
+            int(doc): sorted(rng.choice(500, int(rng.integers(1, 6)), replace=False).tolist())
+            for doc in rng.choice(60, 25, replace=False)
+        }
+        expected.update(postings)  # newer parts win
+        # Mix parts read from a barrel with parts still holding position lists
+        parts.append(_encoded(postings) if part % 2 else PostingList.from_postings(postings))
+    merged = merge_posting_lists(parts)
+    assert merged.doc_ids.tolist() == sorted(expected)
+    assert merged.tfs.tolist() == [len(expected[doc]) for doc in sorted(expected)]
+    assert PostingList.decode(merged.encode()).to_postings() == {doc: expected[doc] for doc in sorted(expected)}
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork serving needs os.fork")
+def test_forked_workers_accept_on_the_shared_socket(api):
+    from app.backend.prefork import _bind
+
+    sock = _bind("127.0.0.1", 0)
+    assert sock.get_inheritable()
+    children = []
+    try:
+        for worker in range(2):
+            pid = os.fork()
+            if pid == 0:
+                # Worker: answer one connection with its index, like a uvicorn worker would
+                try:
+                    conn, _ = sock.accept()
+                    conn.sendall(str(worker).encode())
+                    conn.close()
+                finally:
+                    os._exit(0)
+            children.append(pid)
+
+        answers = set()
+        for _ in range(2):
+            with socket.create_connection(sock.getsockname(), timeout=5) as client:
+                answers.add(client.recv(16).decode())
+        assert answers == {"0", "1"}  # both workers served from the one listening socket
+    finally:
+        for pid in children:
+            os.waitpid(pid, 0)
+        sock.close()
+
+
+def test_multi_worker_servers_refuse_document_adds(api, monkeypatch):
+    from fastapi import HTTPException
+    from app.backend.prefork import WORKERS_ENV
+
+    monkeypatch.setenv(WORKERS_ENV, "4")
+    request = api.AddDocumentRequest(title="Spike protein", abstract="Binding assay")
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(api.add_document(request))
+    assert err.value.status_code == 503
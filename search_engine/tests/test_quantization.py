@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from embedding_store import embedding_store
+from quantization import QuantizedEmbeddings
+
+
+@pytest.mark.parametrize("dim", [None, 4])
+def test_quantized_round_trip(packed_embeddings, dim):
+    packed_embeddings(range(60))
+    quantized = QuantizedEmbeddings()
+    quantized.build(dim)
+    quantized.save()
+    query = np.asarray(embedding_store.vectors[11])
+
+    reloaded = QuantizedEmbeddings()
+    assert reloaded.load()
+    assert reloaded.codes.shape == quantized.codes.shape
+    assert reloaded.search(query, 5) == quantized.search(query, 5)
+    assert reloaded.search(query, 1)[0][0] == 11
+
+
+@pytest.mark.parametrize("doc_ids", [range(61), list(range(59)) + [99]])
+def test_quantized_rejects_codes_of_other_packing(packed_embeddings, doc_ids):
+    packed_embeddings(range(60))
+    quantized = QuantizedEmbeddings()
+    quantized.build(4)
+    quantized.save()
+
+    packed_embeddings(doc_ids)
+    assert not QuantizedEmbeddings().load()
+
+
+def test_quantized_failed_load_is_remembered(packed_embeddings, monkeypatch):
+    packed_embeddings(range(20))
+    calls = []
+    original = QuantizedEmbeddings.load
+    monkeypatch.setattr(QuantizedEmbeddings, "load", lambda self: calls.append(1) or original(self))
+    quantized = QuantizedEmbeddings()
+    assert not quantized.ready()
+    assert not quantized.ready()
+    assert len(calls) == 1
+
+
+def test_quantized_invalidate_deletes_codes(packed_embeddings):
+    packed_embeddings(range(20))
+    quantized = QuantizedEmbeddings()
+    quantized.build()
+    quantized.save()
+    quantized.invalidate()
+    assert not quantized.ready()
+    assert not QuantizedEmbeddings().load()
@@ -0,0 +1,44 @@
+import pytest
+
+from query_parser import QueryParseError, compile_query
+
+POSTINGS = {
+    "covid": {0: 2, 1: 1, 2: 1, 3: 1, 5: 1},
+    "vaccine": {0: 1, 2: 3, 4: 1},
+    "spike": {1: [0], 3: [4], 5: [2]},
+    "protein": {1: [1], 3: [0], 5: [3]},
+    "mouse": {2: 1, 5: 1},
+}
+
+
+@pytest.mark.parametrize("query, plan", [
+    ('covid AND (vaccine OR "spike protein") NOT mouse',
+     "And([Term('covid'), Or([Term('vaccine'), Phrase('spike protein')])], exclude=[Term('mouse')])"),
+    ("fever cough -rash", "And([Term('fever'), Term('cough')], exclude=[Term('rash')])"),
+    ("(the OR (fever OR cough)) OR rash", "Or([Term('fever'), Term('cough'), Term('rash')])"),
+    ("the AND fever", "Term('fever')"),
+])
+def test_compile_query_normalizes_plan(query, plan):
+    assert repr(compile_query(query)) == plan
+
+
+@pytest.mark.parametrize("query", ["NOT fever", "(fever", "fever OR", "", "fever )"])
+def test_malformed_queries_raise(query):
+    with pytest.raises(QueryParseError):
+        compile_query(query)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ('covid AND (vaccine OR "spike protein") NOT mouse', {0, 1}),  # doc 3 has the words in the wrong order
+    ('"spike protein" OR mouse', {1, 2, 5}),
+    ("covid -vaccine -mouse", {1, 3}),
+    ("vaccine OR mouse OR unknownword", {0, 2, 4, 5}),
+    ("covid unknownword", set()),
+])
+def test_execute_plan_matches_set_semantics(search_index, query, expected):
+    from query_engine import execute_plan
+
+    search_index(POSTINGS)
+    results = execute_plan(compile_query(query))
+    assert {doc for doc, _ in results} == expected
+    assert execute_plan(compile_query(query), top_k=2) == results[:2]
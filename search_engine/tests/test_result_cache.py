@@ -0,0 +1,53 @@
+import asyncio
+
+from result_cache import ResultCache, normalize_query
+
+
+def test_results_from_an_older_generation_are_dropped():
+    cache = ResultCache(max_bytes=1 << 20)
+    key = ("multi", normalize_query("  spike   protein "))
+    generation = cache.generation
+    cache.put(key, [(1, 2.0)], generation)
+    assert cache.get(("multi", "spike protein")) == [(1, 2.0)]
+
+    # A search that started before a document was indexed must not store its results
+    started = cache.generation
+    assert cache.invalidate() == started + 1
+    assert cache.get(key) is None and cache.bytes == 0
+    cache.put(key, [(1, 2.0)], started)
+    assert cache.get(key) is None
+    cache.put(key, [(3, 1.0)], cache.generation)
+    assert cache.get(key) == [(3, 1.0)]
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResultCache(max_bytes=3000)
+    rows = [(doc, 1.0) for doc in range(5)]
+    for i in range(3):
+        cache.put(("single", f"q{i}"), rows, cache.generation)
+    cache.get(("single", "q0"))  # most recently used survives
+    cache.put(("single", "q3"), rows, cache.generation)
+    stats = cache.stats()
+    assert stats["evictions"] >= 1 and stats["bytes"] <= 3000
+    assert cache.get(("single", "q0")) == rows and cache.get(("single", "q1")) is None
+    cache.put(("single", "huge"), [(doc, 1.0) for doc in range(1000)], cache.generation)
+    assert cache.get(("single", "huge")) is None  # larger than the whole budget
+
+
+def test_api_serves_fresh_results_after_invalidation(api, search_index, monkeypatch):
+    import result_cache as module
+
+    cache = ResultCache(max_bytes=1 << 20)
+    monkeypatch.setattr(api, "result_cache", cache)
+    monkeypatch.setattr(module, "result_cache", cache)
+    calls = []
+
+    def search(query, top_k=None):
+        calls.append(query)
+        return [(len(calls), 1.0)]
+
+    first = asyncio.run(api._cached_search("single", search, "fever ", top_k=5))
+    assert asyncio.run(api._cached_search("single", search, " fever", top_k=5)) == first
+    cache.invalidate()  # what document_indexer does after adding a document
+    assert asyncio.run(api._cached_search("single", search, "fever", top_k=5)) != first
+    assert len(calls) == 2
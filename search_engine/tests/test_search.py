@@ -0,0 +1,244 @@
+import os
+
+import numpy as np
+import pytest
+
+from query_engine import conjunctive_search, disjunctive_search
+from ranking import top_k_results
+
+
+def test_conjunctive_top_k_keeps_documents_matching_every_term(search_index):
+    # Docs 0-2 score high on "a" but never match "b"; only doc 3 has both
+    search_index({
+        "a": {0: 8, 1: 7, 2: 6, 3: 1},
+        "b": {doc: 1 for doc in range(3, 40)},
+    })
+    full = conjunctive_search(["a", "b"])
+    assert [doc for doc, _ in full] == [3]
+    assert conjunctive_search(["a", "b"], top_k=1) == full
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 5, 20])
+def test_conjunctive_top_k_matches_full_ranking(search_index, top_k):
+    rng = np.random.default_rng(7)
+    postings = {
+        word: {int(doc): int(rng.integers(1, 9)) for doc in rng.choice(200, size, replace=False)}
+        for word, size in (("a", 40), ("b", 120), ("c", 180))
+    }
+    search_index(postings, doc_lengths=rng.integers(5, 60, 200).tolist())
+    words = ["a", "b", "c"]
+    assert conjunctive_search(words, top_k=top_k) == conjunctive_search(words)[:top_k]
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 10])
+def test_disjunctive_top_k_matches_full_ranking(search_index, top_k):
+    rng = np.random.default_rng(11)
+    postings = {
+        word: {int(doc): int(rng.integers(1, 9)) for doc in rng.choice(300, size, replace=False)}
+        for word, size in (("a", 5), ("b", 60), ("c", 250))
+    }
+    search_index(postings, doc_lengths=rng.integers(5, 60, 300).tolist())
+    words = ["a", "b", "c"]
+    assert disjunctive_search(words, top_k=top_k) == disjunctive_search(words)[:top_k]
+
+
+def test_top_k_results_orders_ties_by_doc_id():
+    doc_ids = np.array([4, 7, 9, 12])
+    scores = np.array([1.0, 2.0, 1.0, 2.0])
+    assert top_k_results(doc_ids, scores, 3) == [(7, 2.0), (12, 2.0), (4, 1.0)]
+
+
+def test_max_score_bounds_hold_after_corpus_grows(search_index):
+    from barrels import barrel_manager
+    from ranking import bm25
+
+    rng = np.random.default_rng(3)
+    postings = {
+        word: {int(doc): int(rng.integers(1, 9)) for doc in rng.choice(100, size, replace=False)}
+        for word, size in (("a", 4), ("b", 30), ("c", 90))
+    }
+    word_ids = search_index(postings, doc_lengths=rng.integers(20, 60, 100).tolist())
+    # New documents raise N (and idf) and lower avgdl without rewriting the barrels
+    for doc_id in range(100, 600):
+        bm25.set_doc_length(doc_id, 2)
+
+    for word_id in word_ids.values():
+        plist = barrel_manager.get_postings(word_id)
+        actual = bm25.score(plist.doc_ids, plist.tfs, barrel_manager.get_df(word_id)).max()
+        assert actual <= barrel_manager.get_max_score(word_id) + 1e-9
+    words = list(postings)
+    assert disjunctive_search(words, top_k=3) == disjunctive_search(words)[:3]
+
+
+def _pages(doc_ids, scores, page_size):
+    """Every page via results_after, each resuming after the previous page's last row."""
+    from ranking import results_after
+
+    pages, after = [], None
+    while True:
+        page = results_after(doc_ids, scores, page_size, after)
+        if not page:
+            return pages
+        pages.append(page)
+        after = page[-1]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 7])
+def test_cursor_pagination_over_ties(page_size):
+    doc_ids = np.array([2, 3, 5, 8, 13, 21, 34])
+    scores = np.array([1.5, 3.0, 1.5, 3.0, 1.5, 0.5, 3.0])
+    pages = _pages(doc_ids, scores, page_size)
+    assert [row for page in pages for row in page] == top_k_results(doc_ids, scores)
+    assert all(len(page) == page_size for page in pages[:-1])
+
+
+def test_cursor_pagination_with_string_doc_ids():
+    # Legacy barrels hold string docIDs in object arrays
+    doc_ids = np.array(["a1", "b2", "c3", "d4"], dtype=object)
+    scores = np.array([2.0, 1.0, 2.0, 2.0])
+    pages = _pages(doc_ids, scores, 2)
+    assert [row for page in pages for row in page] == [("a1", 2.0), ("c3", 2.0), ("d4", 2.0), ("b2", 1.0)]
+
+
+def test_ranked_order_matches_top_k_results():
+    from ranking import ranked_order
+
+    rng = np.random.default_rng(5)
+    doc_ids = np.arange(0, 5000, 3)
+    scores = rng.integers(0, 20, len(doc_ids)).astype(np.float64)
+    for limit in (None, 1, 250, len(doc_ids) + 1):
+        order = ranked_order(scores, limit)
+        assert list(zip(doc_ids[order].tolist(), scores[order].tolist())) == top_k_results(doc_ids, scores, limit)
+
+
+def test_conjunctive_top_k_prunes_with_complete_match_threshold(search_index):
+    from query_engine import conjunctive_scores
+
+    # Docs 0-9 have "a" eight times; the other 290 can never catch up
+    search_index({
+        "a": {doc: 8 if doc < 10 else 1 for doc in range(300)},
+        "b": {doc: 1 for doc in range(0, 300, 2)},
+        "c": {doc: 1 for doc in range(400)},
+    }, doc_lengths=[20] * 400)
+    words = ["a", "b", "c"]
+    docs, _ = conjunctive_scores(words, top_k=3)
+    assert len(docs) < len(conjunctive_scores(words)[0])
+    assert conjunctive_search(words, top_k=3) == conjunctive_search(words)[:3]
+    assert {doc for doc, _ in conjunctive_search(words, top_k=3)} <= {0, 2, 4, 6, 8}
+
+
+def test_max_score_union_decodes_only_probed_frequencies(search_index):
+    from postings import PostingList
+    from query_engine import ScoredList, max_score_union
+
+    search_index({"unused": {0: 1}}, doc_lengths=[20] * 5000)
+    rare = PostingList(np.array([3, 70, 4000]), np.array([9, 9, 9]))
+    common = PostingList.decode(PostingList(np.arange(5000), np.ones(5000, dtype=np.int64)).encode())
+    sources = [
+        (100.0, lambda: ScoredList.from_postings(rare, 3)),
+        (0.01, lambda: ScoredList.from_postings(common, 5000)),
+    ]
+    docs, scores = max_score_union(sources, top_k=2)
+    assert docs.tolist() == [3, 70, 4000]
+    assert common._tfs is None  # only the three candidates' frequencies were decoded
+    full_docs, full_scores = max_score_union(sources)
+    assert np.allclose(scores, full_scores[np.searchsorted(full_docs, docs)])
+
+
+# "spike protein" is a phrase in docs 0 and 2; doc 1 has both words far apart
+PHRASE_POSTINGS = {
+    "spike": {0: [3, 10], 1: [0], 2: [7], 3: [5]},
+    "protein": {0: [4], 1: [9], 2: [8, 20]},
+    "binds": {0: [6], 1: [1], 2: [30]},
+}
+
+
+@pytest.mark.parametrize("source", ["binary", "json"])
+def test_phrase_and_near_over_positional_barrels(search_index, source):
+    from barrels import barrel_manager
+    from query_engine import phrase_search, proximity_search
+
+    word_ids = search_index(PHRASE_POSTINGS)
+    if source == "json":
+        data = barrel_manager.load_binary_barrel(0)
+        os.remove(barrel_manager.get_binary_barrel_path(0))
+        barrel_manager.save_barrel(0, data)
+        assert barrel_manager._get_mapped(0) is None
+    assert barrel_manager.get_postings(word_ids["spike"]).has_positions()
+
+    full = phrase_search(["spike", "protein"])
+    assert sorted(doc for doc, _ in full) == [0, 2]
+    assert phrase_search(["spike", "protein"], top_k=1) == full[:1]
+    assert phrase_search(["protein", "spike"]) == []
+
+    # NEAR: every word within the window of a "binds" occurrence, in any order
+    assert sorted(doc for doc, _ in proximity_search(["spike", "binds"], window=1)) == [1]
+    assert sorted(doc for doc, _ in proximity_search(["spike", "protein", "binds"], window=3)) == [0]
+    assert sorted(doc for doc, _ in proximity_search(["spike", "protein"], window=9)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("top_k", [0, 1, 4, 9, 50])
+def test_single_and_multi_word_top_k_match_full_sort(search_index, top_k):
+    from search import multi_word_search, single_word_search
+
+    # tf 1-3 over 30 docs of equal length: plenty of score ties
+    search_index({
+        "fever": {doc: 1 + doc % 3 for doc in range(30)},
+        "cough": {doc: 1 + doc % 2 for doc in range(0, 30, 2)},
+    })
+    full = single_word_search("fever")
+    assert full == sorted(full, key=lambda row: (-row[1], row[0]))
+    assert single_word_search("fever", top_k) == full[:top_k]
+    both = multi_word_search("fever cough")
+    assert len(both) == 15 and multi_word_search("fever cough", top_k) == both[:top_k]
+    assert single_word_search("unknownword", top_k) == []
+
+
+@pytest.mark.parametrize("m, n", [(3, 5000), (400, 500), (0, 10), (50, 0)])
+def test_intersect_sorted_both_strategies(m, n):
+    from query_engine import intersect_sorted
+
+    rng = np.random.default_rng(m + n)
+    candidates = np.sort(rng.choice(10000, m, replace=False))
+    postings = np.sort(rng.choice(10000, n, replace=False))
+    idx_c, idx_p = intersect_sorted(candidates, postings)
+    expected = np.intersect1d(candidates, postings)
+    assert candidates[idx_c].tolist() == postings[idx_p].tolist() == expected.tolist()
+
+
+def test_missing_term_stops_before_reading_postings(search_index, monkeypatch):
+    from barrels import barrel_manager
+
+    search_index({"fever": {0: 1, 1: 2}, "cough": {1: 1}})
+    assert [doc for doc, _ in conjunctive_search(["fever", "cough"])] == [1]
+
+    def no_postings(word_id):
+        raise AssertionError("postings read for a query that cannot match")
+
+    monkeypatch.setattr(barrel_manager, "get_postings", no_postings)
+    assert conjunctive_search(["fever", "unknownword", "cough"]) == []
+
+
+def test_batch_search_matches_individual_queries(search_index, monkeypatch):
+    from barrels import barrel_manager
+    from search import batch_search, multi_word_search, single_word_search
+
+    rng = np.random.default_rng(21)
+    search_index({
+        word: {int(doc): int(rng.integers(1, 5)) for doc in rng.choice(80, size, replace=False)}
+        for word, size in (("fever", 50), ("cough", 30), ("rash", 60))
+    }, doc_lengths=rng.integers(5, 30, 80).tolist())
+    queries = [("single", "Fever", 3), ("multi", "fever cough", None), ("multi", "cough rash fever", 2),
+               ("multi", "fever unknownword", 5), ("single", "", 5)]
+    expected = [
+        single_word_search("fever", 3), multi_word_search("fever cough"),
+        multi_word_search("cough rash fever", 2), [], [],
+    ]
+
+    def no_single_reads(word_id):
+        raise AssertionError("batch queries read postings one word at a time")
+
+    monkeypatch.setattr(barrel_manager, "get_postings", no_single_reads)
+    assert batch_search(queries) == expected
+    with pytest.raises(ValueError):
+        batch_search([("boolean", "fever", 1)])
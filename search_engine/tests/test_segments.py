@@ -0,0 +1,147 @@
+import os
+import shutil
+
+from barrels import barrel_manager
+from doc_ids import doc_id_table
+from lexicon import lexicon
+from query_engine import disjunctive_search
+from ranking import bm25
+
+
+def _add(live, key, tokens):
+    """Index one document the way DocumentIndexer does: tables in memory, then the WAL."""
+    doc = doc_id_table.add(key)
+    new_words = {token: lexicon.add_word(token) for token in tokens if not lexicon.get_id(token)}
+    bm25.set_doc_length(doc, len(tokens))
+    postings = {}
+    for position, token in enumerate(tokens):
+        postings.setdefault(lexicon.get_id(token), []).append(position)
+    live.add_document(doc, postings, key=key, length=len(tokens), words=new_words)
+    return doc
+
+
+def _restart(live):
+    """Drop everything in memory and reload it from disk, as after a crash."""
+    live.close()
+    lexicon.load(lexicon.path)
+    doc_id_table.load(doc_id_table.path)
+    bm25.load(bm25.path)
+    live.load(live.directory)
+
+
+def _df(word):
+    return barrel_manager.get_df(lexicon.get_id(word))
+
+
+def test_add_does_not_rewrite_tables(live):
+    paths = [lexicon.path, doc_id_table.path, bm25.path]
+    before = [os.path.getmtime(path) for path in paths]
+    _add(live, "new_1", ["alpha", "gamma"])
+    assert [os.path.getmtime(path) for path in paths] == before
+    assert lexicon.get_id("gamma") and _df("gamma") == 1
+
+
+def test_wal_replay_restores_tables_and_postings(live):
+    _add(live, "new_1", ["alpha", "gamma", "gamma"])
+    doc = _add(live, "new_2", ["delta", "beta"])
+    expected = disjunctive_search(["alpha", "beta", "gamma", "delta"])
+    word_ids = {word: lexicon.get_id(word) for word in ("gamma", "delta")}
+
+    _restart(live)
+    assert live.delta_docs == 2
+    assert {word: lexicon.get_id(word) for word in word_ids} == word_ids
+    assert doc_id_table.get_id("new_2") == doc and doc_id_table.get_doc(doc) == "new_2"
+    assert bm25.doc_lengths[doc] == 2
+    assert disjunctive_search(["alpha", "beta", "gamma", "delta"]) == expected
+    assert (_df("alpha"), _df("beta"), _df("gamma")) == (3, 4, 1)
+
+
+def test_torn_wal_tail_is_ignored(live):
+    _add(live, "new_1", ["gamma"])
+    with open(live.wal_path, "a", encoding="utf-8") as f:
+        f.write('{"doc": 9, "postings": {"')
+    _restart(live)
+    assert live.delta_docs == 1 and _df("gamma") == 1
+
+
+def test_flush_checkpoints_tables_and_truncates_wal(live):
+    _add(live, "new_1", ["alpha", "gamma"])
+    _add(live, "new_2", ["gamma", "beta"])
+    expected = disjunctive_search(["alpha", "beta", "gamma"])
+    assert live.flush()
+    assert os.path.getsize(live.wal_path) == 0
+
+    _restart(live)
+    assert live.delta_docs == 0 and len(live.snapshot()) == 1
+    assert doc_id_table.get_id("new_2") == 5 and lexicon.get_id("gamma")
+    assert bm25.doc_lengths.tolist()[4:] == [2, 2]
+    assert disjunctive_search(["alpha", "beta", "gamma"]) == expected
+
+
+def test_crash_before_wal_truncate_counts_documents_once(live, tmp_path):
+    _add(live, "new_1", ["alpha", "gamma"])
+    _add(live, "new_2", ["gamma", "beta", "beta"])
+    expected = disjunctive_search(["alpha", "beta", "gamma"])
+    dfs = (_df("alpha"), _df("beta"), _df("gamma"))
+    # A crash between the checkpoint and the WAL truncate: the WAL survives
+    shutil.copy(live.wal_path, tmp_path / "wal.copy")
+    live.flush()
+    shutil.copy(tmp_path / "wal.copy", live.wal_path)
+
+    _restart(live)
+    assert live.delta_docs == 2 and len(live.snapshot()) == 1
+    assert doc_id_table.size() == 6
+    assert (_df("alpha"), _df("beta"), _df("gamma")) == dfs == (3, 4, 2)
+    postings = barrel_manager.get_postings(lexicon.get_id("gamma"))
+    assert postings.doc_ids.tolist() == [4, 5]
+    assert disjunctive_search(["alpha", "beta", "gamma"]) == expected
+
+
+def test_readded_document_counted_once(live):
+    # doc_1 is in the base barrel; adding it again replaces its postings
+    _add(live, "doc_1", ["alpha", "alpha", "alpha", "gamma"])
+    live.flush()
+    _add(live, "doc_1", ["alpha", "gamma"])
+    alpha = lexicon.get_id("alpha")
+    assert _df("alpha") == 2 and _df("gamma") == 1
+    assert barrel_manager.document_frequencies(lexicon._next_id - 1)[alpha] == 2
+    postings = barrel_manager.get_postings(alpha)
+    assert postings.doc_ids.tolist() == [0, 1] and postings.tfs.tolist() == [2, 1]
+    assert barrel_manager.get_max_tf(alpha) >= 2
+
+
+def test_live_lists_follow_adds_and_compaction(live):
+    for i in range(4):
+        _add(live, f"new_{i}", ["gamma"] * (i + 1))
+        assert _df("gamma") == i + 1  # cached merges are dropped on every add
+        live.flush()
+    from compaction import Compactor
+
+    Compactor(live, min_merge=2, mb_per_sec=0).compact()
+    gamma = lexicon.get_id("gamma")
+    assert len(live.snapshot()) == 1
+    assert barrel_manager.get_postings(gamma).tfs.tolist() == [1, 2, 3, 4]
+    assert live.word_ids().tolist() == [gamma]
+
+
+def test_phrase_search_finds_live_documents_over_list_barrels(search_index, tmp_path):
+    from query_engine import phrase_search, proximity_search
+    from segments import LiveIndex
+
+    # Base barrel built from an old inverted index: docID lists, no positions
+    word_ids = search_index({"spike": {0: 1, 1: 1, 2: 1}, "protein": {0: 1, 2: 1}})
+    barrel_manager.save_binary_barrel(0, {word_ids["spike"]: [0, 1, 2], word_ids["protein"]: [0, 2]})
+    LiveIndex.checkpoint_tables()
+    index = LiveIndex(flush_docs=1000)
+    index.load(str(tmp_path / "segments"))
+    try:
+        doc = _add(index, "new_1", ["the", "spike", "protein", "binds"])
+        for flushed in (False, True):
+            plist = barrel_manager.get_postings(word_ids["spike"])
+            assert plist.has_positions() and plist.positions(3).tolist() == [1]
+            assert [d for d, _ in phrase_search(["spike", "protein"])] == [doc]
+            assert [d for d, _ in proximity_search(["protein", "spike"], window=1)] == [doc]
+            if not flushed:
+                index.flush()
+    finally:
+        index.close()
@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import spelling
+from spelling import MAX_WORD_LENGTH, SpellingIndex, batch_edit_distance, edit_distance, get_spelling_suggestions
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("virus", "virus", 0),
+    ("virsu", "virus", 1),  # adjacent transposition
+    ("vrus", "virus", 1),
+    ("vaccine", "vacine", 1),
+    ("protein", "prtoien", 2),
+    ("abc", "xyzw", 3),  # capped at max_distance + 1
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 2) == distance
+
+
+def test_batch_edit_distance_matches_edit_distance():
+    rng = random.Random(0)
+    # A tiny alphabet makes matches, transpositions and near misses common
+    words = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 8))) for _ in range(300)]
+    words.append("a" * MAX_WORD_LENGTH)
+    lengths = np.array([len(w) for w in words], dtype=np.int16)
+    chars = np.zeros((len(words), MAX_WORD_LENGTH), dtype=np.uint8)
+    for i, w in enumerate(words):
+        chars[i, :len(w)] = np.frombuffer(w.encode(), dtype=np.uint8)
+    for _ in range(50):
+        query = "".join(rng.choice("abc") for _ in range(rng.randint(1, 8)))
+        expected = [edit_distance(query, w, 2) for w in words]
+        assert batch_edit_distance(query.encode(), chars, lengths, 2).tolist() == expected
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    """An empty global spelling index with nothing on disk to load."""
+    index = SpellingIndex()
+    monkeypatch.setattr(index, "load", lambda: False)
+    monkeypatch.setattr(spelling, "spelling_index", index)
+    return index
+
+
+def test_suggestions_from_lexicon(search_index, fresh_index):
+    search_index({
+        "vaccine": {0: 1, 1: 2, 2: 1},
+        "vaccines": {0: 1, 3: 1},
+        "virus": {1: 1, 2: 3},
+        "rare": {4: 1},  # below min_df
+    })
+    assert get_spelling_suggestions("vacine") == ["vaccine", "vaccines"]
+    assert get_spelling_suggestions("VIRSU") == ["virus"]
+    assert get_spelling_suggestions("rar") == []
+
+
+def test_index_is_built_once_under_concurrent_requests(fresh_index, monkeypatch):
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        time.sleep(0.05)
+        fresh_index.build([1], ["virus"], [5])
+
+    monkeypatch.setattr(fresh_index, "build_from_lexicon", slow_build)
+    monkeypatch.setattr(spelling.lexicon, "id_to_word", {1: "virus"})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_spelling_suggestions("virsu"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert results == [["virus"]] * 8
+
+
+def test_saved_index_is_memory_mapped(fresh_index, monkeypatch, tmp_path):
+    monkeypatch.setattr(spelling.lexicon, "id_to_word", {1: "virus", 2: "viral", 3: "vaccine"})
+    fresh_index.build([1, 2, 3], ["virus", "viral", "vaccine"], [5, 3, 9])
+    fresh_index.save(str(tmp_path))
+    loaded = SpellingIndex(max_distance=1)
+    assert loaded.load(str(tmp_path))
+    assert isinstance(loaded.keys, np.memmap)
+    assert loaded.max_distance == 2
+    assert loaded.suggest("virsu") == fresh_index.suggest("virsu") == [("virus", 1, 5), ("viral", 2, 3)]
+    assert not SpellingIndex().load(str(tmp_path / "missing"))
@@ -0,0 +1,47 @@
+import fnmatch
+
+import numpy as np
+import pytest
+
+from wildcard import KGramIndex
+
+WORDS = {"sars": 9, "sarscov": 4, "coronavirus": 7, "virus": 20, "viruses": 5, "covid": 30, "cowboyd": 1, "cod": 2}
+
+
+@pytest.fixture
+def kgrams(search_index):
+    search_index({word: {doc: 1 for doc in range(df)} for word, df in WORDS.items()})
+    index = KGramIndex()
+    index.build_from_lexicon()
+    return index
+
+
+@pytest.mark.parametrize("pattern", ["sars*", "*virus", "*virus*", "cov*d", "co?id", "co*d", "vir?s*"])
+def test_expand_matches_brute_force(kgrams, pattern):
+    expected = sorted((w for w in WORDS if fnmatch.fnmatchcase(w, pattern)), key=lambda w: -WORDS[w])
+    assert kgrams.expand(pattern) == expected
+    assert kgrams.expand(pattern, max_expansions=1) == expected[:1]
+
+
+@pytest.mark.parametrize("pattern", ["a*", "c*d", "*"])
+def test_expand_rejects_patterns_without_grams(kgrams, pattern):
+    with pytest.raises(ValueError):
+        kgrams.expand(pattern)
+
+
+def test_save_load_round_trip(kgrams, tmp_path):
+    path = str(tmp_path / "wildcard_index.npz")
+    kgrams.save(path)
+    loaded = KGramIndex(k=2)
+    assert loaded.load(path) and loaded.k == 3
+    assert loaded.expand("*virus*") == kgrams.expand("*virus*")
+
+
+def test_wildcard_search_ors_the_expansions(kgrams, monkeypatch):
+    import search
+    import wildcard
+    from query_engine import disjunctive_search
+
+    monkeypatch.setattr(wildcard, "wildcard_index", kgrams)
+    assert search.wildcard_search("*virus", top_k=5) == disjunctive_search(["virus", "coronavirus"], top_k=5)
+    assert search.wildcard_search("zzz*") == []